@@ -0,0 +1,119 @@
+"""Benchmarks for the BaseLLM/BaseChatLLM HTTP path against the local stub server.
+
+Run with ``python benchmarks/bench_llm.py`` (add ``--quick`` for a short run).
+
+Suites:
+    - overhead: per-call client cost against a zero-latency server
+    - scaling: throughput of ``agenerate_batch`` as concurrency grows
+    - tail: p50/p95/p99 across two replicas (one slow) with heavy-tailed latency,
+      with and without hedging
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+import httpx
+
+from dhti_elixir_base import BaseChatLLM, BaseLLM
+from dhti_elixir_base.stub_server import StubModelServer
+from dhti_elixir_base.transport import HedgePolicy
+
+
+def percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def bench_overhead(calls: int) -> None:
+    with StubModelServer() as server:
+        url = server.url()
+        payload = {"model": "stub", "messages": [{"role": "user", "content": "hi"}]}
+        with httpx.Client() as client:
+            start = time.perf_counter()
+            for _ in range(calls):
+                client.post(url, json=payload).json()
+            raw = (time.perf_counter() - start) / calls
+        llm = BaseChatLLM(base_url=url, model="stub")
+        start = time.perf_counter()
+        for n in range(calls):
+            llm.invoke(f"hi {n}")
+        client_time = (time.perf_counter() - start) / calls
+    print("== overhead ==")
+    print(f"raw httpx     {raw * 1e6:9.0f} us/call")
+    print(f"BaseChatLLM   {client_time * 1e6:9.0f} us/call")
+    print(f"overhead      {(client_time - raw) * 1e6:9.0f} us/call")
+
+
+def bench_scaling(prompts: int, latency: float) -> None:
+    print("== scaling ==")
+    print(f"{'concurrency':>11} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    with StubModelServer(latency_mean=latency) as server:
+        llm = BaseLLM(base_url=server.url(), model="stub")
+        for concurrency in (1, 4, 16, 64):
+            batch = [f"prompt {concurrency}-{n}" for n in range(prompts)]
+            start = time.perf_counter()
+            items = asyncio.run(llm.agenerate_batch(batch, max_concurrency=concurrency))
+            elapsed = time.perf_counter() - start
+            latencies = [item.latency for item in items]
+            print(
+                f"{concurrency:>11} {prompts / elapsed:8.1f} "
+                f"{percentile(latencies, 50) * 1e3:8.1f} {percentile(latencies, 99) * 1e3:8.1f}"
+            )
+
+
+def bench_tail(requests: int, latency: float) -> None:
+    # Hedges go to a replica the first request did not use, so two are needed;
+    # the second is slow, as a degraded replica behind the same load balancer
+    print("== tail latency (2 replicas, one 4x slower; lognormal, sigma=1.0) ==")
+    print(f"{'mode':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  hedges (won)")
+    for mode in ("plain", "hedged"):
+        with (
+            StubModelServer(latency="lognormal", latency_mean=latency, latency_sigma=1.0, seed=7) as fast,
+            StubModelServer(latency="lognormal", latency_mean=latency * 4, latency_sigma=1.0, seed=8) as slow,
+        ):
+            policy = HedgePolicy(percentile=90, min_samples=20, budget=0.2) if mode == "hedged" else None
+            llm = BaseChatLLM(base_url=[fast.url(), slow.url()], model="stub", hedge_policy=policy)
+
+            async def timed(n: int, llm: BaseChatLLM = llm) -> float:
+                start = time.perf_counter()
+                await llm.ainvoke(f"tail {n}")
+                return time.perf_counter() - start
+
+            async def run() -> list[float]:
+                semaphore = asyncio.Semaphore(8)
+
+                async def one(n: int) -> float:
+                    async with semaphore:
+                        return await timed(n)
+
+                return list(await asyncio.gather(*(one(n) for n in range(requests))))
+
+            latencies = asyncio.run(run())
+            stats = policy.as_dict() if policy else {"hedges": 0, "hedge_wins": 0}
+            print(
+                f"{mode:>8} {percentile(latencies, 50) * 1e3:8.1f} {percentile(latencies, 95) * 1e3:8.1f} "
+                f"{percentile(latencies, 99) * 1e3:8.1f}  {stats['hedges']} ({stats['hedge_wins']})"
+            )
+            print(f"{'':>8} mean {statistics.mean(latencies) * 1e3:.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the DHTI model clients against a local stub server.")
+    parser.add_argument("--quick", action="store_true", help="fewer requests, for a smoke run")
+    parser.add_argument("--suite", choices=("overhead", "scaling", "tail", "all"), default="all")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    scale = 1 if args.quick else 5
+    if args.suite in ("overhead", "all"):
+        bench_overhead(100 * scale)
+    if args.suite in ("scaling", "all"):
+        bench_scaling(64 * scale, latency=0.02)
+    if args.suite in ("tail", "all"):
+        bench_tail(100 * scale, latency=0.02)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark single-process and multi-process PDF parsing on a synthetic PDF.
+
+Run with ``python benchmarks/bench_pdf.py`` (add ``--quick`` for a short run).
+
+Suites:
+    - parse: pages/s of ``PDFMinerParser`` and ``rag.pdf.parse_pages`` with 1..N workers
+    - ingest: pages/s and chunks/s of ``ingest_pages`` fed by each parser
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import MagicMock
+
+from langchain_community.document_loaders.parsers.pdf import PDFMinerParser
+from langchain_core.document_loaders import Blob
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from dhti_elixir_base.rag.pdf import parse_pages, synthetic_pdf
+from dhti_elixir_base.rag.process import ingest_pages
+
+
+def worker_counts() -> list[int]:
+    cpus = os.cpu_count() or 1
+    return sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+
+
+def bench_parse(pdf: bytes, pages: int) -> None:
+    print("== parse ==")
+    print(f"{'parser':>22} {'seconds':>8} {'pages/s':>8}")
+    start = time.perf_counter()
+    count = sum(1 for _ in PDFMinerParser(mode="page").lazy_parse(Blob(data=pdf)))
+    elapsed = time.perf_counter() - start
+    print(f"{'PDFMinerParser':>22} {elapsed:8.2f} {count / elapsed:8.1f}")
+    for workers in worker_counts():
+        # Start the pool first so worker start-up is not counted
+        with ProcessPoolExecutor(workers) as pool:
+            list(pool.map(int, range(workers)))
+            start = time.perf_counter()
+            count = sum(1 for _ in parse_pages(pdf, workers=workers, executor=pool))
+            elapsed = time.perf_counter() - start
+        if count != pages:
+            raise RuntimeError(f"parse_pages x{workers} returned {count} of {pages} pages")
+        print(f"{f'parse_pages x{workers}':>22} {elapsed:8.2f} {count / elapsed:8.1f}")
+
+
+def bench_ingest(pdf: bytes) -> None:
+    print("== ingest (no-op vectorstore) ==")
+    print(f"{'parser':>22} {'pages/s':>8} {'chunks/s':>9}")
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+    pages = PDFMinerParser(mode="page").lazy_parse(Blob(data=pdf))
+    stats = ingest_pages(pages, {}, splitter=splitter, vectorstore=MagicMock()).as_dict()
+    print(f"{'PDFMinerParser':>22} {stats['pages_per_second']:8.1f} {stats['chunks_per_second']:9.1f}")
+    for workers in worker_counts()[1:]:
+        with ProcessPoolExecutor(workers) as pool:
+            list(pool.map(int, range(workers)))
+            pages = parse_pages(pdf, workers=workers, executor=pool)
+            stats = ingest_pages(pages, {}, splitter=splitter, vectorstore=MagicMock()).as_dict()
+        label = f"parse_pages x{workers}"
+        print(f"{label:>22} {stats['pages_per_second']:8.1f} {stats['chunks_per_second']:9.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark PDF parsing for RAG ingestion.")
+    parser.add_argument("--quick", action="store_true", help="a smaller PDF, for a smoke run")
+    parser.add_argument("--pages", type=int, help="pages in the synthetic PDF (default 400)")
+    parser.add_argument("--suite", choices=("parse", "ingest", "all"), default="all")
+    args = parser.parse_args()
+    pages = args.pages or (48 if args.quick else 400)
+    pdf = synthetic_pdf(pages)
+    print(f"synthetic PDF: {pages} pages, {len(pdf) / 1e6:.1f} MB, {os.cpu_count()} CPUs")
+    if args.suite in ("parse", "all"):
+        bench_parse(pdf, pages)
+    if args.suite in ("ingest", "all"):
+        bench_ingest(pdf)
+
+
+if __name__ == "__main__":
+    main()
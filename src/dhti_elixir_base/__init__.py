@@ -1,6 +1,7 @@
 from importlib.metadata import PackageNotFoundError, version
 
 from .agent import BaseAgent
+from .cascade import ModelCascade
 from .chain import BaseChain
 from .chatllm import BaseChatLLM
 from .embedding import BaseEmbedding
@@ -31,6 +32,7 @@ __all__ = [
     "BaseLLM",
     "BaseServer",
     "BaseSpace",
+    "ModelCascade",
     "ParlantAgent",
     "camel_to_snake",
     "get_di",
@@ -0,0 +1,220 @@
+import base64
+import binascii
+import hashlib
+import mimetypes
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from .cache.exact import LRUCache
+
+ATTACHMENT_SCHEME = "attachment://"
+
+
+def is_attachment_ref(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith(ATTACHMENT_SCHEME)
+
+
+def _decode_inline(value: str, mime_type: str | None) -> tuple[bytes, str] | None:
+    """Bytes and MIME type of a data URL or bare base64 string, or None for URLs."""
+    if value.startswith("data:"):
+        header, _, data = value.partition(",")
+        mime_type = header[5:].split(";")[0] or mime_type
+    elif value.startswith(("http://", "https://", ATTACHMENT_SCHEME)):
+        return None
+    else:
+        data = value
+    try:
+        return base64.b64decode(data, validate=True), mime_type or "image/png"
+    except (binascii.Error, ValueError):
+        return None
+
+
+class AttachmentStore:
+    """Content-addressed store for images and other chat attachments.
+
+    Attachments are kept once per SHA-256 as raw bytes (a quarter smaller than
+    base64) and referenced in messages as ``attachment://<sha256>``, so a
+    conversation carries a short reference instead of the image on every turn.
+    When a message is sent, ``url`` turns the reference into what the backend
+    accepts: the URL returned by ``uploader`` (called once per attachment, for
+    backends or object stores that can fetch images by URL), otherwise a data
+    URL that is encoded once and reused for later turns.
+
+    Args:
+        max_entries: Attachments kept in memory.
+        path: Directory for a persistent copy of each attachment; omit for memory only.
+        uploader: Optional ``uploader(data, mime_type) -> url`` that uploads an
+            attachment and returns the URL to send in its place.
+        max_encoded: Data URLs kept ready to send.
+
+    Example:
+        ```python
+        from kink import di
+        from langchain_core.messages import HumanMessage
+        from dhti_elixir_base.attachments import AttachmentStore
+
+        store = AttachmentStore(path="/data/attachments")
+        di["llm_attachment_store"] = store
+        ref = store.put_file("wound.jpg")
+        message = HumanMessage(
+            content=[
+                {"type": "text", "text": "Has the wound healed?"},
+                {"type": "image_url", "image_url": {"url": ref}},
+            ]
+        )
+        ```
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        path: str | None = None,
+        uploader: Callable[[bytes, str], str] | None = None,
+        max_encoded: int = 32,
+    ):
+        self.path = Path(path) if path else None
+        if self.path is not None:
+            self.path.mkdir(parents=True, exist_ok=True)
+        self.uploader = uploader
+        self._blobs = LRUCache(max_entries=max_entries)
+        self._encoded = LRUCache(max_entries=max_encoded)
+        self._uploaded: dict[str, str] = {}
+        # Inline images already interned, by a digest of the string, so a turn
+        # that resends the history hashes each image instead of decoding it;
+        # the strings themselves are not kept
+        self._inline = LRUCache(max_entries=max_entries)
+        self._lock = threading.Lock()
+        self.uploads = 0
+        self.encodes = 0
+
+    def put(self, data: bytes | str, mime_type: str | None = None) -> str:
+        """Store bytes, a base64 string or a data URL; return its ``attachment://`` reference."""
+        if isinstance(data, str):
+            decoded = _decode_inline(data, mime_type)
+            if decoded is None:
+                raise ValueError("Expected bytes, base64 data or a data URL")
+            data, mime_type = decoded
+        mime_type = mime_type or "image/png"
+        digest = hashlib.sha256(data).hexdigest()
+        if self._blobs.get(digest) is None:
+            self._blobs.set(digest, (data, mime_type))
+            if self.path is not None and self._file(digest) is None:
+                suffix = mimetypes.guess_extension(mime_type) or ".bin"
+                (self.path / f"{digest}{suffix}").write_bytes(data)
+        return f"{ATTACHMENT_SCHEME}{digest}"
+
+    def put_file(self, path: str, mime_type: str | None = None) -> str:
+        """Store a file; the MIME type is guessed from its name when not given."""
+        mime_type = mime_type or mimetypes.guess_type(path)[0]
+        return self.put(Path(path).read_bytes(), mime_type)
+
+    def get(self, ref: str) -> tuple[bytes, str]:
+        """Bytes and MIME type of a stored attachment; raises KeyError if unknown."""
+        digest = ref.removeprefix(ATTACHMENT_SCHEME)
+        entry = self._blobs.get(digest)
+        if entry is None:
+            file = self._file(digest)
+            if file is None:
+                raise KeyError(f"Unknown attachment: {ref}")
+            mime_type = mimetypes.guess_type(file.name)[0] or "application/octet-stream"
+            entry = (file.read_bytes(), mime_type)
+            self._blobs.set(digest, entry)
+        return entry
+
+    def url(self, ref: str) -> str:
+        """The URL to send for a reference: uploaded once if possible, else a cached data URL."""
+        digest = ref.removeprefix(ATTACHMENT_SCHEME)
+        if self.uploader is not None:
+            with self._lock:
+                uploaded = self._uploaded.get(digest)
+            if uploaded is None:
+                uploaded = self.uploader(*self.get(ref))
+                with self._lock:
+                    self._uploaded[digest] = uploaded
+                    self.uploads += 1
+            return uploaded
+        encoded = self._encoded.get(digest)
+        if encoded is None:
+            data, mime_type = self.get(ref)
+            encoded = f"data:{mime_type};base64,{base64.b64encode(data).decode('ascii')}"
+            self._encoded.set(digest, encoded)
+            with self._lock:
+                self.encodes += 1
+        return encoded
+
+    def intern(self, value: str, mime_type: str | None = None) -> str:
+        """Reference for an inline image (data URL or base64); other values are returned as is."""
+        digest = hashlib.sha256(value.encode())
+        digest.update(f"\0{mime_type}".encode())
+        key = digest.hexdigest()
+        ref = self._inline.get(key)
+        if ref is None:
+            decoded = _decode_inline(value, mime_type)
+            # "" marks a value that is not an inline image
+            ref = self.put(*decoded) if decoded else ""
+            self._inline.set(key, ref)
+        return ref or value
+
+    def _file(self, digest: str) -> Path | None:
+        if self.path is None:
+            return None
+        return next(self.path.glob(f"{digest}.*"), None)
+
+    def __len__(self) -> int:
+        return len(self._blobs)
+
+    def as_dict(self) -> dict:
+        """Stored attachments, uploads and data URL encodes, for monitoring."""
+        return {
+            "attachments": len(self._blobs),
+            "uploads": self.uploads,
+            "encodes": self.encodes,
+            "hit_ratio": self._blobs.stats.hit_ratio,
+        }
+
+
+def _image_url(block: dict, store: AttachmentStore | None) -> str | None:
+    """The image URL of an OpenAI ``image_url`` or LangChain ``image`` content block."""
+    if block.get("type") == "image_url":
+        image_url = block.get("image_url")
+        return image_url.get("url") if isinstance(image_url, dict) else image_url
+    if block.get("type") != "image":
+        return None
+    mime_type = block.get("mime_type")
+    if block.get("source_type") == "url" or "url" in block:
+        return block.get("url")
+    data = block.get("base64") or block.get("data")
+    if data is None:
+        return None
+    if store is not None:
+        return store.intern(data, mime_type)
+    return f"data:{mime_type or 'image/png'};base64,{data}"
+
+
+def format_content(content: Any, store: AttachmentStore | None = None) -> Any:
+    """Convert message content to the OpenAI format, resolving attachment references.
+
+    ``image_url`` blocks and LangChain ``image`` blocks (base64 or URL) become
+    ``image_url`` blocks. With a store, inline images are stored once and
+    every image is sent as ``store.url(ref)``; without one, an
+    ``attachment://`` reference raises ValueError.
+    """
+    if not isinstance(content, list):
+        return content
+    formatted = []
+    for block in content:
+        url = _image_url(block, store) if isinstance(block, dict) else None
+        if url is None:
+            formatted.append(block)
+            continue
+        if store is not None:
+            ref = store.intern(url)
+            url = store.url(ref) if is_attachment_ref(ref) else ref
+        elif is_attachment_ref(url):
+            raise ValueError(f"No attachment store to resolve {url}")
+        image_url = dict(block["image_url"]) if isinstance(block.get("image_url"), dict) else {}
+        image_url["url"] = url
+        formatted.append({"type": "image_url", "image_url": image_url})
+    return formatted
@@ -0,0 +1,16 @@
+from .embedding import EmbeddingCache, VectorFile, embedding_key
+from .exact import CacheStats, LRUCache, ResponseCache, SQLiteCache, payload_key
+from .semantic import SemanticCache, prompt_text
+
+__all__ = [
+    "CacheStats",
+    "EmbeddingCache",
+    "LRUCache",
+    "ResponseCache",
+    "SQLiteCache",
+    "SemanticCache",
+    "VectorFile",
+    "embedding_key",
+    "payload_key",
+    "prompt_text",
+]
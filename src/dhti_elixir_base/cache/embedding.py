@@ -0,0 +1,204 @@
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+from array import array
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+
+from .exact import CacheStats, LRUCache
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+
+
+# Keys per ``IN (...)`` query, below SQLite's host parameter limit
+KEYS_PER_QUERY = 500
+
+
+def embedding_key(model: str | None, text: str) -> str:
+    """SHA-256 of the model name and text, so each model has its own vectors."""
+    return hashlib.sha256(f"{model}\0{text}".encode()).hexdigest()
+
+
+class VectorFile:
+    """Persistent float32 vectors: one append-only data file plus a SQLite index.
+
+    Vectors are written as raw float32 (4 bytes per value) to ``vectors.f32``
+    and read back through a read-only memory map, so a large cache is paged in
+    by the OS instead of being loaded into the process. ``index.db`` maps each
+    key to its offset and dimension.
+
+    Several processes (e.g. uvicorn or gunicorn workers) may share a directory:
+    appends and index inserts are serialized by an exclusive ``flock`` on
+    ``vectors.lock``, so each vector gets its own offset. Without ``fcntl``
+    (Windows) a directory must only be used by one process.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.stats = CacheStats()
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        data_path = os.path.join(path, "vectors.f32")
+        self._file = open(data_path, "ab")  # noqa: SIM115
+        self._reader = open(data_path, "rb")  # noqa: SIM115
+        self._map: mmap.mmap | None = None
+        self._lockfile = open(os.path.join(path, "vectors.lock"), "a")  # noqa: SIM115
+        self._conn = sqlite3.connect(os.path.join(path, "index.db"), check_same_thread=False, timeout=30)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS vectors ("
+                "key TEXT PRIMARY KEY, offset INTEGER NOT NULL, dim INTEGER NOT NULL)"
+            )
+
+    def _view(self, end: int) -> mmap.mmap:
+        # Remap once the file has grown past the mapped region
+        if self._map is None or len(self._map) < end:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._reader.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def get(self, key: str) -> array | None:
+        with self._lock:
+            row = self._conn.execute("SELECT offset, dim FROM vectors WHERE key = ?", (key,)).fetchone()
+            vector = None
+            if row is not None:
+                offset, dim = row
+                end = offset + dim * 4
+                vector = array("f", self._view(end)[offset:end])
+        self.stats.record(vector is not None)
+        return vector
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Hold the thread lock and, where available, the cross-process file lock."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            fcntl.flock(self._lockfile.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lockfile.fileno(), fcntl.LOCK_UN)
+
+    def set(self, key: str, vector: array) -> None:
+        self.set_many([(key, vector)])
+
+    def set_many(self, items: Sequence[tuple[str, array]]) -> None:
+        """Append the vectors of new keys with one lock, one write and one transaction."""
+        with self._exclusive():
+            new: dict[str, array] = {}
+            for key, vector in items:
+                new.setdefault(key, vector)
+            keys = list(new)
+            for start in range(0, len(keys), KEYS_PER_QUERY):
+                chunk = keys[start : start + KEYS_PER_QUERY]
+                placeholders = ",".join("?" * len(chunk))
+                for (key,) in self._conn.execute(f"SELECT key FROM vectors WHERE key IN ({placeholders})", chunk):  # noqa: S608
+                    del new[key]
+            if not new:
+                return
+            # Under the file lock the size includes every other process's appends
+            offset = os.fstat(self._file.fileno()).st_size
+            rows = []
+            for key, vector in new.items():
+                rows.append((key, offset, len(vector)))
+                offset += len(vector) * 4
+            self._file.write(b"".join(vector.tobytes() for vector in new.values()))
+            self._file.flush()
+            with self._conn:
+                self._conn.executemany("INSERT OR IGNORE INTO vectors VALUES (?, ?, ?)", rows)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._file.close()
+            self._reader.close()
+            self._lockfile.close()
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0])
+
+
+class EmbeddingCache:
+    """Cache of embedding vectors keyed by (model, text hash).
+
+    An in-process LRU tier sits in front of an optional on-disk ``VectorFile``.
+    Vectors are kept as float32 in both tiers, so a cached vector takes 4
+    bytes per value instead of a Python float's 24+.
+
+    Args:
+        max_entries: Vectors kept in the in-process LRU tier.
+        path: Directory for the persistent tier; omit for memory only.
+
+    Example:
+        ```python
+        from kink import di
+        from dhti_elixir_base.cache import EmbeddingCache
+
+        di["base_embedding_cache"] = EmbeddingCache(max_entries=50_000, path="/data/embedding-cache")
+        ```
+    """
+
+    def __init__(self, max_entries: int = 10_000, path: str | None = None):
+        self.memory = LRUCache(max_entries=max_entries)
+        self.disk = VectorFile(path) if path else None
+        self.stats = CacheStats()
+
+    def get(self, model: str | None, text: str) -> list[float] | None:
+        key = embedding_key(model, text)
+        vector = self.memory.get(key)
+        if vector is None and self.disk is not None:
+            vector = self.disk.get(key)
+            if vector is not None:
+                self.memory.set(key, vector)
+        self.stats.record(vector is not None)
+        return vector.tolist() if vector is not None else None
+
+    def set(self, model: str | None, text: str, vector: Sequence[float]) -> list[float]:
+        """Store a vector and return it as it will be read back (rounded to float32)."""
+        key = embedding_key(model, text)
+        packed = array("f", vector)
+        self.memory.set(key, packed)
+        if self.disk is not None:
+            self.disk.set(key, packed)
+        return packed.tolist()
+
+    def get_many(self, model: str | None, texts: Sequence[str]) -> list[list[float] | None]:
+        return [self.get(model, text) for text in texts]
+
+    def set_many(
+        self, model: str | None, texts: Sequence[str], vectors: Sequence[Sequence[float]]
+    ) -> list[list[float]]:
+        """Store a batch of vectors, written to disk in one append and one transaction."""
+        items = [(embedding_key(model, text), array("f", vector)) for text, vector in zip(texts, vectors, strict=True)]
+        for key, packed in items:
+            self.memory.set(key, packed)
+        if self.disk is not None:
+            self.disk.set_many(items)
+        return [packed.tolist() for _, packed in items]
+
+    def clear(self) -> None:
+        """Clear the in-process tier; the append-only disk tier is kept."""
+        self.memory.clear()
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
+
+    def as_dict(self) -> dict:
+        """Hit/miss counters overall and per tier, for monitoring."""
+        stats = {**self.stats.as_dict(), "memory": self.memory.stats.as_dict()}
+        if self.disk is not None:
+            stats["disk"] = self.disk.stats.as_dict()
+        return stats
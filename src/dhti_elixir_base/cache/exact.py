@@ -0,0 +1,208 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+def payload_key(payload: dict) -> str:
+    """Stable SHA-256 of a request payload (model, options, messages).
+
+    Keys are serialized sorted and without whitespace, so dict ordering does
+    not change the hash.
+    """
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class CacheStats:
+    """Thread-safe hit/miss counters."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "hit_ratio": self.hit_ratio}
+
+
+class LRUCache:
+    """In-process LRU tier with optional TTL (seconds)."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float | None = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._data: OrderedDict[str, tuple[float | None, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] is not None and entry[0] < time.time():
+                del self._data[key]
+                entry = None
+            if entry is not None:
+                self._data.move_to_end(key)
+        self.stats.record(entry is not None)
+        return entry[1] if entry is not None else None
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """Persistent tier backed by a single SQLite file.
+
+    Values are stored as JSON. Entries past their TTL are ignored and purged,
+    and the least recently used rows are evicted beyond ``max_entries``.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100_000, ttl: float | None = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at)")
+
+    def get(self, key: str) -> Any | None:
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str) -> tuple[Any, float | None] | None:
+        """Value and expiry time (epoch seconds, or None) of an entry, if present."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[1] is not None and row[1] < now:
+                with self._conn:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            elif row is not None:
+                with self._conn:
+                    self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        self.stats.record(row is not None)
+        return (json.loads(row[0]), row[1]) if row is not None else None
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        now = time.time()
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = now + ttl if ttl is not None else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now),
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0])
+
+
+class ResponseCache:
+    """Exact-match cache of model responses with an LRU tier and optional SQLite tier.
+
+    Args:
+        max_entries: Capacity of the in-process LRU tier.
+        ttl: Default time-to-live in seconds (None keeps entries until evicted).
+        path: SQLite file for the persistent tier; omit for memory only.
+        max_disk_entries: Capacity of the SQLite tier.
+
+    Example:
+        ```python
+        from kink import di
+        from dhti_elixir_base.cache import ResponseCache
+
+        di["llm_response_cache"] = ResponseCache(max_entries=2048, ttl=3600, path="/data/llm-cache.db")
+        ```
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float | None = None,
+        path: str | None = None,
+        max_disk_entries: int = 100_000,
+    ):
+        self.memory = LRUCache(max_entries=max_entries, ttl=ttl)
+        self.disk = SQLiteCache(path, max_entries=max_disk_entries, ttl=ttl) if path else None
+        self.stats = CacheStats()
+
+    def get(self, payload: dict) -> Any | None:
+        key = payload_key(payload)
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            entry = self.disk.get_entry(key)
+            if entry is not None:
+                value, expires_at = entry
+                # Promote for the rest of the disk entry's lifetime, not a fresh TTL
+                self.memory.set(key, value, expires_at - time.time() if expires_at is not None else None)
+        self.stats.record(value is not None)
+        return value
+
+    def set(self, payload: dict, value: Any, ttl: float | None = None) -> None:
+        key = payload_key(payload)
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def as_dict(self) -> dict:
+        """Hit/miss counters overall and per tier, for monitoring."""
+        stats = {**self.stats.as_dict(), "memory": self.memory.stats.as_dict()}
+        if self.disk is not None:
+            stats["disk"] = self.disk.stats.as_dict()
+        return stats
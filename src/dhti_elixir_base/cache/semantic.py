@@ -0,0 +1,294 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+import numpy as np
+
+from ..mydi import get_di
+from ..rag.vectors import dot_scores, normalize, top_k
+from .exact import CacheStats, LRUCache, payload_key
+
+
+def prompt_text(payload: dict) -> str:
+    """Flatten the messages of a payload into the text that gets embedded."""
+    lines = []
+    for message in payload.get("messages", []):
+        content = message.get("content")
+        if not isinstance(content, str):
+            # Multimodal content: embed only the text parts
+            content = " ".join(
+                part.get("text", "") for part in content or [] if isinstance(part, dict) and part.get("type") == "text"
+            )
+        lines.append(f"{message.get('role', 'user')}: {content}")
+    return "\n".join(lines)
+
+
+# Payload fields that steer transport or routing, not the answer
+TRANSIENT_KEYS = frozenset({
+    "model",
+    "messages",
+    "stream",
+    "stream_options",
+    "prompt_cache_key",
+    "id_slot",
+    "cache_prompt",
+})
+
+
+def non_text_parts(payload: dict) -> list[dict]:
+    """Everything in the messages besides their text: images, attachments, tool calls.
+
+    ``prompt_text`` leaves these out, so they are hashed into the cache scope
+    instead; the same question about another image must not hit.
+    """
+    parts = []
+    for message in payload.get("messages", []):
+        extra = {key: value for key, value in message.items() if key not in ("role", "content")}
+        content = message.get("content")
+        if not isinstance(content, str):
+            extra["parts"] = [
+                part for part in content or [] if not (isinstance(part, dict) and part.get("type") == "text")
+            ]
+        parts.append(extra)
+    return parts
+
+
+class _ScopeIndex:
+    """Entries of one cache scope, with their unit vectors as float32 matrix rows.
+
+    The matrix grows by doubling; a removed row is filled with the last one,
+    so the first ``len(self)`` rows are always the live vectors.
+    """
+
+    def __init__(self, dim: int):
+        self.matrix = np.empty((8, dim), dtype=np.float32)
+        self.keys: list[str] = []
+        self.rows: dict[str, int] = {}
+        # prompt hash -> (response, expires_at), oldest first
+        self.entries: OrderedDict[str, tuple[Any, float | None]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, key: str, vector: np.ndarray, response: Any, expires_at: float | None) -> None:
+        row = self.rows.get(key)
+        if row is None:
+            row = len(self.keys)
+            if row == len(self.matrix):
+                self.matrix = np.concatenate([self.matrix, np.empty_like(self.matrix)])
+            self.keys.append(key)
+            self.rows[key] = row
+        self.matrix[row] = vector
+        self.entries[key] = (response, expires_at)
+        self.entries.move_to_end(key)
+
+    def remove(self, key: str) -> None:
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        last = self.keys.pop()
+        if last != key:
+            self.matrix[row] = self.matrix[len(self.keys)]
+            self.keys[row] = last
+            self.rows[last] = row
+        del self.entries[key]
+
+    def best(self, vector: np.ndarray) -> tuple[Any, float]:
+        """Response of the most similar entry and its cosine similarity."""
+        rows, scores = top_k(dot_scores(vector, self.matrix[: len(self.keys)]), 1)
+        if not len(rows):
+            return None, -1.0
+        return self.entries[self.keys[rows[0]]][0], float(scores[0])
+
+
+class SemanticCache:
+    """Near-duplicate prompt cache backed by an Embeddings model (e.g. BaseEmbedding).
+
+    Prompts are embedded with ``embed_query`` and compared by cosine similarity
+    with earlier prompts in the same scope. The scope is the model name, the
+    patient ID and a hash of everything else that shapes the answer: generation
+    options, ``tools`` and ``tool_choice``, and the non-text parts of the
+    messages (images, attachments, tool calls). A cached answer is therefore
+    never returned for another patient, other sampling settings, other tools or
+    another image.
+
+    Args:
+        embedding: Embeddings instance; defaults to ``semantic_cache_embedding``
+            (or ``base_embedding`` / ``embedding``) from DI.
+        threshold: Minimum cosine similarity for a hit.
+        max_entries: Prompts kept per scope (oldest evicted first).
+        max_total_entries: Prompts kept across all scopes (oldest evicted first).
+        ttl: Seconds a cached completion stays valid (None keeps it until evicted).
+            Expired entries are purged on every insert.
+        require_patient_id: When True, calls without a patient ID bypass the cache,
+            because the prompt may still carry patient context.
+
+    Example:
+        ```python
+        from kink import di
+        from dhti_elixir_base import BaseEmbedding
+        from dhti_elixir_base.cache import SemanticCache
+
+        di["llm_semantic_cache"] = SemanticCache(BaseEmbedding(url, "nomic-embed-text", key), threshold=0.95)
+        chatllm.invoke(messages, patient_id="48596990")
+        ```
+    """
+
+    def __init__(
+        self,
+        embedding: Any = None,
+        threshold: float = 0.92,
+        max_entries: int = 1000,
+        max_total_entries: int = 10_000,
+        ttl: float | None = None,
+        require_patient_id: bool = True,
+    ):
+        self._embedding = embedding
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_total_entries = max_total_entries
+        self.ttl = ttl
+        self.require_patient_id = require_patient_id
+        self.stats = CacheStats()
+        # scope -> its entries and their unit vectors
+        self._index: dict[tuple, _ScopeIndex] = {}
+        # (scope, prompt hash) of every entry, oldest first; with a single ttl
+        # this is also expiry order
+        self._order: OrderedDict[tuple[tuple, str], None] = OrderedDict()
+        # recent prompt embeddings, so a miss followed by store() embeds only once
+        self._vectors = LRUCache(max_entries=256)
+        self._lock = threading.Lock()
+
+    @property
+    def embedding(self) -> Any:
+        if self._embedding is None:
+            self._embedding = get_di("semantic_cache_embedding") or get_di("base_embedding")
+        return self._embedding
+
+    def _scope(self, payload: dict, patient_id: str | None) -> tuple | None:
+        if patient_id is None and self.require_patient_id:
+            return None
+        settings = {key: value for key, value in payload.items() if key not in TRANSIENT_KEYS}
+        settings["non_text"] = non_text_parts(payload)
+        return (payload.get("model"), patient_id, payload_key(settings))
+
+    @staticmethod
+    def _text_key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _search(self, scope: tuple, vector: np.ndarray) -> Any | None:
+        best = None
+        with self._lock:
+            self._purge(time.time())
+            index = self._index.get(scope)
+            if index is not None:
+                response, score = index.best(vector)
+                if score >= self.threshold:
+                    best = response
+        self.stats.record(best is not None)
+        return best
+
+    def _insert(self, scope: tuple, key: str, vector: np.ndarray, response: Any) -> None:
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._purge(now)
+            index = self._index.get(scope)
+            if index is None:
+                index = self._index[scope] = _ScopeIndex(len(vector))
+            index.add(key, vector, response, expires_at)
+            self._order[(scope, key)] = None
+            self._order.move_to_end((scope, key))
+            while len(index) > self.max_entries:
+                self._remove(scope, next(iter(index.entries)))
+            while len(self._order) > self.max_total_entries:
+                self._remove(*next(iter(self._order)))
+
+    def _purge(self, now: float) -> None:
+        """Drop expired entries, oldest first (call with the lock held)."""
+        if self.ttl is None:
+            return
+        for scope, key in list(self._order):
+            expires_at = self._index[scope].entries[key][1]
+            if expires_at is None or expires_at >= now:
+                break
+            self._remove(scope, key)
+
+    def _remove(self, scope: tuple, key: str) -> None:
+        """Drop one entry and its scope once empty (call with the lock held)."""
+        index = self._index.get(scope)
+        if index is not None:
+            index.remove(key)
+            if not index:
+                del self._index[scope]
+        self._order.pop((scope, key), None)
+
+    def _vector(self, text: str) -> tuple[str, np.ndarray]:
+        key = self._text_key(text)
+        vector = self._vectors.get(key)
+        if vector is None:
+            vector = normalize(np.asarray(self.embedding.embed_query(text), dtype=np.float32))
+            self._vectors.set(key, vector)
+        return key, vector
+
+    async def _avector(self, text: str) -> tuple[str, np.ndarray]:
+        key = self._text_key(text)
+        vector = self._vectors.get(key)
+        if vector is None:
+            vector = normalize(np.asarray(await self.embedding.aembed_query(text), dtype=np.float32))
+            self._vectors.set(key, vector)
+        return key, vector
+
+    def lookup(self, payload: dict, patient_id: str | None = None) -> Any | None:
+        """Return a cached response for a similar prompt in the same scope, if any."""
+        scope = self._scope(payload, patient_id)
+        if scope is None:
+            return None
+        if scope not in self._index:
+            self.stats.record(False)
+            return None
+        _, vector = self._vector(prompt_text(payload))
+        return self._search(scope, vector)
+
+    async def alookup(self, payload: dict, patient_id: str | None = None) -> Any | None:
+        scope = self._scope(payload, patient_id)
+        if scope is None:
+            return None
+        if scope not in self._index:
+            self.stats.record(False)
+            return None
+        _, vector = await self._avector(prompt_text(payload))
+        # Scoring a large scope is CPU work; keep it off the event loop
+        return await asyncio.to_thread(self._search, scope, vector)
+
+    def store(self, payload: dict, response: Any, patient_id: str | None = None) -> None:
+        """Remember the response for this prompt within its scope."""
+        scope = self._scope(payload, patient_id)
+        if scope is None:
+            return
+        key, vector = self._vector(prompt_text(payload))
+        self._insert(scope, key, vector, response)
+
+    async def astore(self, payload: dict, response: Any, patient_id: str | None = None) -> None:
+        scope = self._scope(payload, patient_id)
+        if scope is None:
+            return
+        key, vector = await self._avector(prompt_text(payload))
+        self._insert(scope, key, vector, response)
+
+    def clear(self, patient_id: str | None = None) -> None:
+        """Drop every entry, or only those of one patient."""
+        with self._lock:
+            if patient_id is None:
+                self._index.clear()
+                self._order.clear()
+            else:
+                for scope, key in [item for item in self._order if item[0][1] == patient_id]:
+                    self._remove(scope, key)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._order)
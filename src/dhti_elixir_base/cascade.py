@@ -0,0 +1,128 @@
+import json
+import logging
+import re
+import threading
+from collections.abc import Callable
+from typing import Any, cast
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+
+logger = logging.getLogger(__name__)
+
+# Openings with which a model refuses or says it does not know. Only the start
+# of the answer is checked: "the patient is unable to ambulate" or "escalate to
+# cardiology" are answers, not uncertainty.
+UNCERTAIN_OPENING = re.compile(
+    r"(?:(?:sorry|unfortunately|i apologi[sz]e)[,.!]?\s+(?:but\s+)?)?"
+    r"(?:i\s*(?:'m|am)\s+(?:not sure|unsure|uncertain|unable to)"
+    r"|i\s+(?:don't|do not|cannot|can't|could not|couldn't)\s+(?:know|tell|determine|answer|say|provide|help)"
+    r"|(?:it is |it's )?(?:not possible|impossible|unclear) to (?:determine|say|tell|answer)"
+    r"|(?:there is )?(?:insufficient|not enough) (?:information|data|context)"
+    r"|(?:cannot|unable to) determine"
+    r"|not sure\b)"
+)
+
+# Answers given as JSON with a ``confidence`` below this are escalated
+CONFIDENCE_THRESHOLD = 0.5
+
+
+def _low_confidence(text: str) -> bool:
+    """Whether a JSON answer reports a ``confidence`` below the threshold."""
+    if not text.startswith("{"):
+        return False
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return False
+    confidence = data.get("confidence") if isinstance(data, dict) else None
+    return isinstance(confidence, int | float) and confidence < CONFIDENCE_THRESHOLD
+
+
+def default_escalation_check(answer: str, prompt: Any = None) -> bool:
+    """Escalate empty answers, refusals and admitted uncertainty.
+
+    Only an answer that *opens* with a refusal or "I'm not sure" (or a JSON
+    answer with a low ``confidence``) is escalated, so clinical wording such
+    as "unable to ambulate" does not send routine answers to the stronger model.
+    """
+    text = answer.strip().lower().replace("\u2019", "'")
+    return not text or bool(UNCERTAIN_OPENING.match(text.lstrip("\"'*_ "))) or _low_confidence(text)
+
+
+class ModelCascade:
+    """Answer with a fast model first and escalate to a stronger one when needed.
+
+    ``escalation_check(answer, prompt)`` returns True when the fast model's
+    answer should not be used, e.g. because it is empty, uncertain or fails
+    validation against the prompt. The stronger model is also used if the
+    fast model raises.
+
+    Args:
+        fast_llm: Small, cheap model tried first (e.g. ``main_llm``).
+        strong_llm: Larger model used on escalation (e.g. ``clinical_llm``);
+            required, a ValueError is raised if it is None.
+        escalation_check: Callable ``(answer: str, prompt) -> bool``;
+            defaults to ``default_escalation_check``.
+
+    Example:
+        ```python
+        cascade = ModelCascade(small_llm, clinical_llm, lambda answer, _: len(answer) < 20)
+        chain = prompt | cascade.as_runnable() | add_card
+        cascade.as_dict()  # {"requests": 10, "escalations": 2, "escalation_rate": 0.2}
+        ```
+    """
+
+    def __init__(
+        self,
+        fast_llm: Any,
+        strong_llm: Any,
+        escalation_check: Callable[[str, Any], bool] | None = None,
+    ):
+        if strong_llm is None:
+            raise ValueError("ModelCascade needs a strong_llm to escalate to (e.g. clinical_llm)")
+        self.fast_llm = fast_llm
+        self.strong_llm = strong_llm
+        self.escalation_check = escalation_check or default_escalation_check
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.escalations = 0
+
+    def _record(self, escalated: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            self.escalations += escalated
+
+    def invoke(self, prompt: Any, config: RunnableConfig | None = None) -> str:
+        try:
+            answer: str = (self.fast_llm | StrOutputParser()).invoke(prompt, config)
+            if not self.escalation_check(answer, prompt):
+                self._record(False)
+                return answer
+        except Exception as e:
+            logger.warning("Fast model failed, escalating: %s", e)
+        self._record(True)
+        return cast(str, (self.strong_llm | StrOutputParser()).invoke(prompt, config))
+
+    async def ainvoke(self, prompt: Any, config: RunnableConfig | None = None) -> str:
+        try:
+            answer: str = await (self.fast_llm | StrOutputParser()).ainvoke(prompt, config)
+            if not self.escalation_check(answer, prompt):
+                self._record(False)
+                return answer
+        except Exception as e:
+            logger.warning("Fast model failed, escalating: %s", e)
+        self._record(True)
+        return cast(str, await (self.strong_llm | StrOutputParser()).ainvoke(prompt, config))
+
+    def as_runnable(self) -> RunnableLambda:
+        """Wrap the cascade for use inside an LCEL chain."""
+        return RunnableLambda(self.invoke, afunc=self.ainvoke, name="ModelCascade")
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "escalations": self.escalations,
+                "escalation_rate": (self.escalations / self.requests if self.requests else 0.0),
+            }
@@ -14,8 +14,9 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
-from typing import Any
 import logging
+from typing import Any
+
 from kink import inject
 from langchain_community.tools import StructuredTool
 from langchain_core.output_parsers import StrOutputParser
@@ -23,16 +24,16 @@ from langchain_core.runnables import RunnablePassthrough
 from langchain_mcp_adapters.tools import to_fastmcp
 from pydantic import BaseModel, ConfigDict
 
+from .cascade import ModelCascade
 from .cds_hook.generate_cards import add_card
 from .cds_hook.request_parser import get_context
 from .mydi import camel_to_snake, get_di
 
-
 logger = logging.getLogger(__name__)
 
+
 @inject
 class BaseChain:
-
     class ChainInput(BaseModel):
         """
         Input model for BaseChain.
@@ -54,6 +55,8 @@ class BaseChain:
         grounding_llm=None,
         input_type=None,
         output_type=None,
+        cascade=None,
+        escalation_check=None,
     ):
         self._prompt = prompt or get_di("main_prompt")
         self._main_llm = main_llm or get_di("base_main_llm")
@@ -63,6 +66,9 @@ class BaseChain:
         self._output_type = output_type
         self._name = name
         self._description = description
+        self._cascade = cascade if cascade is not None else get_di("base_cascade")
+        self._escalation_check = escalation_check or get_di("base_escalation_check")
+        self._model_cascade = None
         self.init_prompt()
 
     @property
@@ -81,20 +87,36 @@ class BaseChain:
         )
 
         RunnableParallel / RunnablePassthrough / RunnableSequential / RunnableLambda / RunnableMap / RunnableBranch
+
+        With cascade enabled, main_llm answers first and clinical_llm is only
+        called when the escalation check rejects that answer (see `model_cascade`).
         """
         if self.prompt is None:
             raise ValueError("Prompt must not be None when building the chain.")
+        _llm = self.model_cascade.as_runnable() if self.cascade else self.main_llm | StrOutputParser()
         _sequential = (
             RunnablePassthrough()
-            | get_context  # function to extract context from input # type: ignore
+            | get_context  # function to extract context from input
             | self.prompt  # "{input}""
-            | self.main_llm
-            | StrOutputParser()
+            | _llm
             | add_card  # function to wrap output in CDSHookCard
         )
         chain = _sequential.with_types(input_type=self.input_type)
         return chain
 
+    @property
+    def streaming_chain(self):
+        """Get a runnable that streams plain text tokens from main_llm.
+
+        Same steps as `chain` without the final `add_card`, which needs the
+        complete text. Use this for LangServe `/stream` so the clinician sees
+        text as soon as the model starts generating.
+        """
+        if self.prompt is None:
+            raise ValueError("Prompt must not be None when building the chain.")
+        _sequential = RunnablePassthrough() | get_context | self.prompt | self.main_llm | StrOutputParser()
+        return _sequential.with_types(input_type=self.input_type)
+
     @property
     def prompt(self):
         return self._prompt
@@ -117,6 +139,17 @@ class BaseChain:
             self._grounding_llm = get_di("base_grounding_llm")
         return self._grounding_llm
 
+    @property
+    def cascade(self):
+        return bool(self._cascade)
+
+    @property
+    def model_cascade(self):
+        """The ModelCascade from main_llm to clinical_llm, with its escalation counters."""
+        if self._model_cascade is None:
+            self._model_cascade = ModelCascade(self.main_llm, self.clinical_llm, self._escalation_check)
+        return self._model_cascade
+
     @property
     def input_type(self):
         if self._input_type is None:
@@ -146,15 +179,21 @@ class BaseChain:
     @main_llm.setter
     def main_llm(self, value):
         self._main_llm = value
+        self._model_cascade = None
 
     @clinical_llm.setter
     def clinical_llm(self, value):
         self._clinical_llm = value
+        self._model_cascade = None
 
     @grounding_llm.setter
     def grounding_llm(self, value):
         self._grounding_llm = value
 
+    @cascade.setter
+    def cascade(self, value):
+        self._cascade = value
+
     @input_type.setter
     def input_type(self, value):
         self._input_type = value
@@ -217,7 +256,7 @@ class BaseChain:
 
         def _run(**kwargs):
             # Invoke the underlying runnable chain with provided kwargs
-            return self.chain.invoke(kwargs)  # type: ignore
+            return self.chain.invoke(kwargs)
 
         return StructuredTool.from_function(
             func=_run,
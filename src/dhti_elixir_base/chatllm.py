@@ -1,15 +1,33 @@
-import json
-from collections.abc import Mapping
-from typing import Any, Sequence
+import hashlib
+from collections.abc import AsyncIterator, Iterator, Mapping, Sequence
+from time import perf_counter
+from typing import Any, cast
 
-import requests
+from langchain_core.language_models import LanguageModelInput
 from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.messages import AIMessage, BaseMessage
-from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.messages.ai import UsageMetadata
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
 from pydantic import Field
 
+from .attachments import AttachmentStore
+from .cache.exact import payload_key
+from .mydi import get_di
+from .tool_calling import (
+    format_message,
+    format_tool_choice,
+    format_tools,
+    parse_tool_call_chunks,
+    parse_tool_calls,
+)
+from .transport import HttpModelClient, content_or_raw, extract_content
+from .transport.hedging import HedgePolicy, ahedged_call, hedged_call
+from .transport.sse import extract_delta, is_final
+from .transport.usage import extract_usage, stream_usage, token_usage, usage_info
 
-class BaseChatLLM(BaseChatModel):
+
+class BaseChatLLM(HttpModelClient, BaseChatModel):
     """
     BaseChatLLM extends BaseChatModel to support chat-based LLM invocations.
 
@@ -25,6 +43,17 @@ class BaseChatLLM(BaseChatModel):
         top_p: Nucleus sampling parameter (default: 0.8)
         top_k: Top-k sampling parameter (default: 40)
         timeout: Request timeout in seconds (default: 60)
+        transport: Optional HttpTransport; defaults to the shared pool from DI
+        hedge_policy: Optional HedgePolicy (or DI ``llm_hedge_policy``) that sends a
+            duplicate request when a response is slower than the latency percentile
+        attachment_store: Optional AttachmentStore (or DI ``llm_attachment_store``)
+            that resolves ``attachment://`` image references and keeps inline images
+            so they are encoded or uploaded once
+        prefix_cache: Send prefix-cache hints (``cache_prompt``, ``prompt_cache_key``)
+            and route each conversation to the same replica, so the server can reuse
+            the KV cache of the history it has already seen
+        prefix_cache_slots: Number of llama.cpp server slots; when set, each
+            conversation is pinned to one slot with ``id_slot``
 
     Example:
         ```python
@@ -61,10 +90,14 @@ class BaseChatLLM(BaseChatModel):
     max_output_tokens: int | None = 512
     repeat_last_n: int | None = 64
     repeat_penalty: float | None = 1.18
+    hedge_policy: Any = Field(default=None, exclude=True)
+    attachment_store: Any = Field(default=None, exclude=True)
+    prefix_cache: bool = False
+    prefix_cache_slots: int | None = None
 
-    def __init__(self, base_url: str, model: str, **kwargs):
+    def __init__(self, base_url: str | list[str], model: str, **kwargs: Any):
         super().__init__(**kwargs)
-        self.base_url = base_url
+        self._set_endpoints(base_url)
         self.model = model
         self.params = {**self._get_model_default_parameters, **kwargs}
 
@@ -96,45 +129,105 @@ class BaseChatLLM(BaseChatModel):
     def _llm_type(self) -> str:
         return "dhti-chat"
 
-    def _prepare_payload(self, messages: list[BaseMessage]) -> dict:
+    def _get_hedge_policy(self) -> HedgePolicy | None:
+        return cast(HedgePolicy | None, self.hedge_policy or get_di("llm_hedge_policy"))
+
+    def _get_attachment_store(self) -> AttachmentStore | None:
+        store = self.attachment_store if self.attachment_store is not None else get_di("llm_attachment_store")
+        return cast(AttachmentStore | None, store)
+
+    def _send(self, payload: dict, tried: list[str] | None = None) -> dict:
+        """Send the payload, hedging slow requests when a HedgePolicy is set.
+
+        The hedge avoids every replica the first request used, and is only
+        sent when another healthy replica exists.
+        """
+        policy = self._get_hedge_policy()
+        send = super()._send
+        if policy is None:
+            return send(payload, tried)
+        used: list[str] = list(tried or [])
+        balancer = self._get_balancer(payload)
+        return hedged_call(
+            lambda: send(payload, used),
+            policy,
+            hedge=lambda: send(payload, list(used)),
+            can_hedge=lambda: balancer.has_alternative(used),
+        )
+
+    async def _asend(self, payload: dict, tried: list[str] | None = None) -> dict:
+        """Async counterpart of ``_send``; the losing request is cancelled."""
+        policy = self._get_hedge_policy()
+        send = super()._asend
+        if policy is None:
+            return await send(payload, tried)
+        used: list[str] = list(tried or [])
+        balancer = self._get_balancer(payload)
+        return await ahedged_call(
+            lambda: send(payload, used),
+            policy,
+            hedge=lambda: send(payload, list(used)),
+            can_hedge=lambda: balancer.has_alternative(used),
+        )
+
+    def _prepare_payload(self, messages: list[BaseMessage], **kwargs: Any) -> dict:
         """
         Prepare the API payload from a list of messages.
 
         Args:
-            messages: List of BaseMessage objects (HumanMessage, AIMessage, SystemMessage, etc.)
+            messages: List of BaseMessage objects (HumanMessage, AIMessage, SystemMessage,
+                ToolMessage, etc.)
+            **kwargs: ``tools``, ``tool_choice`` and ``parallel_tool_calls`` set by
+                ``bind_tools`` are copied into the payload
 
         Returns:
             Dictionary payload for the API request
         """
-        # Convert LangChain messages to API format
-        api_messages = []
-        for message in messages:
-            # Extract role and content from the message
-            if hasattr(message, "type"):
-                # Map LangChain message types to API roles
-                role_map = {
-                    "human": "user",
-                    "ai": "assistant",
-                    "system": "system",
-                }
-                role = role_map.get(message.type, "user")
-            else:
-                role = "user"
-
-            api_messages.append({"role": role, "content": message.content})
-
-        return {
+        store = self._get_attachment_store()
+        payload = {
             "model": self.model,
             "options": self._get_model_default_parameters,
-            "messages": api_messages,
+            # Convert LangChain messages to API format, including tool calls,
+            # tool results and attachment references
+            "messages": [format_message(message, store) for message in messages],
         }
+        for key in ("tools", "tool_choice", "parallel_tool_calls"):
+            if kwargs.get(key) is not None:
+                payload[key] = kwargs[key]
+        if self.prefix_cache:
+            payload.update(self._prefix_cache_hints(payload["messages"], kwargs.get("session_id")))
+        return payload
+
+    def _prefix_cache_hints(self, messages: list[dict], session_id: str | None) -> dict:
+        """
+        Request fields that let the server reuse the KV cache of a conversation.
+
+        Messages are serialized deterministically (tool schemas and attachments
+        are cached), so every turn starts with the same bytes as the previous
+        one. The conversation is identified by ``session_id`` (an ``invoke``
+        keyword) or else by its system messages and first user turn, which do
+        not change as the conversation grows. ``prompt_cache_key`` also keeps
+        the conversation on one replica (see ``LoadBalancer``).
+        """
+        if session_id is None:
+            opening = []
+            for message in messages:
+                opening.append(message)
+                if message["role"] != "system":
+                    break
+            session_id = payload_key({"model": self.model, "messages": opening})[:32]
+        hints: dict[str, Any] = {"cache_prompt": True, "prompt_cache_key": session_id}
+        if self.prefix_cache_slots:
+            digest = hashlib.sha256(session_id.encode("utf-8")).digest()
+            hints["id_slot"] = int.from_bytes(digest[:8], "big") % self.prefix_cache_slots
+        return hints
 
     def _generate(
         self,
         messages: list[BaseMessage],
         stop: list[str] | None = None,
         run_manager: Any | None = None,
-        **kwargs,
+        **kwargs: Any,
     ) -> ChatResult:
         """
         Generate a chat response from a list of messages.
@@ -148,62 +241,196 @@ class BaseChatLLM(BaseChatModel):
         Returns:
             ChatResult containing the generated response
         """
-        payload = self._prepare_payload(messages)
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}",
+        payload = self._prepare_payload(messages, **kwargs)
+        start = perf_counter()
+        data = self._post(payload, self._patient_id(run_manager, kwargs))
+        return self._create_chat_result(data, perf_counter() - start)
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """
+        Native async chat generation over the pooled ``httpx.AsyncClient``.
+
+        Args:
+            messages: List of BaseMessage objects representing the conversation history
+            stop: Optional list of strings to stop generation when encountered
+            run_manager: Optional async run manager for callbacks and tracing
+            **kwargs: Additional keyword arguments
+
+        Returns:
+            ChatResult containing the generated response
+        """
+        payload = self._prepare_payload(messages, **kwargs)
+        start = perf_counter()
+        data = await self._apost(payload, self._patient_id(run_manager, kwargs))
+        return self._create_chat_result(data, perf_counter() - start)
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any | None = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        """
+        Stream the response token by token from an SSE/NDJSON endpoint.
+
+        The payload is sent with ``"stream": true``; OpenAI/vLLM, llama.cpp and
+        Ollama chunk formats are understood. OpenAI-compatible servers are asked
+        for a closing usage chunk (``stream_options.include_usage``); the token
+        counts of the stream are yielded last as an empty chunk carrying
+        ``usage_metadata``.
+
+        Args:
+            messages: List of BaseMessage objects representing the conversation history
+            stop: Optional list of strings to stop generation when encountered
+            run_manager: Optional run manager for callbacks and tracing
+            **kwargs: Additional keyword arguments
+
+        Yields:
+            ChatGenerationChunk for each piece of generated text
+        """
+        payload = self._prepare_stream_payload(messages, **kwargs)
+        usage: dict = {}
+        for event in self._stream_events(payload):
+            usage = stream_usage(event) or usage
+            chunk = self._create_chunk(event)
+            if chunk is None:
+                continue
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        if usage:
+            yield self._usage_chunk(usage)
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        """Async counterpart of ``_stream`` over the pooled ``httpx.AsyncClient``."""
+        payload = self._prepare_stream_payload(messages, **kwargs)
+        usage: dict = {}
+        async for event in self._astream_events(payload):
+            usage = stream_usage(event) or usage
+            chunk = self._create_chunk(event)
+            if chunk is None:
+                continue
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        if usage:
+            yield self._usage_chunk(usage)
+
+    def _prepare_stream_payload(self, messages: list[BaseMessage], **kwargs: Any) -> dict:
+        """``_prepare_payload`` for a stream that reports its token usage at the end."""
+        return {
+            **self._prepare_payload(messages, **kwargs),
+            "stream": True,
+            "stream_options": {"include_usage": True},
         }
-        resp = requests.post(
-            self.base_url, headers=headers, json=payload, timeout=self.timeout  # type: ignore
+
+    def _usage_chunk(self, usage: dict) -> ChatGenerationChunk:
+        """An empty chunk carrying the token usage of a finished stream."""
+        return ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=_usage_metadata(usage)))
+
+    def _create_chunk(self, event: dict) -> ChatGenerationChunk | None:
+        """Convert one streamed event into a ChatGenerationChunk (None if it carries nothing)."""
+        delta = extract_delta(event) or ""
+        final = is_final(event)
+        tool_chunks = parse_tool_call_chunks(event)
+        if not delta and not final and not tool_chunks:
+            return None
+        generation_info = None
+        if final:
+            choices = event.get("choices") or [{}]
+            generation_info = {
+                "finish_reason": choices[0].get("finish_reason")
+                or event.get("done_reason")
+                or event.get("stop_type")
+                or "stop"
+            }
+        return ChatGenerationChunk(
+            message=AIMessageChunk(content=delta, tool_call_chunks=tool_chunks),
+            generation_info=generation_info,
+        )
+
+    def _create_chat_result(self, data: dict, latency: float = 0.0) -> ChatResult:
+        """Wrap a decoded API response in a ChatResult.
+
+        Token counts, server timings and ``latency`` go to ``generation_info``;
+        token counts also go to ``llm_output["token_usage"]`` and the message's
+        ``usage_metadata``.
+        """
+        tool_calls, invalid_tool_calls = parse_tool_calls(data)
+        # Tool-calling turns usually carry no text; otherwise fall back to raw
+        # JSON if the assistant's message cannot be extracted
+        message_content = (extract_content(data) or "") if tool_calls or invalid_tool_calls else content_or_raw(data)
+        usage = extract_usage(data)
+        tokens = token_usage(usage)
+
+        # Create an AIMessage with the response and any parallel tool calls
+        message = AIMessage(
+            content=message_content,
+            tool_calls=tool_calls,
+            invalid_tool_calls=invalid_tool_calls,
         )
-        try:
-            resp.raise_for_status()
-        except Exception as e:
-            raise RuntimeError(
-                f"API request failed: {e}; status={resp.status_code}; body={resp.text}"
-            )
-
-        data = resp.json()
-
-        # Parse the response to extract the assistant's message
-        message_content = None
-        if "choices" in data and len(data["choices"]) > 0:
-            choice = data["choices"][0]
-            # Support both "message" and direct "text" formats
-            if (
-                isinstance(choice, dict)
-                and "message" in choice
-                and isinstance(choice["message"], dict)
-            ):
-                message_content = choice["message"].get("content")
-            elif "text" in choice:
-                message_content = choice.get("text")
-
-        # If we couldn't extract content, use raw JSON as fallback
-        if message_content is None:
-            message_content = json.dumps(data)
-
-        # Create an AIMessage with the response
-        message = AIMessage(content=message_content)
+        if tokens:
+            message.usage_metadata = _usage_metadata(usage)
 
         # Wrap in ChatGeneration and ChatResult
-        generation = ChatGeneration(message=message)
-        return ChatResult(generations=[generation])
+        generation = ChatGeneration(message=message, generation_info=usage_info(usage, latency))
+        return ChatResult(
+            generations=[generation],
+            llm_output={"token_usage": tokens, "model_name": self.model},
+        )
+
+    def _combine_llm_outputs(self, llm_outputs: list[dict | None]) -> dict:
+        """Sum token usage over the prompts of a ``generate`` call."""
+        totals: dict[str, int] = {}
+        for output in llm_outputs:
+            for key, value in ((output or {}).get("token_usage") or {}).items():
+                totals[key] = totals.get(key, 0) + value
+        return {"token_usage": totals, "model_name": self.model}
 
     def bind_tools(
-        self, tools: Sequence[Any], tool_choice: Any = None, **kwargs
-    ) -> "BaseChatLLM":
+        self, tools: Sequence[Any], tool_choice: Any = None, **kwargs: Any
+    ) -> Runnable[LanguageModelInput, AIMessage]:
         """
         Bind external tools or functions to the LLM instance.
 
+        The tool schemas are serialized once (and cached per tool) and sent as
+        ``tools`` with every request; all tool calls in a response, including
+        parallel ones, are parsed into ``AIMessage.tool_calls``.
+
         Args:
             tools: Sequence of tool objects, types, or callables to be used by the LLM.
-            tool_choice: Optional tool selection logic or identifier.
-            **kwargs: Additional keyword arguments for tool binding.
+            tool_choice: Optional tool selection logic or identifier
+                ("auto", "none", "any"/"required", True, or a tool name).
+            **kwargs: Additional keyword arguments for tool binding, e.g.
+                ``parallel_tool_calls=False``.
         Returns:
-            self (to allow chaining)
+            A runnable that calls this model with the tools bound
         """
-        if not hasattr(self, "_bound_tools"):
-            self._bound_tools = []
-        self._bound_tools.extend(tools)
-        return self
+        if tool_choice is not None:
+            kwargs["tool_choice"] = format_tool_choice(tool_choice)
+        return self.bind(tools=format_tools(tools), **kwargs)
+
+
+def _usage_metadata(usage: dict) -> UsageMetadata:
+    """LangChain ``usage_metadata`` of a usage dict from ``extract_usage``."""
+    metadata: UsageMetadata = {
+        "input_tokens": usage.get("prompt_tokens", 0),
+        "output_tokens": usage.get("completion_tokens", 0),
+        "total_tokens": usage.get("total_tokens", 0),
+    }
+    if "cached_tokens" in usage:
+        metadata["input_token_details"] = {"cache_read": usage["cached_tokens"]}
+    return metadata
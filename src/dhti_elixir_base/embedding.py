@@ -1,49 +1,379 @@
-import json
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, cast
 
-import requests
 from langchain_core.embeddings import Embeddings
 
+from .cache.embedding import EmbeddingCache
+from .mydi import get_di
+from .rag.vectors import QuantizedMatrix, as_float32
+from .transport import decode_response
+from .transport.balancer import LoadBalancer
+from .transport.pool import HttpTransport, get_transport
+from .transport.ratelimit import estimate_tokens
+from .transport.resilience import RetryPolicy, asend_with_retry, send_with_retry
+
+logger = logging.getLogger(__name__)
+
+RETURN_TYPES = ("list", "float32", "int8")
+
+
+def split_batches(texts: list[str], max_batch_size: int, max_batch_chars: int) -> list[list[str]]:
+    """Split texts, in order, into batches bounded by count and total characters.
+
+    A single text longer than ``max_batch_chars`` gets a batch of its own.
+    """
+    batches: list[list[str]] = []
+    current: list[str] = []
+    chars = 0
+    for text in texts:
+        if current and (len(current) >= max_batch_size or chars + len(text) > max_batch_chars):
+            batches.append(current)
+            current, chars = [], 0
+        current.append(text)
+        chars += len(text)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _dedupe(texts: list[str]) -> tuple[list[str], list[int]]:
+    """Distinct texts in first-seen order, and each input's position among them."""
+    index: dict[str, int] = {}
+    positions = [index.setdefault(text, len(index)) for text in texts]
+    return list(index), positions
+
+
+def _unsort(order: list[int], vectors: list[list[float]]) -> list[list[float]]:
+    """Put vectors computed in ``order`` back into input order."""
+    result: list[Any] = [None] * len(order)
+    for n, vector in zip(order, vectors, strict=True):
+        result[n] = vector
+    return result
+
+
+class EmbeddingStats:
+    """Texts requested from a BaseEmbedding and embeddings actually sent to the server.
+
+    ``saved`` counts the texts answered from an in-call duplicate or the
+    cache; ``last_call`` holds the counts of the most recent call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.texts = 0
+        self.duplicates = 0
+        self.cached = 0
+        self.sent = 0
+        self.last_call: dict = {}
+
+    def record(self, texts: int, unique: int, sent: int) -> dict:
+        call = {
+            "texts": texts,
+            "duplicates": texts - unique,
+            "cached": unique - sent,
+            "sent": sent,
+            "saved": texts - sent,
+        }
+        with self._lock:
+            self.calls += 1
+            self.texts += texts
+            self.duplicates += call["duplicates"]
+            self.cached += call["cached"]
+            self.sent += sent
+            self.last_call = call
+        return call
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "texts": self.texts,
+                "duplicates": self.duplicates,
+                "cached": self.cached,
+                "sent": self.sent,
+                "saved": self.texts - self.sent,
+                "last_call": dict(self.last_call),
+            }
+
+
+def _vectors(data: dict, count: int) -> list[list[float]]:
+    """Embeddings from an Ollama (``embeddings``) or OpenAI (``data``) response."""
+    if "embeddings" in data:
+        embeddings = data["embeddings"]
+    elif isinstance(data.get("data"), list):
+        items = sorted(data["data"], key=lambda item: item.get("index", 0))
+        embeddings = [item["embedding"] for item in items]
+    else:
+        raise ValueError(f"API response missing 'embeddings' key: {data}")
+    if len(embeddings) != count:
+        raise ValueError(f"Expected {count} embeddings, got {len(embeddings)}")
+    return cast(list[list[float]], embeddings)
+
 
 class BaseEmbedding(Embeddings):
-    """Base class for DHTI embeddings."""
+    """Base class for DHTI embeddings.
+
+    Texts are sent in sub-batches of at most ``max_batch_size`` texts and
+    ``max_batch_chars`` characters, up to ``max_concurrency`` at a time over the
+    pooled ``HttpTransport`` shared with the LLM clients, and the vectors are
+    returned in input order. Each sub-batch is retried on its own under
+    ``retry_policy`` (or DI ``llm_retry_policy``), so one failed request does
+    not resend the whole document; a sub-batch the server rejects as too large
+    (HTTP 413) is split in half.
+
+    ``aembed_documents`` and ``aembed_query`` do the same on the pooled
+    ``httpx.AsyncClient`` without blocking the event loop, so retrieval can
+    overlap with other I/O such as FHIR requests. Cancelling the caller
+    cancels the sub-batches still in flight.
+
+    With an ``EmbeddingCache`` (``cache`` or DI ``base_embedding_cache``),
+    only texts without a cached vector for this model are sent, and every
+    returned vector is float32-rounded whether it was cached or not.
+
+    Repeated texts within a call (boilerplate headers, disclaimers) are sent
+    once and fanned back out, and texts are sorted by length before being
+    packed into sub-batches so each request pads less on the server.
+    ``stats`` counts how many embeddings each call saved.
+
+    ``return_type`` selects what the embed methods return: ``"list"`` (the
+    LangChain ``Embeddings`` contract), ``"float32"`` for a contiguous NumPy
+    matrix (a single vector for queries), or ``"int8"`` for a
+    ``rag.vectors.QuantizedMatrix`` with per-row scales. Arrays can be scored
+    directly with ``rag.vectors.cosine_scores`` and ``top_k``.
+
+    Args:
+        base_url: The embeddings endpoint URL.
+        model: The embedding model name.
+        api_key: Authentication key for API access.
+        max_batch_size: Most texts per request.
+        max_batch_chars: Most characters per request.
+        max_concurrency: Sub-batches in flight at once.
+        timeout: Request timeout in seconds.
+        connect_timeout: Timeout of the TCP/TLS connect phase in seconds.
+        transport: Optional HttpTransport; defaults to the shared pool from DI.
+        retry_policy: Optional RetryPolicy for each sub-batch.
+        cache: Optional EmbeddingCache consulted before any request.
+        return_type: ``"list"``, ``"float32"`` or ``"int8"``.
+    """
 
     base_url: str
     model: str
     api_key: str
 
-    def __init__(self, base_url: str, model: str, api_key: str):
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        api_key: str,
+        max_batch_size: int = 64,
+        max_batch_chars: int = 100_000,
+        max_concurrency: int = 4,
+        timeout: float = 60,
+        connect_timeout: float | None = 5.0,
+        transport: HttpTransport | None = None,
+        retry_policy: RetryPolicy | None = None,
+        cache: EmbeddingCache | None = None,
+        return_type: str = "list",
+    ):
+        if return_type not in RETURN_TYPES:
+            raise ValueError(f"Unknown return_type: {return_type}")
         self.base_url = base_url
         self.model = model
         self.api_key = api_key
+        self.max_batch_size = max_batch_size
+        self.max_batch_chars = max_batch_chars
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.transport = transport
+        self.retry_policy = retry_policy
+        self.cache = cache
+        self.return_type = return_type
+        self.stats = EmbeddingStats()
 
-    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+    def embed_documents(self, texts: list[str]) -> Any:
         """Embed a list of documents."""
-        return self._get_embeddings(texts)
+        return self._convert(self._get_embeddings(texts))
 
-    def embed_query(self, text: str) -> list[float]:
+    def embed_query(self, text: str) -> Any:
         """Embed a single query."""
         embeddings = self._get_embeddings([text])
-        return embeddings[0]
+        return self._convert(embeddings)[0]
 
-    def _get_embeddings(self, texts: list[str]) -> list[list[float]]:
-        """Helper method to get embeddings for a list of texts."""
-        headers = {
+    async def aembed_documents(self, texts: list[str]) -> Any:
+        """Embed a list of documents without blocking the event loop."""
+        return self._convert(await self._aget_embeddings(texts))
+
+    async def aembed_query(self, text: str) -> Any:
+        """Embed a single query without blocking the event loop."""
+        embeddings = await self._aget_embeddings([text])
+        return self._convert(embeddings)[0]
+
+    def _convert(self, embeddings: list[list[float]]) -> Any:
+        """Apply ``return_type`` to the embeddings of one call."""
+        if self.return_type == "float32":
+            return as_float32(embeddings)
+        if self.return_type == "int8":
+            return QuantizedMatrix.quantize(embeddings)
+        return embeddings
+
+    def _get_transport(self) -> HttpTransport:
+        return self.transport or get_transport()
+
+    def _get_retry_policy(self) -> RetryPolicy:
+        return self.retry_policy or get_di("llm_retry_policy") or RetryPolicy()
+
+    def _get_cache(self) -> EmbeddingCache | None:
+        if self.cache is not None:
+            return self.cache
+        return cast(EmbeddingCache | None, get_di("base_embedding_cache"))
+
+    def _headers(self) -> dict:
+        return {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}",
         }
-        payload = {
-            "model": self.model,
-            "input": texts,
-        }
-        response = requests.post(
-            self.base_url,
-            headers=headers,
-            data=json.dumps(payload),
+
+    def _get_embeddings(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts, sending each distinct text without a cached vector once."""
+        unique, positions = _dedupe(texts)
+        cache = self._get_cache()
+        vectors = self._lookup(cache, unique)
+        missing = [n for n, vector in enumerate(vectors) if vector is None]
+        if missing:
+            fetched = self._fetch_embeddings([unique[n] for n in missing])
+            self._fill(cache, unique, vectors, missing, fetched)
+        return self._fan_out(positions, vectors, len(missing))
+
+    async def _aget_embeddings(self, texts: list[str]) -> list[list[float]]:
+        """Async counterpart of ``_get_embeddings``."""
+        unique, positions = _dedupe(texts)
+        cache = self._get_cache()
+        vectors = self._lookup(cache, unique)
+        missing = [n for n, vector in enumerate(vectors) if vector is None]
+        if missing:
+            fetched = await self._afetch_embeddings([unique[n] for n in missing])
+            self._fill(cache, unique, vectors, missing, fetched)
+        return self._fan_out(positions, vectors, len(missing))
+
+    def _lookup(self, cache: EmbeddingCache | None, texts: list[str]) -> list[list[float] | None]:
+        if cache is None:
+            return [None] * len(texts)
+        return cache.get_many(self.model, texts)
+
+    def _fill(
+        self,
+        cache: EmbeddingCache | None,
+        texts: list[str],
+        vectors: list[list[float] | None],
+        missing: list[int],
+        fetched: list[list[float]],
+    ) -> None:
+        if cache is not None:
+            fetched = cache.set_many(self.model, [texts[n] for n in missing], fetched)
+        for n, vector in zip(missing, fetched, strict=True):
+            vectors[n] = vector
+
+    def _fan_out(self, positions: list[int], vectors: list[Any], sent: int) -> list[list[float]]:
+        """One vector per input text; repeated texts get their own copy."""
+        call = self.stats.record(len(positions), len(vectors), sent)
+        if call["saved"]:
+            logger.debug("Embedded %(texts)d texts, sent %(sent)d", call)
+        seen: set[int] = set()
+        result = []
+        for position in positions:
+            vector = vectors[position]
+            result.append(list(vector) if position in seen else vector)
+            seen.add(position)
+        return result
+
+    def _fetch_embeddings(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts in length-sorted sub-batches sent concurrently, keeping the input order."""
+        if not texts:
+            return []
+        order, batches = self._pack(texts)
+        if len(batches) == 1:
+            return _unsort(order, self._embed_batch(batches[0]))
+        workers = min(self.max_concurrency, len(batches))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(self._embed_batch, batches))
+        return _unsort(order, [vector for batch in results for vector in batch])
+
+    def _pack(self, texts: list[str]) -> tuple[list[int], list[list[str]]]:
+        """Sort texts by length and split them into sub-batches.
+
+        Texts of similar length share a request, so the server pads each
+        batch less, and short texts pack densely under ``max_batch_chars``.
+        """
+        order = sorted(range(len(texts)), key=lambda n: len(texts[n]))
+        ordered = [texts[n] for n in order]
+        return order, split_batches(ordered, self.max_batch_size, self.max_batch_chars)
+
+    async def _afetch_embeddings(self, texts: list[str]) -> list[list[float]]:
+        """Async counterpart of ``_fetch_embeddings``."""
+        if not texts:
+            return []
+        order, batches = self._pack(texts)
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+
+        async def embed(batch: list[str]) -> list[list[float]]:
+            async with semaphore:
+                return await self._aembed_batch(batch)
+
+        tasks = [asyncio.ensure_future(embed(batch)) for batch in batches]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            # A failed sub-batch (or a cancelled caller) stops the others
+            for task in tasks:
+                task.cancel()
+            raise
+        return _unsort(order, [vector for batch in results for vector in batch])
+
+    def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        """POST one sub-batch with retries; split it if the server finds it too large."""
+        payload: dict[str, Any] = {"model": self.model, "input": texts}
+        transport = self._get_transport()
+        # The endpoint's rate limiter (shared with the LLM clients) admits each attempt
+        resp = send_with_retry(
+            lambda url: transport.post(
+                url,
+                headers=self._headers(),
+                json=payload,
+                timeout=self.timeout,
+                connect_timeout=self.connect_timeout,
+            ),
+            self._get_retry_policy(),
+            LoadBalancer([self.base_url]),
+            estimate_tokens(payload),
         )
-        response.raise_for_status()
-        resp_json = response.json()
-        if "embeddings" not in resp_json:
-            raise ValueError(f"API response missing 'embeddings' key: {resp_json}")
-        embeddings = resp_json["embeddings"]
-        # embeddings is a list of lists
-        return embeddings
+        if resp.status_code == 413 and len(texts) > 1:
+            half = len(texts) // 2
+            return self._embed_batch(texts[:half]) + self._embed_batch(texts[half:])
+        return _vectors(decode_response(resp), len(texts))
+
+    async def _aembed_batch(self, texts: list[str]) -> list[list[float]]:
+        """Async counterpart of ``_embed_batch``."""
+        payload: dict[str, Any] = {"model": self.model, "input": texts}
+        transport = self._get_transport()
+        resp = await asend_with_retry(
+            lambda url: transport.apost(
+                url,
+                headers=self._headers(),
+                json=payload,
+                timeout=self.timeout,
+                connect_timeout=self.connect_timeout,
+            ),
+            self._get_retry_policy(),
+            LoadBalancer([self.base_url]),
+            estimate_tokens(payload),
+        )
+        if resp.status_code == 413 and len(texts) > 1:
+            half = len(texts) // 2
+            first, second = await asyncio.gather(self._aembed_batch(texts[:half]), self._aembed_batch(texts[half:]))
+            return first + second
+        return _vectors(decode_response(resp), len(texts))
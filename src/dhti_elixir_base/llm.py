@@ -1,17 +1,43 @@
-import json
+import asyncio
 from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
 from typing import Any
 
-import requests
 from langchain_core.language_models.llms import LLM
-from pydantic import Field
+from langchain_core.outputs import Generation, LLMResult
+from pydantic import BaseModel, ConfigDict, Field
 
+from .transport import HttpModelClient, content_or_raw
+from .transport.usage import TOKEN_KEYS, extract_usage, usage_info
 
-class BaseLLM(LLM):
 
-    base_url: str | None = Field(
-        None, alias="base_url"
-    )  #! Alias is important when inheriting from LLM
+class BatchItem(BaseModel):
+    """Outcome of one prompt in BaseLLM.generate_batch.
+
+    Attributes:
+        index: Position of the prompt in the submitted list.
+        text: Generated text, or None if the prompt failed.
+        error: The exception raised for this prompt, if any.
+        latency: Wall-clock seconds spent on this prompt.
+        usage: Token counts and server timings reported for this prompt.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    index: int
+    text: str | None = None
+    error: Exception | None = None
+    latency: float = 0.0
+    usage: dict = Field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class BaseLLM(HttpModelClient, LLM):
+    base_url: str | None = Field(None, alias="base_url")  #! Alias is important when inheriting from LLM
     model: str | None = Field(None, alias="model")
     api_key: str | None = Field(None, alias="api_key")
     params: Mapping[str, Any] = Field(default_factory=dict, alias="params")
@@ -26,10 +52,11 @@ class BaseLLM(LLM):
     max_output_tokens: int | None = 512
     repeat_last_n: int | None = 64
     repeat_penalty: float | None = 1.18
+    max_concurrency: int = 8  # prompts in flight at once in batch/generate
 
-    def __init__(self, base_url: str, model: str, **kwargs):
+    def __init__(self, base_url: str | list[str], model: str, **kwargs: Any):
         super().__init__(**kwargs)
-        self.base_url = base_url
+        self._set_endpoints(base_url)
         self.model = model
         self.params = {**self._get_model_default_parameters, **kwargs}
 
@@ -74,7 +101,7 @@ class BaseLLM(LLM):
         prompt: str,
         stop: list[str] | None = None,
         run_manager: Any | None = None,
-        **kwargs,
+        **kwargs: Any,
     ) -> str:
         """
         Args:
@@ -85,38 +112,189 @@ class BaseLLM(LLM):
         Returns:
             The string generated by the model
         """
+        return self._complete(prompt, run_manager, **kwargs)[0]
+
+    async def _acall(
+        self,
+        prompt: str,
+        stop: list[str] | None = None,
+        run_manager: Any | None = None,
+        **kwargs: Any,
+    ) -> str:
+        """
+        Native async generation over the pooled ``httpx.AsyncClient``.
+
+        Args:
+            prompt: The prompt to pass into the model.
+            stop: A list of strings to stop generation when encountered
+            run_manager: Optional async run manager for callbacks and tracing
+
+        Returns:
+            The string generated by the model
+        """
+        return (await self._acomplete(prompt, run_manager, **kwargs))[0]
 
+    def _complete(self, prompt: str, run_manager: Any, **kwargs: Any) -> tuple[str, dict]:
+        """Generated text and usage (see ``transport.usage.extract_usage``) for a prompt."""
         payload = self._prepare_payload(prompt)
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}",
-        }
-        resp = requests.post(
-            self.base_url, headers=headers, json=payload, timeout=self.timeout  # type: ignore
-        )
+        data = self._post(payload, self._patient_id(run_manager, kwargs))
+        # Expecting structure like: { "choices": [ { "message": { "role":"assistant","content":"..." } } ] }
+        # Falls back to the raw JSON string for debugging
+        return content_or_raw(data), extract_usage(data)
+
+    async def _acomplete(self, prompt: str, run_manager: Any, **kwargs: Any) -> tuple[str, dict]:
+        payload = self._prepare_payload(prompt)
+        data = await self._apost(payload, self._patient_id(run_manager, kwargs))
+        return content_or_raw(data), extract_usage(data)
+
+    def generate_batch(
+        self,
+        prompts: list[str],
+        max_concurrency: int | None = None,
+        stop: list[str] | None = None,
+        **kwargs: Any,
+    ) -> list[BatchItem]:
+        """
+        Generate completions for many prompts concurrently with per-prompt isolation.
+
+        Unlike ``batch``, a failing prompt does not fail the whole run; its
+        BatchItem carries the exception instead.
+
+        Args:
+            prompts: The prompts to generate for.
+            max_concurrency: Ceiling on requests in flight (defaults to ``self.max_concurrency``).
+            stop: A list of strings to stop generation when encountered
+
+        Returns:
+            One BatchItem per prompt, in the same order as ``prompts``.
+        """
+        return self._run_batch(prompts, stop, None, max_concurrency, **kwargs)
+
+    async def agenerate_batch(
+        self,
+        prompts: list[str],
+        max_concurrency: int | None = None,
+        stop: list[str] | None = None,
+        **kwargs: Any,
+    ) -> list[BatchItem]:
+        """Async counterpart of ``generate_batch`` on a single event loop."""
+        return await self._arun_batch(prompts, stop, None, max_concurrency, **kwargs)
+
+    def _generate(
+        self,
+        prompts: list[str],
+        stop: list[str] | None = None,
+        run_manager: Any | None = None,
+        **kwargs: Any,
+    ) -> LLMResult:
+        # LLM._generate calls _call serially; fan out up to max_concurrency
+        # instead, still through _call when a subclass overrides it
+        items = self._run_batch(prompts, stop, run_manager, None, **kwargs)
+        return self._create_llm_result(items)
+
+    async def _agenerate(
+        self,
+        prompts: list[str],
+        stop: list[str] | None = None,
+        run_manager: Any | None = None,
+        **kwargs: Any,
+    ) -> LLMResult:
+        items = await self._arun_batch(prompts, stop, run_manager, None, **kwargs)
+        return self._create_llm_result(items)
+
+    def _timed_call(
+        self, index: int, prompt: str, stop: list[str] | None, run_manager: Any, **kwargs: Any
+    ) -> BatchItem:
+        start = perf_counter()
+        usage: dict = {}
         try:
-            resp.raise_for_status()
+            if type(self)._call is not BaseLLM._call:
+                # A subclass overrode _call, LangChain's extension point; honour it
+                text = self._call(prompt, stop, run_manager, **kwargs)
+            else:
+                text, usage = self._complete(prompt, run_manager, **kwargs)
         except Exception as e:
-            raise RuntimeError(
-                f"API request failed: {e}; status={resp.status_code}; body={resp.text}"
+            return BatchItem(index=index, error=e, latency=perf_counter() - start)
+        return BatchItem(index=index, text=text, latency=perf_counter() - start, usage=usage)
+
+    async def _atimed_call(
+        self,
+        semaphore: asyncio.Semaphore,
+        index: int,
+        prompt: str,
+        stop: list[str] | None,
+        run_manager: Any,
+        **kwargs: Any,
+    ) -> BatchItem:
+        async with semaphore:
+            start = perf_counter()
+            usage: dict = {}
+            try:
+                if type(self)._acall is not BaseLLM._acall:
+                    text = await self._acall(prompt, stop, run_manager, **kwargs)
+                elif type(self)._call is not BaseLLM._call:
+                    # Only the sync _call was overridden: run it off the event loop
+                    sync_manager = run_manager.get_sync() if run_manager else None
+                    text = await asyncio.to_thread(self._call, prompt, stop, sync_manager, **kwargs)
+                else:
+                    text, usage = await self._acomplete(prompt, run_manager, **kwargs)
+            except Exception as e:
+                return BatchItem(index=index, error=e, latency=perf_counter() - start)
+            return BatchItem(index=index, text=text, latency=perf_counter() - start, usage=usage)
+
+    def _run_batch(
+        self,
+        prompts: list[str],
+        stop: list[str] | None,
+        run_manager: Any,
+        max_concurrency: int | None,
+        **kwargs: Any,
+    ) -> list[BatchItem]:
+        workers = min(max_concurrency or self.max_concurrency, len(prompts))
+        if workers <= 1:
+            return [self._timed_call(i, p, stop, run_manager, **kwargs) for i, p in enumerate(prompts)]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(self._timed_call, i, p, stop, run_manager, **kwargs) for i, p in enumerate(prompts)]
+            return [future.result() for future in futures]
+
+    async def _arun_batch(
+        self,
+        prompts: list[str],
+        stop: list[str] | None,
+        run_manager: Any,
+        max_concurrency: int | None,
+        **kwargs: Any,
+    ) -> list[BatchItem]:
+        semaphore = asyncio.Semaphore(max(1, max_concurrency or self.max_concurrency))
+        return list(
+            await asyncio.gather(
+                *(self._atimed_call(semaphore, i, p, stop, run_manager, **kwargs) for i, p in enumerate(prompts))
             )
+        )
 
-        data = resp.json()
-        # Expecting structure like: { "choices": [ { "message": { "role":"assistant","content":"..." } } ] }
-        # Adapt this path if the API differs
-        if "choices" in data and len(data["choices"]) > 0:
-            choice = data["choices"][0]
-            # support both "message" and direct "text"
-            text = None
-            if (
-                isinstance(choice, dict)
-                and "message" in choice
-                and isinstance(choice["message"], dict)
-            ):
-                text = choice["message"].get("content")
-            elif "text" in choice:
-                text = choice.get("text")
-            if text is not None:
-                return text
-        # Fallback: return raw JSON string for debugging
-        return json.dumps(data)
+    def _create_llm_result(self, items: list[BatchItem]) -> LLMResult:
+        """Build an LLMResult, re-raising the first failure as LangChain expects.
+
+        Each generation carries its usage and latency in ``generation_info``;
+        ``llm_output["token_usage"]`` sums the token counts over all prompts.
+        """
+        for item in items:
+            if item.error is not None:
+                raise item.error
+        totals = {
+            key: sum(item.usage.get(key, 0) for item in items)
+            for key in TOKEN_KEYS
+            if any(key in item.usage for item in items)
+        }
+        return LLMResult(
+            generations=[
+                [
+                    Generation(
+                        text=item.text or "",
+                        generation_info=usage_info(item.usage, item.latency),
+                    )
+                ]
+                for item in items
+            ],
+            llm_output={"token_usage": totals, "model_name": self.model},
+        )
@@ -0,0 +1,298 @@
+"""Bulk ingestion of a directory or manifest of PDFs into the vectorstore.
+
+Files are read from disk (no base64 round trip per file), parsed in a shared
+process pool and split and indexed by ``ingest_pages`` with the DI
+``text_splitter`` and ``vectorstore``, several files at a time. Each finished
+file is recorded in a checkpoint database, so an interrupted run resumes where
+it stopped.
+
+Example:
+    ```bash
+    python -m dhti_elixir_base.rag.bulk ./guidelines --setup myapp.bootstrap --concurrency 8
+    ```
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from ..mydi import get_di
+from .pdf import parse_pages
+from .process import IngestStats, ingest_pages
+
+logger = logging.getLogger(__name__)
+
+
+class BulkItem:
+    """One file to ingest, with the metadata set on its chunks."""
+
+    def __init__(self, path: str | Path, filename: str | None = None, year: int = 0):
+        self.path = Path(path)
+        self.filename = filename or self.path.name
+        self.year = year
+
+    def __repr__(self) -> str:
+        return f"BulkItem({str(self.path)!r}, filename={self.filename!r}, year={self.year})"
+
+
+def scan_directory(root: str | Path, pattern: str = "*.pdf", year: int = 0) -> list[BulkItem]:
+    """Files under ``root`` (recursively) matching ``pattern``, in path order."""
+    return [BulkItem(path, year=year) for path in sorted(Path(root).rglob(pattern)) if path.is_file()]
+
+
+def read_manifest(path: str | Path, year: int = 0) -> list[BulkItem]:
+    """Files listed in a manifest; relative paths are relative to the manifest.
+
+    A ``.jsonl`` manifest has one object per line with ``path`` and optional
+    ``filename`` and ``year``; any other file lists one path per line, with
+    blank lines and ``#`` comments ignored.
+    """
+    path = Path(path)
+    items = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        entry = json.loads(line) if path.suffix == ".jsonl" else {"path": line}
+        items.append(
+            BulkItem(
+                path.parent / entry["path"],
+                filename=entry.get("filename"),
+                year=int(entry.get("year", year)),
+            )
+        )
+    return items
+
+
+def load_items(source: str | Path, pattern: str = "*.pdf", year: int = 0) -> list[BulkItem]:
+    """Items of a directory (see ``scan_directory``) or a manifest file."""
+    if Path(source).is_dir():
+        return scan_directory(source, pattern, year)
+    return read_manifest(source, year)
+
+
+class Checkpoint:
+    """Files already ingested, kept in SQLite so an interrupted run can resume.
+
+    A file is identified by its absolute path, size and modification time, so
+    a file that changed since it was ingested is ingested again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "key TEXT PRIMARY KEY, path TEXT NOT NULL, pages INTEGER NOT NULL, "
+                "chunks INTEGER NOT NULL, seconds REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def key(path: Path) -> str:
+        stat = path.stat()
+        return f"{path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def done(self, key: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM files WHERE key = ?", (key,)).fetchone() is not None
+
+    def record(self, key: str, path: Path, stats: IngestStats) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                (key, str(path), stats.pages, stats.chunks, stats.elapsed),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0])
+
+
+class BulkStats:
+    """Files, pages and chunks of a bulk run, with throughput."""
+
+    def __init__(self, total: int = 0):
+        self.total = total
+        self.files = 0
+        self.skipped = 0
+        self.failed = 0
+        self.pages = 0
+        self.chunks = 0
+        self.errors: dict[str, str] = {}
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record(self, stats: IngestStats) -> None:
+        with self._lock:
+            self.files += 1
+            self.pages += stats.pages
+            self.chunks += stats.chunks
+
+    def skip(self) -> None:
+        with self._lock:
+            self.skipped += 1
+
+    def fail(self, path: Path, error: Exception) -> None:
+        with self._lock:
+            self.failed += 1
+            self.errors[str(path)] = str(error)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            elapsed = time.perf_counter() - self.started
+            return {
+                "total": self.total,
+                "files": self.files,
+                "skipped": self.skipped,
+                "failed": self.failed,
+                "pages": self.pages,
+                "chunks": self.chunks,
+                "seconds": elapsed,
+                "pages_per_second": self.pages / elapsed if elapsed else 0.0,
+                "chunks_per_second": self.chunks / elapsed if elapsed else 0.0,
+            }
+
+
+def ingest_file(
+    item: BulkItem,
+    splitter: Any,
+    vectorstore: Any,
+    workers: int = 1,
+    executor: Executor | None = None,
+) -> IngestStats:
+    """Parse, split and index one PDF from disk.
+
+    Chunk ids are derived from the file's content, so re-ingesting a file
+    that was interrupted half way replaces its chunks instead of adding them
+    twice (in stores that upsert by id).
+    """
+    content = item.path.read_bytes()
+    return ingest_pages(
+        parse_pages(content, workers=workers, executor=executor),
+        {"filename": item.filename, "year": item.year},
+        splitter=splitter,
+        vectorstore=vectorstore,
+        id_prefix=hashlib.sha256(content).hexdigest()[:32],
+    )
+
+
+def bulk_ingest(
+    items: Iterable[BulkItem],
+    checkpoint: str | None = None,
+    concurrency: int = 4,
+    workers: int | None = None,
+    splitter: Any = None,
+    vectorstore: Any = None,
+    progress: Callable[[BulkStats], None] | None = None,
+) -> BulkStats:
+    """Ingest many PDFs concurrently, skipping those already checkpointed.
+
+    Up to ``concurrency`` files are split and indexed at once (embedding
+    requests are I/O bound), while their pages are parsed in one shared pool
+    of ``workers`` processes. A file that fails is logged and counted, not
+    checkpointed, so the next run retries it.
+
+    Args:
+        items: Files to ingest, e.g. from ``load_items``.
+        checkpoint: SQLite file recording finished files; omit to ingest all.
+        concurrency: Files ingested at once.
+        workers: Parser processes; defaults to the number of CPUs, 1 parses in-thread.
+        splitter: Text splitter; defaults to DI ``text_splitter``.
+        vectorstore: Vector store; defaults to DI ``vectorstore``.
+        progress: Called with the running ``BulkStats`` after each file.
+    """
+    items = list(items)
+    splitter = splitter or get_di("text_splitter")
+    vectorstore = vectorstore or get_di("vectorstore")
+    workers = workers or os.cpu_count() or 1
+    done = Checkpoint(checkpoint) if checkpoint else None
+    stats = BulkStats(len(items))
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+
+    def run(item: BulkItem) -> None:
+        try:
+            key = Checkpoint.key(item.path) if done is not None else ""
+            if done is not None and done.done(key):
+                stats.skip()
+            else:
+                result = ingest_file(item, splitter, vectorstore, workers, pool)
+                if done is not None:
+                    done.record(key, item.path, result)
+                stats.record(result)
+                logger.info("Ingested %s: %d pages, %d chunks", item.path, result.pages, result.chunks)
+        except Exception as e:
+            # A missing or unreadable file must not stop the rest of the run
+            logger.warning("Failed to ingest %s: %s", item.path, e)
+            stats.fail(item.path, e)
+        if progress is not None:
+            progress(stats)
+
+    threads = ThreadPoolExecutor(max(concurrency, 1))
+    try:
+        for future in [threads.submit(run, item) for item in items]:
+            future.result()
+    finally:
+        # On interruption, drop queued files; finished ones are checkpointed
+        threads.shutdown(cancel_futures=True)
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if done is not None:
+            done.close()
+    return stats
+
+
+def _print_progress(stats: BulkStats) -> None:
+    info = stats.as_dict()
+    print(
+        f"{info['files'] + info['skipped'] + info['failed']}/{info['total']} files "
+        f"({info['skipped']} skipped, {info['failed']} failed) "
+        f"{info['pages_per_second']:.1f} pages/s {info['chunks_per_second']:.1f} chunks/s",
+        file=sys.stderr,
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="directory to scan, or a manifest (.jsonl or one path per line)")
+    parser.add_argument("--pattern", default="*.pdf", help="file pattern when scanning a directory")
+    parser.add_argument("--year", type=int, default=0, help="year for files without one in the manifest")
+    parser.add_argument("--checkpoint", default="ingest-checkpoint.db", help="SQLite file of finished files")
+    parser.add_argument("--concurrency", type=int, default=4, help="files ingested at once")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: CPUs)")
+    parser.add_argument("--setup", help="module imported first to register text_splitter and vectorstore in DI")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    if args.setup:
+        importlib.import_module(args.setup)
+    stats = bulk_ingest(
+        load_items(args.source, args.pattern, args.year),
+        checkpoint=args.checkpoint,
+        concurrency=args.concurrency,
+        workers=args.workers,
+        progress=_print_progress,
+    )
+    print(json.dumps(stats.as_dict(), indent=2))
+    for path, error in stats.errors.items():
+        print(f"failed: {path}: {error}", file=sys.stderr)
+    return 1 if stats.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
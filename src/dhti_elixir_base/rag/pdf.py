@@ -0,0 +1,186 @@
+import io
+import itertools
+import os
+import tempfile
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from pathlib import Path
+
+from langchain_core.documents import Document
+from pdfminer.high_level import extract_pages
+from pdfminer.layout import LAParams, LTContainer, LTItem, LTText, LTTextBox
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+
+# Pages parsed by one worker task; large enough to amortize re-opening the PDF
+PAGES_PER_TASK = 16
+
+# The PDF a worker is parsing, as (temp file path, content); read once per worker
+_worker_pdf: tuple[str, bytes] | None = None
+
+
+def count_pages(content: bytes) -> int:
+    """Number of pages in a PDF, from its page tree (page contents are not parsed)."""
+    document = PDFDocument(PDFParser(io.BytesIO(content)))
+    return sum(1 for _ in PDFPage.create_pages(document))
+
+
+def page_text(layout: LTItem) -> str:
+    """Text of one page laid out by PDFMiner, as ``PDFMinerParser`` extracts it."""
+    parts: list[str] = []
+
+    def render(item: LTItem) -> None:
+        if isinstance(item, LTContainer):
+            for child in item:
+                render(child)
+        elif isinstance(item, LTText):
+            parts.append(item.get_text())
+        if isinstance(item, LTTextBox):
+            parts.append("\n")
+
+    render(layout)
+    return "".join(parts).strip()
+
+
+def parse_range(content: bytes, start: int, stop: int) -> list[str]:
+    """Text of pages ``start`` to ``stop - 1`` (zero-based) of a PDF."""
+    return [
+        page_text(layout)
+        for layout in extract_pages(io.BytesIO(content), page_numbers=range(start, stop), laparams=LAParams())
+    ]
+
+
+def _load_pdf(path: str) -> bytes:
+    """Content of the PDF at ``path``, read on this worker's first task for it."""
+    global _worker_pdf
+    loaded = _worker_pdf
+    if loaded is None or loaded[0] != path:
+        loaded = (path, Path(path).read_bytes())
+        _worker_pdf = loaded
+    return loaded[1]
+
+
+def _parse_loaded(start: int, stop: int, path: str | None = None) -> list[str]:
+    """``parse_range`` on the worker's PDF (loaded by the pool initializer, or from ``path``)."""
+    if path is not None:
+        return parse_range(_load_pdf(path), start, stop)
+    if _worker_pdf is None:
+        raise RuntimeError("No PDF loaded in this worker")
+    return parse_range(_worker_pdf[1], start, stop)
+
+
+def parse_pages(
+    content: bytes,
+    workers: int | None = None,
+    pages_per_task: int = PAGES_PER_TASK,
+    executor: Executor | None = None,
+) -> Iterator[Document]:
+    """Parse a PDF in page ranges across a process pool, yielding pages in order.
+
+    PDFMiner is pure Python and CPU-bound, so one process parses on one core.
+    Here ranges of ``pages_per_task`` pages are parsed by separate worker
+    processes; at most two ranges per worker are in flight, so pages are
+    yielded (and can be split and indexed) while later ranges are still being
+    parsed. Each page is a ``Document`` with its zero-based ``page`` in the
+    metadata. A PDF that fits in a single range is parsed in-process.
+
+    The PDF is written to a temporary file that each worker reads once (in
+    the pool initializer, or on its first task with ``executor``), so tasks
+    carry only their page range rather than a pickled copy of the file.
+
+    Worker processes are started with the process-wide start method (``spawn``
+    once ``agency`` is imported), which costs a package import per worker; pass
+    a long-lived ``executor`` to pay it once when parsing many files.
+
+    Args:
+        content: The PDF file.
+        workers: Worker processes (or ranges in flight with ``executor``);
+            defaults to the number of CPUs.
+        pages_per_task: Pages parsed by one task.
+        executor: Pool to run the tasks on instead of a new one per call.
+    """
+    total = count_pages(content)
+    ranges = [(start, min(start + pages_per_task, total)) for start in range(0, total, pages_per_task)]
+    workers = min(workers or os.cpu_count() or 1, len(ranges))
+    if workers <= 1 and executor is None:
+        for start, stop in ranges:
+            yield from _documents(start, parse_range(content, start, stop))
+        return
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as file:
+        file.write(content)
+    path = file.name
+    pool = executor or ProcessPoolExecutor(workers, initializer=_load_pdf, initargs=(path,))
+    try:
+        # A shared executor's workers have no initializer; they load the file on their first task
+        yield from _parse_in_pool(pool, ranges, workers, path if executor is not None else None)
+    finally:
+        if executor is None:
+            pool.shutdown(cancel_futures=True)
+        Path(path).unlink(missing_ok=True)
+
+
+def _parse_in_pool(pool: Executor, ranges: list[tuple[int, int]], workers: int, path: str | None) -> Iterator[Document]:
+    tasks = iter(ranges)
+    pending: deque[tuple[int, Future]] = deque()
+    try:
+        for start, stop in itertools.islice(tasks, max(workers, 1) * 2):
+            pending.append((start, pool.submit(_parse_loaded, start, stop, path)))
+        while pending:
+            start, future = pending.popleft()
+            texts = future.result()
+            for next_start, next_stop in itertools.islice(tasks, 1):
+                pending.append((next_start, pool.submit(_parse_loaded, next_start, next_stop, path)))
+            yield from _documents(start, texts)
+    finally:
+        for _, future in pending:
+            future.cancel()
+        # Tasks already running may still be reading the file
+        for _, future in pending:
+            if not future.cancelled():
+                future.exception()
+
+
+def _documents(start: int, texts: list[str]) -> Iterator[Document]:
+    for offset, text in enumerate(texts):
+        yield Document(page_content=text, metadata={"page": start + offset})
+
+
+def synthetic_pdf(pages: int, lines_per_page: int = 40) -> bytes:
+    """A plain-text PDF of ``pages`` pages, for benchmarks and tests."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # page tree, filled in once the page objects are numbered
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for page in range(pages):
+        lines = [
+            f"Page {page + 1} line {line + 1}: the patient reports improvement "
+            f"after treatment and follow-up is scheduled."
+            for line in range(lines_per_page)
+        ]
+        stream = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({text}) Tj T*" for text in lines) + " ET"
+        data = stream.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(data), data))
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), pages)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
@@ -16,6 +16,9 @@ limitations under the License.
 
 import base64
 import logging
+import time
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any
 
 from langchain_community.document_loaders.parsers.pdf import PDFMinerParser
 from langchain_core.document_loaders import Blob
@@ -24,9 +27,15 @@ from langserve import CustomUserType
 from pydantic import Field
 
 from ..mydi import get_di
+from .pdf import parse_pages
 
 logger = logging.getLogger(__name__)
 
+# Pages split and indexed together by process_file
+PAGE_WINDOW = 16
+# Same separator PDFMinerParser puts between pages in "single" mode
+PAGES_DELIMITER = "\n\x0c"
+
 
 # *  Inherit from CustomUserType instead of BaseModel otherwise
 #    the server will decode it into a dict instead of a pydantic model.
@@ -34,36 +43,151 @@ class FileProcessingRequest(CustomUserType):
     """Request including a base64 encoded file."""
 
     # The extra field is used to specify a widget for the playground UI.
-    file: str = Field(..., extra={"widget": {"type": "base64file"}})  # type: ignore
-    filename: str = Field(
-        default="", json_schema_extra={"widget": {"type": "text"}}
-    )
+    file: str = Field(..., extra={"widget": {"type": "base64file"}})  # type: ignore[call-overload]
+    filename: str = Field(default="", json_schema_extra={"widget": {"type": "text"}})
     year: int = Field(
         default=0,
         json_schema_extra={"widget": {"type": "number"}},
     )
 
 
-def process_file(request: FileProcessingRequest) -> str:
-    """Extract the text from all pages of the PDF."""
+class IngestStats:
+    """Progress of one ingestion run: pages parsed, chunks indexed and throughput."""
+
+    def __init__(self):
+        self.pages = 0
+        self.chunks = 0
+        self.windows = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_dict(self) -> dict:
+        elapsed = self.elapsed
+        return {
+            "pages": self.pages,
+            "chunks": self.chunks,
+            "windows": self.windows,
+            "seconds": elapsed,
+            "pages_per_second": self.pages / elapsed if elapsed else 0.0,
+            "chunks_per_second": self.chunks / elapsed if elapsed else 0.0,
+        }
+
+
+class IndexingError(RuntimeError):
+    """The vectorstore rejected a window of chunks."""
+
+
+def ingest_pages(
+    pages: Iterable[Any],
+    metadata: dict,
+    window: int = PAGE_WINDOW,
+    splitter: Any = None,
+    vectorstore: Any = None,
+    progress: Callable[[IngestStats], None] | None = None,
+    id_prefix: str | None = None,
+) -> IngestStats:
+    """Split and index pages in windows of ``window`` pages as they are parsed.
+
+    Each window is split with ``text_splitter`` and added to ``vectorstore``
+    (both from DI unless given) before the next pages are read, so memory is
+    bounded by the window and chunks become searchable while a long PDF is
+    still being parsed. The last, possibly incomplete, chunk of a window is
+    carried into the next one, so chunks do not break at window boundaries.
+
+    Args:
+        pages: Page documents (anything with ``page_content``) in order.
+        metadata: Metadata set on every chunk.
+        window: Pages split and indexed together.
+        splitter: Text splitter; defaults to DI ``text_splitter``.
+        vectorstore: Vector store; defaults to DI ``vectorstore``.
+        progress: Called with the running ``IngestStats`` after each window.
+        id_prefix: If set, chunks get the ids ``{id_prefix}-{n}``, so ingesting
+            the same file again replaces its chunks in stores that upsert by id.
+
+    Raises:
+        IndexingError: If the vectorstore fails to add a window's chunks.
+    """
+    splitter = splitter or get_di("text_splitter")
+    vectorstore = vectorstore or get_di("vectorstore")
+    stats = IngestStats()
+    pending: list[str] = []
+    for page in pages:
+        pending.append(page.page_content)
+        stats.pages += 1
+        if len(pending) > window:
+            pending = _index_window(pending, metadata, splitter, vectorstore, stats, False, id_prefix)
+            if progress is not None:
+                progress(stats)
+    if pending:
+        _index_window(pending, metadata, splitter, vectorstore, stats, True, id_prefix)
+        if progress is not None:
+            progress(stats)
+    logger.info("Ingested %(pages)d pages into %(chunks)d chunks", stats.as_dict())
+    return stats
+
+
+def _index_window(
+    texts: list[str],
+    metadata: dict,
+    splitter: Any,
+    vectorstore: Any,
+    stats: IngestStats,
+    final: bool,
+    id_prefix: str | None = None,
+) -> list[str]:
+    """Index the chunks of a window; return the text to carry into the next one."""
+    docs = splitter.create_documents([PAGES_DELIMITER.join(texts)])
+    carry: list[str] = []
+    if not final:
+        # The last chunk may continue on the next page
+        carry = [docs.pop().page_content] if docs else []
+    for number, doc in enumerate(docs, start=stats.chunks):
+        doc.metadata = metadata
+        if id_prefix is not None:
+            doc.id = f"{id_prefix}-{number}"
+    if docs:
+        try:
+            vectorstore.add_documents(docs)
+        except Exception as e:
+            raise IndexingError(str(e)) from e
+    stats.windows += 1
+    stats.chunks += len(docs)
+    return carry
+
+
+def process_file(request: FileProcessingRequest, workers: int = 1) -> str:
+    """Extract, split and index the text of the PDF page by page.
+
+    With ``workers`` > 1, page ranges are parsed in that many processes
+    (see ``rag.pdf.parse_pages``) while the pages parsed so far are split and
+    indexed here.
+
+    Returns the first 100 characters of the extracted text, or an error
+    message if the vectorstore rejects the chunks.
+    """
     content = base64.b64decode(request.file.encode("utf-8"))
-    blob = Blob(data=content)
-    documents = list(PDFMinerParser().lazy_parse(blob))
-    # Use list and join for O(n) instead of repeated string concatenation O(n²)
-    page_contents = [doc.page_content for doc in documents]
-    pages = "".join(page_contents)
-    docs = get_di("text_splitter").create_documents([pages]) # type: ignore
     metadata = {"filename": request.filename, "year": request.year}
-    _docs = []
-    for doc in docs:
-        doc.metadata = metadata
-        _docs.append(doc)
+    head: list[str] = []
+
+    def pages() -> Iterator[Any]:
+        if workers > 1:
+            parsed = parse_pages(content, workers=workers)
+        else:
+            parsed = PDFMinerParser(mode="page").lazy_parse(Blob(data=content))
+        for page in parsed:
+            if sum(len(text) for text in head) < 100:
+                head.append(page.page_content)
+            yield page
+
     try:
-        get_di("vectorstore").add_documents(_docs) # type: ignore
-    except Exception as e:
+        ingest_pages(pages(), metadata)
+    except IndexingError as e:
         return f"Error adding documents to vectorstore: {e}"
     # return first 100 characters of the extracted text
-    return pages[:100]
+    return PAGES_DELIMITER.join(head)[:100]
 
 
 def combine_documents(documents: list, document_separator="\n\n") -> str:
@@ -75,10 +199,7 @@ def combine_documents(documents: list, document_separator="\n\n") -> str:
         filename = document.metadata.get("filename", "")
         year = document.metadata.get("year", 0)
         current_separator = f"[{filename} ({year})]\n\n" if filename and year else document_separator
-        parts.append(
-            DEFAULT_DOCUMENT_PROMPT.format(page_content=document.page_content)
-            + current_separator
-        )
+        parts.append(DEFAULT_DOCUMENT_PROMPT.format(page_content=document.page_content) + current_separator)
     combined_text = "".join(parts)
     if len(combined_text) < 3:
         return "No information found. The vectorstore may still be indexing. Please try again later."
@@ -88,4 +209,4 @@ def combine_documents(documents: list, document_separator="\n\n") -> str:
 def search_vectorstore(query: str) -> list:
     """Search the vectorstore for the given query."""
     vectorstore = get_di("vectorstore")
-    return vectorstore.similarity_search(query, k=get_di("rag_k", 5))  # type: ignore
+    return vectorstore.similarity_search(query, k=get_di("rag_k", 5))  # type: ignore[no-any-return]
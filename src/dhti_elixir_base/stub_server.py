@@ -0,0 +1,393 @@
+"""Deterministic OpenAI/Ollama-compatible model server stand-in.
+
+Serves chat, completion and embedding requests with configurable latency,
+token rate and injected errors, so the HTTP path of BaseLLM, BaseChatLLM and
+BaseEmbedding can be exercised and benchmarked without a GPU.
+
+Routes:
+    - ``POST /v1/chat/completions`` and ``/v1/completions`` (OpenAI; SSE when ``stream``)
+    - ``POST /api/chat`` and ``/api/generate`` (Ollama; NDJSON when ``stream``)
+    - ``POST /v1/embeddings``, ``/api/embed`` and ``/embeddings``
+
+Example:
+    ```bash
+    python -m dhti_elixir_base.stub_server --port 8001 --latency lognormal --latency-mean 0.2
+    ```
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import sys
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+# (path, body) -> (status, json_body) or (status, json_body, headers)
+Responder = Callable[[str, dict], tuple]
+# (path, body) -> event lines of a streamed reply, or a Responder-style tuple
+StreamResponder = Callable[[str, dict], list[str] | tuple]
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    stub: "StubModelServer"
+    daemon_threads = True
+    # The default backlog of 5 drops connections under concurrent load
+    request_queue_size = 1024
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # Clients that cancel (e.g. the loser of a hedged request) close the socket early
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubModelServer:
+    """Local model server with reproducible timing and failures.
+
+    Every request gets its own random generator seeded with ``seed`` and the
+    request number, so a run with the same settings and request order is
+    reproducible.
+
+    Replies can also be scripted, e.g. in tests: a ``responder`` answers every
+    POST instead of the generated completion, and a ``stream_responder``
+    returns the lines of a streamed reply, sent ``tokens_per_second`` lines
+    per second. The last ``max_received`` request bodies are kept in
+    ``received`` and accepted TCP connections are counted in ``connections``.
+
+    Args:
+        host: Interface to bind.
+        port: Port to bind (0 picks a free port).
+        latency: Time-to-first-token distribution, one of ``LATENCY_DISTRIBUTIONS``.
+        latency_mean: Mean time to first token in seconds.
+        latency_sigma: Shape of the ``lognormal`` distribution (larger is a heavier tail).
+        tokens_per_second: Generation speed; 0 returns all tokens at once.
+        completion_tokens: Tokens generated per response.
+        error_rate: Fraction of requests answered with ``error_status``.
+        error_status: HTTP status used for injected errors.
+        embedding_dim: Length of returned embedding vectors.
+        seed: Seed for latency and error sampling.
+        responder: Scripted reply to every non-streamed request.
+        stream_responder: Scripted reply to every streamed request.
+        max_received: Request bodies kept in ``received`` (0 keeps none), so
+            long benchmark runs do not grow without bound.
+
+    Example:
+        ```python
+        from dhti_elixir_base import BaseChatLLM
+        from dhti_elixir_base.stub_server import StubModelServer
+
+        with StubModelServer(latency_mean=0.05, tokens_per_second=200) as server:
+            llm = BaseChatLLM(base_url=server.url("/v1/chat/completions"), model="stub")
+            llm.invoke("Hello")
+        ```
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: str = "fixed",
+        latency_mean: float = 0.0,
+        latency_sigma: float = 0.5,
+        tokens_per_second: float = 0.0,
+        completion_tokens: int = 16,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        embedding_dim: int = 8,
+        seed: int = 0,
+        responder: Responder | None = None,
+        stream_responder: StreamResponder | None = None,
+        max_received: int = 1000,
+    ):
+        if latency not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {latency}")
+        self.latency = latency
+        self.latency_mean = latency_mean
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.embedding_dim = embedding_dim
+        self.seed = seed
+        self.responder = responder
+        self.stream_responder = stream_responder
+        self.requests = 0
+        self.errors = 0
+        self.connections = 0
+        self.received: deque[dict] = deque(maxlen=max_received)
+        self._lock = threading.Lock()
+        self._httpd = _HTTPServer((host, port), _Handler)
+        self._httpd.stub = self
+        self._thread: threading.Thread | None = None
+        self._serving = False
+
+    def url(self, path: str = "/v1/chat/completions") -> str:
+        host, port = self._httpd.socket.getsockname()[:2]
+        return f"http://{host}:{port}{path}"
+
+    def start(self) -> "StubModelServer":
+        self._serving = True
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        # shutdown() waits for serve_forever, so only call it if that is running
+        if self._serving:
+            self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self) -> None:
+        self._serving = True
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._serving = False
+
+    def __enter__(self) -> "StubModelServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def _next_rng(self) -> random.Random:
+        with self._lock:
+            self.requests += 1
+            n = self.requests
+        return random.Random(f"{self.seed}:{n}")  # noqa: S311
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """Time to first token for one request."""
+        mean = self.latency_mean
+        if mean <= 0:
+            return 0.0
+        if self.latency == "uniform":
+            return rng.uniform(0, 2 * mean)
+        if self.latency == "exponential":
+            return rng.expovariate(1 / mean)
+        if self.latency == "lognormal":
+            # mu chosen so that the distribution's mean equals latency_mean
+            mu = math.log(mean) - self.latency_sigma**2 / 2
+            return rng.lognormvariate(mu, self.latency_sigma)
+        return mean
+
+    def tokens(self, prompt: str) -> list[str]:
+        """Deterministic completion tokens derived from the prompt."""
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return [f"{digest[n % 60 : n % 60 + 4]} " for n in range(self.completion_tokens)]
+
+    def embed(self, text: str) -> list[float]:
+        """Deterministic unit vector for a text."""
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        vector = [digest[n % len(digest)] / 255 - 0.5 for n in range(self.embedding_dim)]
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: _HTTPServer
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; avoid Nagle/delayed-ACK stalls
+    disable_nagle_algorithm = True
+
+    @property
+    def stub(self) -> "StubModelServer":
+        return self.server.stub
+
+    def setup(self) -> None:
+        super().setup()
+        with self.stub._lock:
+            self.stub.connections += 1
+
+    def do_POST(self) -> None:
+        stub = self.stub
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        with stub._lock:
+            stub.received.append(body)
+        rng = stub._next_rng()
+        if rng.random() < stub.error_rate:
+            with stub._lock:
+                stub.errors += 1
+            self._json(stub.error_status, {"error": "injected failure"})
+        elif stub.responder is not None or stub.stream_responder is not None:
+            self._scripted(body)
+        elif "embed" in self.path:
+            self._embeddings(body)
+        else:
+            time.sleep(stub.sample_latency(rng))
+            self._generate(body)
+
+    def _scripted(self, body: dict) -> None:
+        stream_responder = self.stub.stream_responder
+        responder = self.stub.responder
+        if body.get("stream") and stream_responder is not None:
+            reply = stream_responder(self.path, body)
+            if isinstance(reply, list):
+                self._start_stream("text/event-stream")
+                for line in reply:
+                    self._chunk(line + "\n\n")
+                    self._pause()
+                self._end_stream()
+                return
+        elif responder is not None:
+            reply = responder(self.path, body)
+        else:
+            self._generate(body)
+            return
+        status, payload, headers = (*reply, {})[:3]
+        self._json(status, payload, headers)
+
+    def _generate(self, body: dict) -> None:
+        prompt = _prompt(body)
+        tokens = self.stub.tokens(prompt)
+        ollama = self.path.startswith("/api/")
+        if body.get("stream"):
+            self._start_stream("application/x-ndjson" if ollama else "text/event-stream")
+            for token in tokens:
+                self._pause()
+                self._chunk(_stream_event(self.path, body, token, ollama, done=False))
+            self._chunk(_stream_event(self.path, body, "", ollama, done=True))
+            if not ollama:
+                self._chunk("data: [DONE]\n\n")
+            self._end_stream()
+        else:
+            if self.stub.tokens_per_second:
+                time.sleep(len(tokens) / self.stub.tokens_per_second)
+            self._json(200, _completion(self.path, body, prompt, tokens))
+
+    def _embeddings(self, body: dict) -> None:
+        inputs = body.get("input", body.get("prompt", []))
+        texts = [inputs] if isinstance(inputs, str) else list(inputs)
+        vectors = [self.stub.embed(text) for text in texts]
+        self._json(
+            200,
+            {
+                "embeddings": vectors,
+                "data": [{"object": "embedding", "index": n, "embedding": v} for n, v in enumerate(vectors)],
+                "usage": {"prompt_tokens": sum(len(t) // 4 + 1 for t in texts)},
+            },
+        )
+
+    def _start_stream(self, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _pause(self) -> None:
+        if self.stub.tokens_per_second:
+            time.sleep(1 / self.stub.tokens_per_second)
+
+    def _end_stream(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _chunk(self, text: str) -> None:
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _json(self, status: int, payload: dict, headers: dict | None = None) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def _prompt(body: dict) -> str:
+    if "messages" in body:
+        return "\n".join(str(m.get("content", "")) for m in body["messages"])
+    return str(body.get("prompt", ""))
+
+
+def _usage(prompt: str, tokens: list[str]) -> dict:
+    prompt_tokens = len(prompt) // 4 + 1
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": len(tokens),
+        "total_tokens": prompt_tokens + len(tokens),
+    }
+
+
+def _completion(path: str, body: dict, prompt: str, tokens: list[str]) -> dict:
+    text = "".join(tokens)
+    model = body.get("model", "stub")
+    usage = _usage(prompt, tokens)
+    if path.startswith("/api/"):
+        reply = {"model": model, "done": True, "done_reason": "stop"}
+        if path.startswith("/api/chat"):
+            reply["message"] = {"role": "assistant", "content": text}
+        else:
+            reply["response"] = text
+        reply["prompt_eval_count"] = usage["prompt_tokens"]
+        reply["eval_count"] = usage["completion_tokens"]
+        return reply
+    if path.endswith("/completions") and "/chat/" not in path:
+        choice: dict = {"index": 0, "text": text, "finish_reason": "stop"}
+    else:
+        choice = {
+            "index": 0,
+            "message": {"role": "assistant", "content": text},
+            "finish_reason": "stop",
+        }
+    return {"object": "chat.completion", "model": model, "choices": [choice], "usage": usage}
+
+
+def _stream_event(path: str, body: dict, token: str, ollama: bool, done: bool) -> str:
+    if ollama:
+        event: dict = {"model": body.get("model", "stub"), "done": done}
+        if path.startswith("/api/chat"):
+            event["message"] = {"role": "assistant", "content": token}
+        else:
+            event["response"] = token
+        if done:
+            event["done_reason"] = "stop"
+        return json.dumps(event) + "\n"
+    choice = {"index": 0, "delta": {"content": token} if token else {}}
+    choice["finish_reason"] = "stop" if done else None
+    return "data: " + json.dumps({"choices": [choice]}) + "\n\n"
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--latency-mean", type=float, default=0.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--completion-tokens", type=int, default=16)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--embedding-dim", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    # Nothing reads the request bodies of a standalone server
+    server = StubModelServer(**vars(args), max_received=0)
+    print(f"Stub model server listening on {server.url('')}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
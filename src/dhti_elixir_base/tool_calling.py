@@ -0,0 +1,136 @@
+import json
+import uuid
+from collections.abc import Sequence
+from typing import Any
+
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.messages.tool import (
+    InvalidToolCall,
+    ToolCall,
+    ToolCallChunk,
+    invalid_tool_call,
+    tool_call,
+    tool_call_chunk,
+)
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from .attachments import AttachmentStore, format_content
+from .cache.exact import LRUCache
+
+# Serialized schemas by tool identity, so agents that re-bind the same tools
+# on every step do not rebuild the JSON schema each time.
+_schemas = LRUCache(max_entries=512)
+
+_ROLES = {"human": "user", "ai": "assistant", "system": "system", "tool": "tool"}
+
+
+def format_tools(tools: Sequence[Any]) -> list[dict]:
+    """Serialize LangChain tools, pydantic models, functions or dicts to OpenAI tool schemas."""
+    formatted = []
+    for tool in tools:
+        key = str(id(tool))
+        entry = _schemas.get(key)
+        if entry is None or entry[0] is not tool:
+            entry = (tool, convert_to_openai_tool(tool))
+            _schemas.set(key, entry)
+        formatted.append(entry[1])
+    return formatted
+
+
+def format_tool_choice(tool_choice: Any) -> Any:
+    """Map LangChain ``tool_choice`` values to the OpenAI request format."""
+    if tool_choice is True or tool_choice == "any":
+        return "required"
+    if isinstance(tool_choice, str) and tool_choice not in ("auto", "none", "required"):
+        return {"type": "function", "function": {"name": tool_choice}}
+    return tool_choice
+
+
+def format_message(message: BaseMessage, store: AttachmentStore | None = None) -> dict:
+    """Convert a LangChain message to the OpenAI chat format, including tool turns.
+
+    Image blocks are resolved through ``store`` (see ``attachments.format_content``).
+    """
+    formatted: dict[str, Any] = {
+        "role": _ROLES.get(getattr(message, "type", "human"), "user"),
+        "content": format_content(message.content, store),
+    }
+    if isinstance(message, AIMessage) and message.tool_calls:
+        formatted["tool_calls"] = [
+            {
+                "id": call["id"],
+                "type": "function",
+                "function": {
+                    "name": call["name"],
+                    "arguments": json.dumps(call["args"]),
+                },
+            }
+            for call in message.tool_calls
+        ]
+    if isinstance(message, ToolMessage):
+        formatted["tool_call_id"] = message.tool_call_id
+    return formatted
+
+
+def parse_tool_calls(data: dict) -> tuple[list[ToolCall], list[InvalidToolCall]]:
+    """Parse every (parallel) tool call in a response body.
+
+    Handles OpenAI/vLLM/llama.cpp ``choices[0].message.tool_calls`` with JSON
+    string arguments and Ollama ``message.tool_calls`` with object arguments.
+    Calls without a function name or whose arguments are not valid JSON are
+    returned as invalid calls.
+    """
+    message = data.get("message")
+    if data.get("choices"):
+        message = data["choices"][0].get("message")
+    raw_calls = (message or {}).get("tool_calls") or []
+    calls: list[ToolCall] = []
+    invalid: list[InvalidToolCall] = []
+    for raw in raw_calls:
+        function = raw.get("function") or {}
+        name = function.get("name")
+        arguments = function.get("arguments")
+        call_id = raw.get("id") or f"call_{uuid.uuid4().hex[:24]}"
+        if not isinstance(name, str) or not name:
+            if isinstance(arguments, dict):
+                arguments = json.dumps(arguments)
+            invalid.append(invalid_tool_call(args=arguments, id=call_id, error="Tool call has no function name"))
+            continue
+        if isinstance(arguments, dict):
+            calls.append(tool_call(name=name, args=arguments, id=call_id))
+            continue
+        try:
+            args = json.loads(arguments) if arguments else {}
+        except json.JSONDecodeError as e:
+            invalid.append(invalid_tool_call(name=name, args=arguments, id=call_id, error=str(e)))
+            continue
+        calls.append(tool_call(name=name, args=args, id=call_id))
+    return calls, invalid
+
+
+def parse_tool_call_chunks(event: dict) -> list[ToolCallChunk]:
+    """Tool-call fragments carried by one streamed chunk.
+
+    OpenAI-style streams send each call in pieces under ``delta.tool_calls``;
+    Ollama sends whole calls in ``message.tool_calls``.
+    """
+    choices = event.get("choices")
+    if not choices:
+        calls, _ = parse_tool_calls(event)
+        return [
+            tool_call_chunk(name=call["name"], args=json.dumps(call["args"]), id=call["id"], index=n)
+            for n, call in enumerate(calls)
+        ]
+    delta = choices[0].get("delta") or {}
+    chunks = []
+    for raw in delta.get("tool_calls") or []:
+        function = raw.get("function") or {}
+        chunks.append(
+            tool_call_chunk(
+                name=function.get("name"),
+                args=function.get("arguments"),
+                id=raw.get("id"),
+                index=raw.get("index"),
+            )
+        )
+    return chunks
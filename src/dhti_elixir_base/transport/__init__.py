@@ -0,0 +1,42 @@
+from .balancer import LoadBalancer, endpoint_stats, reset_endpoint_stats
+from .client import HttpModelClient, content_or_raw, decode_response, extract_content
+from .hedging import HedgePolicy
+from .pool import HttpTransport, close_transport, get_transport
+from .ratelimit import RateLimiter, rate_limiters, reset_rate_limiters
+from .resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    circuit_breakers,
+    get_circuit_breaker,
+    reset_circuit_breakers,
+)
+from .singleflight import SingleFlight, get_single_flight
+from .usage import reset_usage_stats, usage_stats
+
+__all__ = [
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "HedgePolicy",
+    "HttpModelClient",
+    "HttpTransport",
+    "LoadBalancer",
+    "RateLimiter",
+    "RetryPolicy",
+    "SingleFlight",
+    "circuit_breakers",
+    "close_transport",
+    "content_or_raw",
+    "decode_response",
+    "endpoint_stats",
+    "extract_content",
+    "get_circuit_breaker",
+    "get_single_flight",
+    "get_transport",
+    "rate_limiters",
+    "reset_circuit_breakers",
+    "reset_endpoint_stats",
+    "reset_rate_limiters",
+    "reset_usage_stats",
+    "usage_stats",
+]
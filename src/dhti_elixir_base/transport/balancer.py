@@ -0,0 +1,136 @@
+import hashlib
+import random
+import threading
+import time
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+
+from .resilience import OPEN, get_circuit_breaker
+
+LEAST_OUTSTANDING = "least_outstanding"
+EWMA = "ewma"
+
+
+class EndpointStats:
+    """In-flight count and EWMA latency of one endpoint, shared process-wide."""
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self.outstanding = 0
+        self.ewma_latency = 0.0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            self.outstanding += 1
+            self.requests += 1
+
+    def finish(self, latency: float) -> None:
+        with self._lock:
+            self.outstanding -= 1
+            if self.ewma_latency == 0.0:
+                self.ewma_latency = latency
+            else:
+                self.ewma_latency = self.alpha * latency + (1 - self.alpha) * self.ewma_latency
+
+    def as_dict(self) -> dict:
+        return {
+            "outstanding": self.outstanding,
+            "ewma_latency": self.ewma_latency,
+            "requests": self.requests,
+        }
+
+
+_stats: dict[str, EndpointStats] = {}
+_stats_lock = threading.Lock()
+
+
+def get_endpoint_stats(url: str) -> EndpointStats:
+    with _stats_lock:
+        stats = _stats.get(url)
+        if stats is None:
+            stats = _stats[url] = EndpointStats()
+        return stats
+
+
+def endpoint_stats() -> dict[str, dict]:
+    """Load and latency of every endpoint seen so far, for monitoring."""
+    with _stats_lock:
+        items = list(_stats.items())
+    return {url: stats.as_dict() for url, stats in items}
+
+
+def reset_endpoint_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+class LoadBalancer:
+    """Choose one of several replica endpoints per request.
+
+    Strategies:
+        - ``least_outstanding``: fewest requests currently in flight.
+        - ``ewma``: lowest EWMA latency weighted by in-flight requests;
+          endpoints without a measurement yet are tried first.
+
+    Replicas whose circuit breaker is open (see ``resilience``) are ejected
+    until the breaker lets a trial request through. If every replica is
+    ejected, the least loaded one is returned and its breaker decides.
+
+    With an ``affinity`` key (e.g. a conversation ID) the strategy is bypassed
+    and the key is mapped to a replica by rendezvous hashing, so requests with
+    the same key keep landing on the replica that holds their KV cache. Only
+    keys of an ejected replica move, and they move back once it recovers.
+    """
+
+    def __init__(
+        self,
+        endpoints: Sequence[str],
+        strategy: str = LEAST_OUTSTANDING,
+        affinity: str | None = None,
+    ):
+        if not endpoints:
+            raise ValueError("LoadBalancer needs at least one endpoint.")
+        if strategy not in (LEAST_OUTSTANDING, EWMA):
+            raise ValueError(f"Unknown load balancing strategy: {strategy}")
+        self.endpoints = list(endpoints)
+        self.strategy = strategy
+        self.affinity = affinity
+
+    def _cost(self, url: str) -> float:
+        stats = get_endpoint_stats(url)
+        if self.strategy == EWMA:
+            return stats.ewma_latency * (stats.outstanding + 1)
+        return stats.outstanding
+
+    def pick(self, exclude: Sequence[str] = ()) -> str:
+        """Return the best endpoint, avoiding ``exclude`` and ejected replicas when possible."""
+        if len(self.endpoints) == 1:
+            return self.endpoints[0]
+        candidates = [url for url in self.endpoints if url not in exclude] or self.endpoints
+        healthy = [url for url in candidates if get_circuit_breaker(url).state != OPEN]
+        pool = healthy or candidates
+        if self.affinity is not None:
+            return max(pool, key=self._weight)
+        costs = {url: self._cost(url) for url in pool}
+        best = min(costs.values())
+        return random.choice([url for url in pool if costs[url] == best])  # noqa: S311
+
+    def has_alternative(self, exclude: Sequence[str]) -> bool:
+        """Whether a healthy endpoint other than those in ``exclude`` exists."""
+        return any(url not in exclude and get_circuit_breaker(url).state != OPEN for url in self.endpoints)
+
+    def _weight(self, url: str) -> bytes:
+        return hashlib.sha256(f"{self.affinity}|{url}".encode()).digest()
+
+    @contextmanager
+    def track(self, url: str) -> Iterator[None]:
+        """Count the request as in flight and record its latency when done."""
+        stats = get_endpoint_stats(url)
+        stats.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats.finish(time.perf_counter() - start)
@@ -0,0 +1,345 @@
+import json
+import time
+from collections.abc import AsyncIterator, Iterator, Sequence
+from typing import TYPE_CHECKING, Any, cast
+
+import httpx
+from pydantic import BaseModel, Field
+
+from ..cache.exact import payload_key
+from ..mydi import get_di
+from .balancer import LoadBalancer
+from .pool import HttpTransport, get_transport
+from .ratelimit import estimate_tokens, get_rate_limiter
+from .resilience import (
+    RetryPolicy,
+    asend_with_retry,
+    get_circuit_breaker,
+    send_with_retry,
+)
+from .singleflight import get_single_flight
+from .sse import aiter_events, iter_events
+from .usage import extract_usage, mark_cached, record_usage, stream_usage, usage_info
+
+
+def extract_content(data: dict) -> str | None:
+    """Return the generated text from an OpenAI/Ollama style response body.
+
+    Supports both ``choices[0].message.content`` and ``choices[0].text``.
+    """
+    if "choices" in data and len(data["choices"]) > 0:
+        choice = data["choices"][0]
+        if isinstance(choice, dict) and "message" in choice and isinstance(choice["message"], dict):
+            return cast(str | None, choice["message"].get("content"))
+        if "text" in choice:
+            return cast(str | None, choice.get("text"))
+    return None
+
+
+def content_or_raw(data: dict) -> str:
+    """Return the generated text, or the raw JSON string for debugging."""
+    content = extract_content(data)
+    return content if content is not None else json.dumps(data)
+
+
+def _raise_for_status(resp: Any) -> None:
+    """Raise ``RuntimeError`` with the status and body for non-2xx responses."""
+    try:
+        resp.raise_for_status()
+    except Exception as e:
+        raise RuntimeError(f"API request failed: {e}; status={resp.status_code}; body={resp.text}") from e
+
+
+def decode_response(resp: Any) -> dict:
+    """Raise for non-2xx responses, otherwise return the JSON body."""
+    _raise_for_status(resp)
+    return cast(dict, resp.json())
+
+
+class HttpModelClient(BaseModel):
+    """Shared HTTP plumbing for BaseLLM and BaseChatLLM.
+
+    The ``transport`` field accepts an ``HttpTransport``; when left unset the
+    transport registered in DI as ``http_transport`` (or a process-wide
+    default) is used, so every chain shares one connection pool.
+
+    ``response_cache`` is an opt-in ``ResponseCache`` (or the one registered in
+    DI as ``llm_response_cache``) consulted with the exact payload before any
+    request is sent. It is separate from LangChain's own ``cache`` field.
+
+    ``semantic_cache`` is an opt-in ``SemanticCache`` (or DI
+    ``llm_semantic_cache``) for near-identical prompts. It is scoped by the
+    ``patient_id`` passed to ``invoke`` or set in the run metadata.
+
+    Requests are retried on 429/5xx and connection errors according to
+    ``retry_policy`` (or DI ``llm_retry_policy``), and each endpoint has a
+    circuit breaker that fails fast while it is unhealthy. ``connect_timeout``
+    bounds the TCP/TLS connect phase separately from ``timeout``.
+
+    ``base_url`` may be a list of replica URLs; each request then goes to the
+    replica chosen by ``lb_strategy`` (``least_outstanding`` or ``ewma``),
+    skipping replicas whose circuit breaker is open. Payloads with a
+    ``prompt_cache_key`` always go to the same healthy replica.
+
+    With ``coalesce_requests=True``, concurrent calls with an identical
+    payload share one upstream request through the ``SingleFlight`` group in
+    DI ``llm_single_flight`` (or a process-wide default). It is off by default
+    because callers sampling at ``temperature > 0`` expect independent answers.
+
+    Endpoints listed in DI ``llm_rate_limits`` are admitted through a shared
+    token-bucket ``RateLimiter`` (requests and estimated tokens per minute).
+
+    Token counts and latency of every request that reaches a server are added
+    to the per-model totals in ``transport.usage_stats()``.
+    """
+
+    transport: Any = Field(default=None, exclude=True)
+    response_cache: Any = Field(default=None, exclude=True)
+    semantic_cache: Any = Field(default=None, exclude=True)
+    retry_policy: Any = Field(default=None, exclude=True)
+    connect_timeout: float | None = 5.0
+    endpoints: list[str] = Field(default_factory=list)
+    lb_strategy: str = "least_outstanding"
+    coalesce_requests: bool = False
+
+    if TYPE_CHECKING:
+        base_url: str | None
+        model: str | None
+        api_key: str | None
+        timeout: int
+
+    def _set_endpoints(self, base_url: str | Sequence[str]) -> None:
+        """Accept a single URL or a list of replica URLs for ``base_url``."""
+        if isinstance(base_url, str):
+            self.base_url = base_url
+        else:
+            self.endpoints = list(base_url)
+            self.base_url = self.endpoints[0]
+
+    def _get_balancer(self, payload: dict | None = None) -> LoadBalancer:
+        # Conversations with a prefix-cache key stick to one replica
+        affinity = (payload or {}).get("prompt_cache_key")
+        return LoadBalancer(self.endpoints or [str(self.base_url)], self.lb_strategy, affinity)
+
+    def _get_transport(self) -> HttpTransport:
+        return self.transport or get_transport()
+
+    def _get_cache(self) -> Any:
+        if self.response_cache is not None:
+            return self.response_cache
+        return get_di("llm_response_cache")
+
+    def _get_semantic_cache(self) -> Any:
+        # An empty cache has len() == 0, so test for None rather than truthiness
+        if self.semantic_cache is not None:
+            return self.semantic_cache
+        return get_di("llm_semantic_cache")
+
+    def _get_retry_policy(self) -> RetryPolicy:
+        return self.retry_policy or get_di("llm_retry_policy") or RetryPolicy()
+
+    @staticmethod
+    def _patient_id(run_manager: Any, kwargs: dict) -> str | None:
+        """Patient ID from invoke kwargs, falling back to the run metadata."""
+        patient_id = kwargs.get("patient_id")
+        if patient_id is None and run_manager is not None:
+            patient_id = (getattr(run_manager, "metadata", None) or {}).get("patient_id")
+        return patient_id
+
+    def _headers(self) -> dict:
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}",
+        }
+
+    def _post(self, payload: dict, patient_id: str | None = None) -> dict:
+        """Return the decoded JSON response for the payload, from cache when possible."""
+        cache = self._get_cache()
+        semantic = self._get_semantic_cache()
+        if cache is not None:
+            cached = cache.get(payload)
+            if cached is not None:
+                return self._cache_hit(cached)
+        if semantic is not None:
+            cached = semantic.lookup(payload, patient_id)
+            if cached is not None:
+                return self._cache_hit(cached)
+        data: dict
+        if self.coalesce_requests:
+            data = get_single_flight().do(self._flight_key(payload), lambda: self._send(payload))
+        else:
+            data = self._send(payload)
+        if cache is not None:
+            cache.set(payload, data)
+        if semantic is not None:
+            semantic.store(payload, data, patient_id)
+        return data
+
+    async def _apost(self, payload: dict, patient_id: str | None = None) -> dict:
+        """Async counterpart of ``_post``."""
+        cache = self._get_cache()
+        semantic = self._get_semantic_cache()
+        if cache is not None:
+            cached = cache.get(payload)
+            if cached is not None:
+                return self._cache_hit(cached)
+        if semantic is not None:
+            cached = await semantic.alookup(payload, patient_id)
+            if cached is not None:
+                return self._cache_hit(cached)
+        data: dict
+        if self.coalesce_requests:
+            data = await get_single_flight().ado(self._flight_key(payload), lambda: self._asend(payload))
+        else:
+            data = await self._asend(payload)
+        if cache is not None:
+            cache.set(payload, data)
+        if semantic is not None:
+            await semantic.astore(payload, data, patient_id)
+        return data
+
+    def _cache_hit(self, data: dict) -> dict:
+        """Count a cache hit and return the response flagged as consuming no tokens."""
+        record_usage(self.model, {"cached": True})
+        return mark_cached(data)
+
+    def _flight_key(self, payload: dict) -> str:
+        endpoints = self.endpoints or [str(self.base_url)]
+        return payload_key({"endpoints": endpoints, "payload": payload})
+
+    def _send(self, payload: dict, tried: list[str] | None = None) -> dict:
+        """POST the payload with retries and return the decoded JSON body.
+
+        Endpoints in ``tried`` are avoided, and every endpoint attempted is
+        appended to it (see ``send_with_retry``).
+        """
+        transport = self._get_transport()
+        start = time.perf_counter()
+        resp = send_with_retry(
+            lambda url: transport.post(
+                url,
+                headers=self._headers(),
+                json=payload,
+                timeout=self.timeout,
+                connect_timeout=self.connect_timeout,
+            ),
+            self._get_retry_policy(),
+            self._get_balancer(payload),
+            estimate_tokens(payload),
+            tried,
+        )
+        data = decode_response(resp)
+        record_usage(self.model, usage_info(extract_usage(data), time.perf_counter() - start))
+        return data
+
+    async def _asend(self, payload: dict, tried: list[str] | None = None) -> dict:
+        """Async counterpart of ``_send`` using the pooled ``httpx.AsyncClient``."""
+        transport = self._get_transport()
+        start = time.perf_counter()
+        resp = await asend_with_retry(
+            lambda url: transport.apost(
+                url,
+                headers=self._headers(),
+                json=payload,
+                timeout=self.timeout,
+                connect_timeout=self.connect_timeout,
+            ),
+            self._get_retry_policy(),
+            self._get_balancer(payload),
+            estimate_tokens(payload),
+            tried,
+        )
+        data = decode_response(resp)
+        record_usage(self.model, usage_info(extract_usage(data), time.perf_counter() - start))
+        return data
+
+    def _stream_events(self, payload: dict) -> Iterator[dict]:
+        """POST the payload and yield decoded SSE/NDJSON events as they arrive.
+
+        The circuit breaker applies, but streams are not retried because
+        tokens may already have been handed to the caller. The usage reported
+        by the closing event is added to ``transport.usage_stats()``.
+        """
+        start = time.perf_counter()
+        usage: dict = {}
+        balancer = self._get_balancer(payload)
+        url = balancer.pick()
+        breaker = get_circuit_breaker(url)
+        trial = breaker.before_call()
+        try:
+            limiter = get_rate_limiter(url)
+            if limiter is not None:
+                limiter.acquire(estimate_tokens(payload))
+            with (
+                balancer.track(url),
+                self._get_transport().stream(
+                    url,
+                    headers=self._headers(),
+                    json=payload,
+                    timeout=self.timeout,
+                    connect_timeout=self.connect_timeout,
+                ) as resp,
+            ):
+                if resp.is_server_error:
+                    breaker.record_failure()
+                else:
+                    # A 4xx is the caller's fault; the endpoint itself answered
+                    breaker.record_success()
+                if resp.is_error:
+                    resp.read()
+                    _raise_for_status(resp)
+                for event in iter_events(resp.iter_lines()):
+                    usage = stream_usage(event) or usage
+                    yield event
+        except httpx.TransportError as e:
+            breaker.record_failure()
+            raise RuntimeError(f"API request failed: {e!r}") from e
+        except BaseException:
+            # Cancelled before a response (or closed early): free a half-open trial slot
+            if trial:
+                breaker.release()
+            raise
+        if usage:
+            record_usage(self.model, usage_info(usage, time.perf_counter() - start))
+
+    async def _astream_events(self, payload: dict) -> AsyncIterator[dict]:
+        """Async counterpart of ``_stream_events``."""
+        start = time.perf_counter()
+        usage: dict = {}
+        balancer = self._get_balancer(payload)
+        url = balancer.pick()
+        breaker = get_circuit_breaker(url)
+        trial = breaker.before_call()
+        try:
+            limiter = get_rate_limiter(url)
+            if limiter is not None:
+                await limiter.aacquire(estimate_tokens(payload))
+            with balancer.track(url):
+                async with self._get_transport().astream(
+                    url,
+                    headers=self._headers(),
+                    json=payload,
+                    timeout=self.timeout,
+                    connect_timeout=self.connect_timeout,
+                ) as resp:
+                    if resp.is_server_error:
+                        breaker.record_failure()
+                    else:
+                        # A 4xx is the caller's fault; the endpoint itself answered
+                        breaker.record_success()
+                    if resp.is_error:
+                        await resp.aread()
+                        _raise_for_status(resp)
+                    async for event in aiter_events(resp.aiter_lines()):
+                        usage = stream_usage(event) or usage
+                        yield event
+        except httpx.TransportError as e:
+            breaker.record_failure()
+            raise RuntimeError(f"API request failed: {e!r}") from e
+        except BaseException:
+            # Cancelled before a response (or closed early): free a half-open trial slot
+            if trial:
+                breaker.release()
+            raise
+        if usage:
+            record_usage(self.model, usage_info(usage, time.perf_counter() - start))
@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+class HedgePolicy:
+    """Send a duplicate request when the first one is slower than usual.
+
+    The hedge delay is the ``percentile`` of recently observed latencies
+    (``initial_delay`` until ``min_samples`` have been seen). If no response has
+    arrived by then, a second request is sent to a replica the first one did
+    not use; with no other healthy replica nothing is hedged, since a
+    duplicate on the same slow replica only doubles its load. The first
+    successful response wins and the other request is cancelled.
+
+    ``budget`` caps hedges as a fraction of all requests, so an overloaded
+    backend is not flooded with duplicates.
+
+    Blocking calls (``hedged_call``) run on a thread pool shared by every call
+    with this policy, created on first use.
+
+    Args:
+        percentile: Latency percentile (0-100) used as the hedge delay.
+        initial_delay: Delay in seconds before enough samples exist.
+        min_delay: Lower bound on the hedge delay.
+        min_samples: Latencies needed before the percentile is used.
+        window: Number of recent latencies kept.
+        budget: Maximum fraction of requests that may be hedged.
+        max_workers: Threads of the shared pool for blocking calls; requests
+            and hedges beyond it wait for a free thread.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        initial_delay: float = 1.0,
+        min_delay: float = 0.01,
+        min_samples: int = 20,
+        window: int = 256,
+        budget: float = 0.1,
+        max_workers: int = 64,
+    ):
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.budget = budget
+        self.max_workers = max_workers
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def delay(self) -> float:
+        """Seconds to wait for the first response before hedging."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.initial_delay
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.min_delay, ordered[index])
+
+    def executor(self) -> ThreadPoolExecutor:
+        """The shared pool for blocking hedged calls."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="hedge")
+            return self._executor
+
+    def allow_hedge(self) -> bool:
+        with self._lock:
+            return self.hedges < self.budget * max(self.requests, 1)
+
+    def record(self, latency: float, hedged: bool = False, hedge_won: bool = False) -> None:
+        with self._lock:
+            self.requests += 1
+            self.hedges += hedged
+            self.hedge_wins += hedge_won
+            self._latencies.append(latency)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "hedge_rate": self.hedges / self.requests if self.requests else 0.0,
+            }
+
+
+def hedged_call(
+    call: Callable[[], T],
+    policy: HedgePolicy,
+    hedge: Callable[[], T] | None = None,
+    can_hedge: Callable[[], bool] | None = None,
+) -> T:
+    """Run ``call`` and, if it is slow, ``hedge`` (default: ``call``); return the first success.
+
+    ``can_hedge`` is checked when the hedge delay expires; if it returns False
+    (e.g. no other healthy replica) the first request is simply awaited.
+    Blocking HTTP calls cannot be interrupted, so the losing request is
+    abandoned rather than cancelled and finishes in the background.
+    """
+    start = time.perf_counter()
+    executor = policy.executor()
+    primary = executor.submit(call)
+    futures = [primary]
+    try:
+        done, _ = wait([primary], timeout=policy.delay())
+        if done or not policy.allow_hedge() or (can_hedge is not None and not can_hedge()):
+            result = primary.result()
+            policy.record(time.perf_counter() - start)
+            return result
+        second = executor.submit(hedge or call)
+        futures.append(second)
+        pending = {primary, second}
+        error: BaseException | None = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    policy.record(time.perf_counter() - start, True, future is second)
+                    return future.result()
+                error = error or future.exception()
+        policy.record(time.perf_counter() - start, True)
+        raise error  # type: ignore[misc]
+    finally:
+        # Drop a loser still waiting for a thread; a running one is abandoned
+        for future in futures:
+            future.cancel()
+
+
+async def ahedged_call(
+    call: Callable[[], Awaitable[T]],
+    policy: HedgePolicy,
+    hedge: Callable[[], Awaitable[T]] | None = None,
+    can_hedge: Callable[[], bool] | None = None,
+) -> T:
+    """Async counterpart of ``hedged_call``; the losing request is cancelled."""
+    start = time.perf_counter()
+    primary = asyncio.ensure_future(call())
+    tasks = {primary}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=policy.delay())
+        if done or not policy.allow_hedge() or (can_hedge is not None and not can_hedge()):
+            result = await primary
+            policy.record(time.perf_counter() - start)
+            return result
+        second = asyncio.ensure_future((hedge or call)())
+        tasks.add(second)
+        pending = set(tasks)
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    policy.record(time.perf_counter() - start, True, task is second)
+                    return task.result()
+                error = error or task.exception()
+        policy.record(time.perf_counter() - start, True)
+        raise error  # type: ignore[misc]
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
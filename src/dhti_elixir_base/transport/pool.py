@@ -0,0 +1,235 @@
+import asyncio
+import threading
+import weakref
+from collections.abc import Callable, Mapping
+from contextlib import AbstractAsyncContextManager, AbstractContextManager
+from typing import Any, cast
+
+import httpx
+
+from ..mydi import get_di
+
+
+def _origin(url: str) -> str:
+    """Return the scheme://host:port part of a URL, used as the pool key."""
+    parsed = httpx.URL(url)
+    port = f":{parsed.port}" if parsed.port else ""
+    return f"{parsed.scheme}://{parsed.host}{port}"
+
+
+def _timeout(timeout: float | None, connect_timeout: float | None) -> Any:
+    """Overall timeout, with a shorter connect phase so a dead host fails fast."""
+    if connect_timeout is None:
+        return timeout
+    return httpx.Timeout(timeout, connect=connect_timeout)
+
+
+class HttpTransport:
+    """Pooled, keep-alive HTTP transport shared by the DHTI model clients.
+
+    One ``httpx.Client`` (and one ``httpx.AsyncClient`` per event loop) is kept
+    per origin, so ``max_connections_per_host`` is enforced per model server and
+    TCP/TLS connections are reused across generations.
+
+    Args:
+        max_connections_per_host: Upper bound on open connections to a single origin.
+        max_keepalive_connections: Idle connections kept open per origin.
+        keepalive_expiry: Seconds an idle connection is kept before it is closed.
+        http2: Negotiate HTTP/2 where the server supports it (requires ``httpx[http2]``).
+        verify: TLS verification flag or CA bundle path, passed to httpx.
+        event_hooks: Optional httpx ``{"request": [...], "response": [...]}`` hooks.
+
+    Example:
+        ```python
+        from kink import di
+        from dhti_elixir_base.transport import HttpTransport
+
+        di["http_transport"] = HttpTransport(max_connections_per_host=32, http2=True)
+        ```
+    """
+
+    def __init__(
+        self,
+        max_connections_per_host: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        verify: bool | str = True,
+        event_hooks: Mapping[str, list[Callable]] | None = None,
+    ):
+        self.max_connections_per_host = max_connections_per_host
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2
+        self.verify = verify
+        self.event_hooks = dict(event_hooks or {})
+        self._clients: dict[str, httpx.Client] = {}
+        self._async_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @property
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections_per_host,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def client(self, url: str) -> httpx.Client:
+        """Return the pooled synchronous client for the origin of ``url``."""
+        key = _origin(url)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("HttpTransport is closed.")
+            client = self._clients.get(key)
+            if client is None:
+                client = httpx.Client(
+                    limits=self.limits,
+                    http2=self.http2,
+                    verify=self.verify,
+                    event_hooks=self.event_hooks,
+                )
+                self._clients[key] = client
+            return client
+
+    def async_client(self, url: str) -> httpx.AsyncClient:
+        """Return the pooled async client for the origin of ``url`` on the running loop.
+
+        Async connections cannot be shared between event loops, so a separate
+        client is kept per loop and dropped when the loop is garbage collected.
+        """
+        key = _origin(url)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("HttpTransport is closed.")
+            clients = self._async_clients.setdefault(loop, {})
+            client = clients.get(key)
+            if client is None:
+                client = httpx.AsyncClient(
+                    limits=self.limits,
+                    http2=self.http2,
+                    verify=self.verify,
+                    event_hooks=self.event_hooks,
+                )
+                clients[key] = client
+            return client
+
+    def post(
+        self,
+        url: str,
+        *,
+        headers: Mapping[str, str] | None = None,
+        json: Any = None,
+        timeout: float | None = None,
+        connect_timeout: float | None = None,
+    ) -> httpx.Response:
+        """POST ``json`` to ``url`` over a pooled connection."""
+        return self.client(url).post(url, headers=headers, json=json, timeout=_timeout(timeout, connect_timeout))
+
+    async def apost(
+        self,
+        url: str,
+        *,
+        headers: Mapping[str, str] | None = None,
+        json: Any = None,
+        timeout: float | None = None,
+        connect_timeout: float | None = None,
+    ) -> httpx.Response:
+        """POST ``json`` to ``url`` without blocking the running event loop."""
+        return await self.async_client(url).post(
+            url, headers=headers, json=json, timeout=_timeout(timeout, connect_timeout)
+        )
+
+    def stream(
+        self,
+        url: str,
+        *,
+        headers: Mapping[str, str] | None = None,
+        json: Any = None,
+        timeout: float | None = None,
+        connect_timeout: float | None = None,
+    ) -> AbstractContextManager[httpx.Response]:
+        """POST ``json`` and return a context manager over the streamed response."""
+        return self.client(url).stream(
+            "POST", url, headers=headers, json=json, timeout=_timeout(timeout, connect_timeout)
+        )
+
+    def astream(
+        self,
+        url: str,
+        *,
+        headers: Mapping[str, str] | None = None,
+        json: Any = None,
+        timeout: float | None = None,
+        connect_timeout: float | None = None,
+    ) -> AbstractAsyncContextManager[httpx.Response]:
+        """Async counterpart of ``stream``."""
+        return self.async_client(url).stream(
+            "POST", url, headers=headers, json=json, timeout=_timeout(timeout, connect_timeout)
+        )
+
+    def close(self) -> None:
+        """Close every pooled synchronous client.
+
+        Async clients must be closed from their own loop with ``aclose``.
+        """
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._closed = True
+        for client in clients:
+            client.close()
+
+    async def aclose(self) -> None:
+        """Close the async clients of the running loop and all synchronous clients."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = list(self._async_clients.pop(loop, {}).values())
+        for client in clients:
+            await client.aclose()
+        self.close()
+
+    def __enter__(self) -> "HttpTransport":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    async def __aenter__(self) -> "HttpTransport":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+
+_default_transport: HttpTransport | None = None
+_default_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """Return the transport registered as ``http_transport`` in DI, or a shared default."""
+    global _default_transport
+    transport = get_di("http_transport")
+    if transport is not None:
+        return cast(HttpTransport, transport)
+    with _default_lock:
+        if _default_transport is None or _default_transport.closed:
+            _default_transport = HttpTransport()
+        return _default_transport
+
+
+def close_transport() -> None:
+    """Close the shared default transport, e.g. from an application shutdown hook."""
+    global _default_transport
+    with _default_lock:
+        transport, _default_transport = _default_transport, None
+    if transport is not None:
+        transport.close()
@@ -0,0 +1,172 @@
+import asyncio
+import threading
+import time
+from typing import Any
+
+from ..mydi import get_di
+from .pool import _origin
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate`` per second up to ``capacity``.
+
+    ``reserve`` always succeeds and returns how long the caller must wait: the
+    bucket may go into debt, which keeps waiters in arrival order without a
+    queue and lets requests larger than the capacity through eventually.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._level = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+            self._updated = now
+            self._level -= amount
+            return max(0.0, -self._level / self.rate)
+
+
+class RateLimiter:
+    """Client-side admission control for one endpoint.
+
+    Requests wait locally until both the request bucket and the estimated
+    token bucket allow them, instead of being rejected by the gateway with 429.
+
+    Args:
+        requests_per_minute: Request quota (None for no request limit).
+        tokens_per_minute: Token quota (None for no token limit).
+        burst: Fraction of a minute's quota that may be sent at once.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+        burst: float = 1.0,
+    ):
+        self.requests = (
+            TokenBucket(requests_per_minute / 60, max(1.0, requests_per_minute * burst))
+            if requests_per_minute
+            else None
+        )
+        self.tokens = (
+            TokenBucket(tokens_per_minute / 60, max(1.0, tokens_per_minute * burst)) if tokens_per_minute else None
+        )
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.delayed = 0
+        self.wait_time = 0.0
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Take one request and ``tokens`` from the buckets; return the wait in seconds."""
+        delay = 0.0
+        if self.requests is not None:
+            delay = self.requests.reserve(1)
+        if self.tokens is not None and tokens:
+            delay = max(delay, self.tokens.reserve(tokens))
+        with self._lock:
+            self.admitted += 1
+            self.delayed += delay > 0
+            self.wait_time += delay
+        return delay
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until a request of ``tokens`` estimated tokens may be sent."""
+        delay = self.reserve(tokens)
+        if delay:
+            time.sleep(delay)
+
+    async def aacquire(self, tokens: int = 0) -> None:
+        """Async counterpart of ``acquire``; waits without blocking the event loop."""
+        delay = self.reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "admitted": self.admitted,
+                "delayed": self.delayed,
+                "wait_time": self.wait_time,
+            }
+
+
+def estimate_tokens(payload: dict) -> int:
+    """Rough token estimate (4 characters per token) of a chat or embedding payload.
+
+    The completion budget (``max_output_tokens``/``n_predict``) is included,
+    as gateways usually count it against the token quota.
+    """
+    chars = 0
+    for message in payload.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):
+            chars += sum(len(part.get("text", "")) for part in content if isinstance(part, dict))
+    inputs = payload.get("input", [])
+    for text in [inputs] if isinstance(inputs, str) else inputs:
+        chars += len(text)
+    options = payload.get("options") or {}
+    completion = options.get("max_output_tokens") or options.get("n_predict") or 0
+    return chars // 4 + 1 + completion
+
+
+_limiters: dict[str, RateLimiter] = {}
+_limiter_keys: dict[str, str] = {}
+_limiters_lock = threading.Lock()
+
+
+def _resolve(url: str) -> tuple[str, dict] | None:
+    """The limiter key and options that apply to an endpoint URL, if any."""
+    limits: Any = get_di("llm_rate_limits")
+    if not limits:
+        return None
+    origin = _origin(url)
+    for key, shared_key in ((url, url), (origin, origin), ("*", origin)):
+        if key in limits:
+            return shared_key, limits[key]
+    return None
+
+
+def get_rate_limiter(url: str) -> RateLimiter | None:
+    """Return the shared limiter for an endpoint, or None if it is not rate limited.
+
+    Limits come from the ``llm_rate_limits`` dict in DI, keyed by endpoint URL
+    or origin (``scheme://host:port``), with ``"*"`` applying to every origin;
+    values are ``RateLimiter`` keyword arguments. A limit configured for an
+    origin is shared by all its URLs and by every client (BaseLLM,
+    BaseChatLLM, BaseEmbedding) that calls them.
+
+    Only endpoints that have a limit are remembered; others are looked up
+    again on every call, so limits registered after the first request (e.g.
+    by app setup after a warm-up call) still take effect.
+    """
+    with _limiters_lock:
+        key = _limiter_keys.get(url)
+        if key is None:
+            resolved = _resolve(url)
+            if resolved is None:
+                return None
+            key = _limiter_keys[url] = resolved[0]
+            if key not in _limiters:
+                _limiters[key] = RateLimiter(**resolved[1])
+        return _limiters[key]
+
+
+def rate_limiters() -> dict[str, dict]:
+    """Admission counters of every rate limiter, for monitoring."""
+    with _limiters_lock:
+        items = list(_limiters.items())
+    return {key: limiter.as_dict() for key, limiter in items}
+
+
+def reset_rate_limiters() -> None:
+    with _limiters_lock:
+        _limiters.clear()
+        _limiter_keys.clear()
@@ -0,0 +1,306 @@
+import asyncio
+import random
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from email.utils import parsedate_to_datetime
+from typing import Any
+
+import httpx
+
+from ..mydi import get_di
+from .ratelimit import get_rate_limiter
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without contacting the endpoint while its circuit breaker is open."""
+
+
+class RetryPolicy:
+    """Retry with jittered exponential backoff for model endpoints.
+
+    Args:
+        max_retries: Extra attempts after the first one (0 disables retries).
+        backoff_base: Delay in seconds before the first retry; doubled on each attempt.
+        backoff_max: Upper bound on any single delay, including ``Retry-After``.
+        jitter: Use "full jitter" (a random delay between 0 and the backoff).
+        retry_statuses: HTTP statuses that are retried.
+        retry_transport_errors: Retry connection errors and timeouts.
+        respect_retry_after: Honour the ``Retry-After`` header on 429/503.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        jitter: bool = True,
+        retry_statuses: tuple[int, ...] = (429, 500, 502, 503, 504),
+        retry_transport_errors: bool = True,
+        respect_retry_after: bool = True,
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.retry_statuses = retry_statuses
+        self.retry_transport_errors = retry_transport_errors
+        self.respect_retry_after = respect_retry_after
+
+    def delay(self, attempt: int, retry_after: str | None = None) -> float:
+        """Seconds to wait before retry number ``attempt`` (0-based)."""
+        if self.respect_retry_after and retry_after:
+            seconds = _parse_retry_after(retry_after)
+            if seconds is not None:
+                return min(seconds, self.backoff_max)
+        backoff = min(self.backoff_max, self.backoff_base * (2**attempt))
+        return random.uniform(0, backoff) if self.jitter else backoff  # noqa: S311
+
+
+def _parse_retry_after(value: str) -> float | None:
+    """Parse a ``Retry-After`` header given in seconds or as an HTTP date."""
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """Per-endpoint circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls fail fast with ``CircuitOpenError``. Once ``recovery_timeout`` seconds
+    have passed, up to ``half_open_max_calls`` trial calls are let through; a
+    success closes the circuit and a failure opens it again. A trial that
+    ends without either (e.g. it was cancelled) must be ``release``-d so its
+    slot goes to the next caller.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+    ):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+        self.successes = 0
+        self.failures = 0
+        self.rejections = 0
+        self.retries = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self) -> None:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._half_open_calls = 0
+
+    def before_call(self) -> bool:
+        """Raise ``CircuitOpenError`` if the endpoint should not be called now.
+
+        Returns True if the call took a half-open trial slot.
+        """
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == OPEN or (self._state == HALF_OPEN and self._half_open_calls >= self.half_open_max_calls):
+                self.rejections += 1
+                raise CircuitOpenError("Circuit open: endpoint is marked unhealthy")
+            if self._state == HALF_OPEN:
+                self._half_open_calls += 1
+                return True
+            return False
+
+    def release(self) -> None:
+        """Free the trial slot of a half-open call that recorded no result."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.successes += 1
+            self._consecutive_failures = 0
+            self._state = CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._consecutive_failures += 1
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._consecutive_failures >= self.failure_threshold
+            ):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self.times_opened += 1
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._consecutive_failures,
+            "successes": self.successes,
+            "failures": self.failures,
+            "rejections": self.rejections,
+            "retries": self.retries,
+            "times_opened": self.times_opened,
+        }
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(url: str) -> CircuitBreaker:
+    """Return the process-wide breaker for an endpoint URL.
+
+    New breakers use the ``llm_circuit_breaker_options`` dict from DI as
+    keyword arguments, if registered.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(url)
+        if breaker is None:
+            options = get_di("llm_circuit_breaker_options") or {}
+            breaker = CircuitBreaker(**options)
+            _breakers[url] = breaker
+        return breaker
+
+
+def circuit_breakers() -> dict[str, dict]:
+    """State and counters of every endpoint breaker, for monitoring."""
+    with _breakers_lock:
+        items = list(_breakers.items())
+    return {url: breaker.as_dict() for url, breaker in items}
+
+
+def reset_circuit_breakers() -> None:
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def _is_failure(status: Any) -> bool:
+    return isinstance(status, int) and status >= 500
+
+
+def send_with_retry(
+    send: Callable[[str], httpx.Response],
+    policy: RetryPolicy,
+    balancer: Any,
+    tokens: int = 0,
+    tried: list[str] | None = None,
+) -> httpx.Response:
+    """Call ``send(url)`` under the retry policy and per-endpoint circuit breakers.
+
+    ``balancer`` (a ``LoadBalancer``) picks the endpoint for every attempt,
+    preferring replicas not yet tried for this request. Pass ``tried`` to
+    start from endpoints to avoid; every endpoint attempted is appended to it,
+    so the caller can see where the request went (hedging uses this). Each
+    attempt is admitted by the endpoint's rate limiter, if any, for ``tokens``
+    estimated tokens. Returns the last
+    response (which may still be an error status once retries are exhausted);
+    transport errors are re-raised as ``RuntimeError``.
+    """
+    attempt = 0
+    tried = [] if tried is None else tried
+    while True:
+        url = balancer.pick(exclude=tried)
+        tried.append(url)
+        breaker = get_circuit_breaker(url)
+        trial = breaker.before_call()
+        try:
+            limiter = get_rate_limiter(url)
+            if limiter is not None:
+                limiter.acquire(tokens)
+            with balancer.track(url):
+                resp = send(url)
+        except httpx.TransportError as e:
+            breaker.record_failure()
+            if policy.retry_transport_errors and attempt < policy.max_retries:
+                breaker.record_retry()
+                time.sleep(policy.delay(attempt))
+                attempt += 1
+                continue
+            raise RuntimeError(f"API request failed: {e!r}") from e
+        except BaseException:
+            # Cancelled or failed before a response: neither healthy nor unhealthy
+            if trial:
+                breaker.release()
+            raise
+        if _is_failure(resp.status_code):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if resp.status_code in policy.retry_statuses and attempt < policy.max_retries:
+            breaker.record_retry()
+            time.sleep(policy.delay(attempt, resp.headers.get("Retry-After")))
+            attempt += 1
+            continue
+        return resp
+
+
+async def asend_with_retry(
+    send: Callable[[str], Awaitable[httpx.Response]],
+    policy: RetryPolicy,
+    balancer: Any,
+    tokens: int = 0,
+    tried: list[str] | None = None,
+) -> httpx.Response:
+    """Async counterpart of ``send_with_retry``."""
+    attempt = 0
+    tried = [] if tried is None else tried
+    while True:
+        url = balancer.pick(exclude=tried)
+        tried.append(url)
+        breaker = get_circuit_breaker(url)
+        trial = breaker.before_call()
+        try:
+            limiter = get_rate_limiter(url)
+            if limiter is not None:
+                await limiter.aacquire(tokens)
+            with balancer.track(url):
+                resp = await send(url)
+        except httpx.TransportError as e:
+            breaker.record_failure()
+            if policy.retry_transport_errors and attempt < policy.max_retries:
+                breaker.record_retry()
+                await asyncio.sleep(policy.delay(attempt))
+                attempt += 1
+                continue
+            raise RuntimeError(f"API request failed: {e!r}") from e
+        except BaseException:
+            # Cancelled or failed before a response: neither healthy nor unhealthy
+            if trial:
+                breaker.release()
+            raise
+        if _is_failure(resp.status_code):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if resp.status_code in policy.retry_statuses and attempt < policy.max_retries:
+            breaker.record_retry()
+            await asyncio.sleep(policy.delay(attempt, resp.headers.get("Retry-After")))
+            attempt += 1
+            continue
+        return resp
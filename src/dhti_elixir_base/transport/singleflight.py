@@ -0,0 +1,94 @@
+import asyncio
+import threading
+from collections.abc import Awaitable, Callable
+from typing import Any, cast
+
+from ..mydi import get_di
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Coalesce identical concurrent requests into one upstream call.
+
+    The first caller for a key (the leader) runs the request; callers that
+    arrive while it is in flight wait for it and receive the same result or
+    exception. Nothing is stored once the request completes, so unlike a cache
+    this never serves stale data. Async callers are coalesced per event loop,
+    and a cancelled caller does not cancel the shared request.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[str, _Call] = {}
+        self._tasks: dict[tuple[int, str], asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Return ``fn()``, sharing one call among concurrent callers with ``key``."""
+        with self._lock:
+            waiting = self._calls.get(key)
+            if waiting is None:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        if waiting is not None:
+            waiting.done.wait()
+            if waiting.error is not None:
+                raise waiting.error
+            return waiting.result
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        else:
+            return call.result
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async counterpart of ``do``."""
+        task_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            if task is None:
+                task = self._tasks[task_key] = asyncio.ensure_future(fn())
+                task.add_done_callback(lambda _: self._forget(task_key))
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, task_key: tuple[int, str]) -> None:
+        with self._lock:
+            self._tasks.pop(task_key, None)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {"leaders": self.leaders, "coalesced": self.coalesced}
+
+
+_default_group: SingleFlight | None = None
+_default_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the ``llm_single_flight`` group from DI, or the process-wide default."""
+    group = get_di("llm_single_flight")
+    if group is not None:
+        return cast(SingleFlight, group)
+    global _default_group
+    with _default_lock:
+        if _default_group is None:
+            _default_group = SingleFlight()
+        return _default_group
@@ -0,0 +1,88 @@
+import json
+from collections.abc import AsyncIterator, Iterable, Iterator
+from typing import cast
+
+_DONE = "[DONE]"
+
+
+def _parse_line(line: str) -> dict | bool | None:
+    """Decode one line of an SSE or NDJSON stream.
+
+    Returns the decoded event, ``None`` for lines that carry no data
+    (blank lines, comments, ``event:``/``id:`` fields) and ``False`` at the
+    OpenAI ``[DONE]`` sentinel.
+    """
+    line = line.strip()
+    if not line or line.startswith(":"):
+        return None
+    if line.startswith("data:"):
+        line = line[5:].strip()
+    elif line.startswith(("event:", "id:", "retry:")):
+        return None
+    if line == _DONE:
+        return False
+    try:
+        event = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    return event if isinstance(event, dict) else None
+
+
+def iter_events(lines: Iterable[str]) -> Iterator[dict]:
+    """Yield decoded JSON events from server-sent-event or NDJSON lines.
+
+    Handles OpenAI/vLLM and llama.cpp ``data: {...}`` SSE streams as well as
+    Ollama's newline-delimited JSON, stopping at ``data: [DONE]``.
+    """
+    for line in lines:
+        event = _parse_line(line)
+        if event is False:
+            return
+        if isinstance(event, dict) and event:
+            yield event
+
+
+async def aiter_events(lines: AsyncIterator[str]) -> AsyncIterator[dict]:
+    """Async counterpart of ``iter_events``."""
+    async for line in lines:
+        event = _parse_line(line)
+        if event is False:
+            return
+        if isinstance(event, dict) and event:
+            yield event
+
+
+def extract_delta(event: dict) -> str | None:
+    """Return the text carried by one streamed chunk, if any.
+
+    Supported shapes:
+        - OpenAI/vLLM: ``{"choices": [{"delta": {"content": "..."}}]}``
+        - OpenAI completions: ``{"choices": [{"text": "..."}]}``
+        - llama.cpp ``/completion``: ``{"content": "...", "stop": false}``
+        - Ollama ``/api/chat``: ``{"message": {"content": "..."}, "done": false}``
+        - Ollama ``/api/generate``: ``{"response": "...", "done": false}``
+    """
+    choices = event.get("choices")
+    if choices:
+        choice = choices[0]
+        delta = choice.get("delta")
+        if isinstance(delta, dict):
+            return delta.get("content")
+        return cast(str | None, choice.get("text"))
+    message = event.get("message")
+    if isinstance(message, dict):
+        return message.get("content")
+    if "response" in event:
+        return event.get("response")
+    content = event.get("content")
+    return content if isinstance(content, str) else None
+
+
+def is_final(event: dict) -> bool:
+    """Return True when the chunk marks the end of generation."""
+    if event.get("done") is True or event.get("stop") is True:
+        return True
+    choices = event.get("choices")
+    if not choices:
+        return False
+    return choices[0].get("finish_reason") is not None
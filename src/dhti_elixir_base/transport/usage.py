@@ -0,0 +1,183 @@
+import threading
+from typing import Any
+
+TOKEN_KEYS = ("prompt_tokens", "completion_tokens", "total_tokens")
+
+# Set on responses served from a response or semantic cache
+CACHE_HIT = "_cache_hit"
+
+
+def mark_cached(data: dict) -> dict:
+    """A copy of a cached response that ``extract_usage`` reports as zero tokens."""
+    return {**data, CACHE_HIT: True}
+
+
+def extract_usage(data: dict) -> dict:
+    """Token counts and server-side timings from a response body.
+
+    Understands the OpenAI/vLLM ``usage`` block, Ollama's ``*_count`` and
+    ``*_duration`` fields (nanoseconds) and llama.cpp ``timings`` (milliseconds).
+    Timings are returned in seconds as ``server_time``, ``prompt_time`` and
+    ``generation_time``. Prompt tokens served from the server's prefix cache
+    (OpenAI/vLLM ``prompt_tokens_details.cached_tokens``, llama.cpp
+    ``cache_n``) are returned as ``cached_tokens``. Missing values are simply
+    left out. Responses served from a client-side cache (see ``mark_cached``)
+    consumed no tokens: they report zeros and ``cached: True``.
+    """
+    if data.get(CACHE_HIT):
+        return dict.fromkeys(TOKEN_KEYS, 0) | {"cached": True}
+    usage: dict[str, Any] = {}
+    block = data.get("usage")
+    if isinstance(block, dict):
+        _openai_usage(block, usage)
+    if "prompt_eval_count" in data or "eval_count" in data:
+        _ollama_usage(data, usage)
+    timings = data.get("timings")
+    if isinstance(timings, dict):
+        _llamacpp_usage(timings, usage)
+    if "total_tokens" not in usage and ("prompt_tokens" in usage or "completion_tokens" in usage):
+        usage["total_tokens"] = usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+    return usage
+
+
+def _openai_usage(block: dict, usage: dict) -> None:
+    for key in TOKEN_KEYS:
+        if isinstance(block.get(key), int):
+            usage[key] = block[key]
+    details = block.get("prompt_tokens_details")
+    if isinstance(details, dict) and isinstance(details.get("cached_tokens"), int):
+        usage["cached_tokens"] = details["cached_tokens"]
+
+
+def _ollama_usage(data: dict, usage: dict) -> None:
+    usage.setdefault("prompt_tokens", data.get("prompt_eval_count", 0))
+    usage.setdefault("completion_tokens", data.get("eval_count", 0))
+    for source, target in (
+        ("total_duration", "server_time"),
+        ("prompt_eval_duration", "prompt_time"),
+        ("eval_duration", "generation_time"),
+    ):
+        if isinstance(data.get(source), int | float):
+            usage[target] = data[source] / 1e9
+
+
+def _llamacpp_usage(timings: dict, usage: dict) -> None:
+    if "prompt_n" in timings:
+        # prompt_n only counts the tokens evaluated after the cached prefix
+        usage.setdefault("prompt_tokens", timings["prompt_n"] + timings.get("cache_n", 0))
+    if "predicted_n" in timings:
+        usage.setdefault("completion_tokens", timings["predicted_n"])
+    if "cache_n" in timings:
+        usage.setdefault("cached_tokens", timings["cache_n"])
+    prompt_ms = timings.get("prompt_ms")
+    predicted_ms = timings.get("predicted_ms")
+    if prompt_ms is not None:
+        usage["prompt_time"] = prompt_ms / 1000
+    if predicted_ms is not None:
+        usage["generation_time"] = predicted_ms / 1000
+    if prompt_ms is not None and predicted_ms is not None:
+        usage.setdefault("server_time", (prompt_ms + predicted_ms) / 1000)
+
+
+def stream_usage(event: dict) -> dict:
+    """Token usage carried by one streamed event, or {} if it has none.
+
+    Only the closing events of a stream carry usage: the OpenAI/vLLM chunk
+    sent for ``stream_options.include_usage``, Ollama's ``done`` event and the
+    llama.cpp event with ``timings``.
+    """
+    usage = extract_usage(event)
+    return usage if any(key in usage for key in TOKEN_KEYS) else {}
+
+
+def usage_info(usage: dict, latency: float) -> dict:
+    """A usage dict plus wall-clock ``latency`` and derived ``queue_time``.
+
+    ``queue_time`` is the part of the latency not covered by the server's own
+    timing (queueing, network and decoding); it is only set when the server
+    reports its processing time.
+    """
+    info = {**usage, "latency": latency}
+    if "server_time" in info:
+        info["queue_time"] = max(0.0, latency - info["server_time"])
+    return info
+
+
+def token_usage(info: dict) -> dict:
+    """Only the token counts of a usage dict, as LangChain expects in ``llm_output``."""
+    return {key: info[key] for key in TOKEN_KEYS if key in info}
+
+
+class ModelUsage:
+    """Running token and latency totals of one model, shared process-wide."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.cache_hits = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.latency = 0.0
+        self.generation_time = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, info: dict) -> None:
+        with self._lock:
+            if info.get("cached"):
+                # Served from a client-side cache: no tokens were consumed
+                self.cache_hits += 1
+                return
+            self.requests += 1
+            self.prompt_tokens += info.get("prompt_tokens", 0)
+            self.completion_tokens += info.get("completion_tokens", 0)
+            self.cached_tokens += info.get("cached_tokens", 0)
+            self.latency += info.get("latency", 0.0)
+            self.generation_time += info.get("generation_time", 0.0)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "cache_hits": self.cache_hits,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "cached_tokens": self.cached_tokens,
+                # Share of prompt tokens the servers reused from their prefix cache
+                "prefix_hit_ratio": (self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0),
+                "latency": self.latency,
+                "tokens_per_second": (self.completion_tokens / self.latency if self.latency else 0.0),
+                "generation_tokens_per_second": (
+                    self.completion_tokens / self.generation_time if self.generation_time else None
+                ),
+            }
+
+
+_usage: dict[str, ModelUsage] = {}
+_usage_lock = threading.Lock()
+
+
+def record_usage(model: str | None, info: dict) -> None:
+    """Add one upstream request (or, with ``cached``, one cache hit) to the per-model totals."""
+    key = model or "unknown"
+    with _usage_lock:
+        usage = _usage.get(key)
+        if usage is None:
+            usage = _usage[key] = ModelUsage()
+    usage.record(info)
+
+
+def usage_stats() -> dict[str, dict]:
+    """Tokens, prefix-cache hits and latency per model since start-up (or the last reset).
+
+    Only requests that reached a model server, streamed or not, add tokens;
+    response- and semantic-cache hits are counted as ``cache_hits`` with zero
+    tokens and coalesced callers are not counted, so the totals reflect GPU work.
+    """
+    with _usage_lock:
+        items = list(_usage.items())
+    return {model: usage.as_dict() for model, usage in items}
+
+
+def reset_usage_stats() -> None:
+    with _usage_lock:
+        _usage.clear()
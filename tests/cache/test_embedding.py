@@ -0,0 +1,105 @@
+import asyncio
+import threading
+from array import array
+
+import pytest
+
+from src.dhti_elixir_base import BaseEmbedding
+from src.dhti_elixir_base.cache import EmbeddingCache, VectorFile
+
+
+@pytest.fixture
+def embedding_server(fake_model_server):
+    fake_model_server.responder = lambda path, body: (
+        200,
+        {"embeddings": [[float(len(text)), 0.1] for text in body["input"]]},
+    )
+    return fake_model_server
+
+
+def test_memory_tier_rounds_to_float32():
+    cache = EmbeddingCache()
+    stored = cache.set("m", "text", [0.1, 2.0])
+    assert stored == pytest.approx([0.1, 2.0]) and stored[0] != 0.1
+    assert cache.get("m", "text") == stored
+    assert cache.get("other-model", "text") is None
+    assert cache.as_dict()["hit_ratio"] == 0.5
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path))
+    first = cache.set("m", "a", [1.0, 2.0, 3.0])
+    second = cache.set("m", "b", [4.0, 5.0])
+    cache.set("m", "a", [9.0, 9.0, 9.0])  # already stored, kept as is
+    cache.close()
+    reopened = EmbeddingCache(path=str(tmp_path))
+    assert reopened.get("m", "a") == first
+    assert reopened.get("m", "b") == second
+    assert len(reopened.disk) == 2
+    assert reopened.as_dict()["disk"]["hits"] == 2
+    # 5 float32 values, 4 bytes each
+    assert (tmp_path / "vectors.f32").stat().st_size == 20
+
+
+def test_vector_file_remaps_as_it_grows(tmp_path):
+    vectors = VectorFile(str(tmp_path))
+    vectors.set("a", array("f", [1.0]))
+    assert vectors.get("a").tolist() == [1.0]
+    vectors.set("b", array("f", [2.0, 3.0]))
+    assert vectors.get("b").tolist() == [2.0, 3.0]
+    assert vectors.get("c") is None
+
+
+def test_set_many_appends_a_batch_once(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path))
+    cache.set("m", "a", [1.0])
+    stored = cache.set_many("m", ["a", "b", "c", "b"], [[9.0], [2.0, 3.0], [4.0], [8.0, 8.0]])
+    assert stored[1:3] == [[2.0, 3.0], [4.0]]
+    cache.close()
+    reopened = EmbeddingCache(path=str(tmp_path))
+    assert [reopened.get("m", text) for text in "abc"] == [[1.0], [2.0, 3.0], [4.0]]
+    assert len(reopened.disk) == 3
+    assert (tmp_path / "vectors.f32").stat().st_size == 16
+
+
+def test_shared_directory_writers_get_distinct_offsets(tmp_path):
+    # Two handles on one directory stand in for two worker processes
+    writers = [VectorFile(str(tmp_path)), VectorFile(str(tmp_path))]
+    errors = []
+
+    def write(writer):
+        try:
+            for n in range(200):
+                writer.set(f"k{n}", array("f", [float(n), float(n)]))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(w,)) for w in writers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    reader = VectorFile(str(tmp_path))
+    assert len(reader) == 200
+    offsets = [row[0] for row in reader._conn.execute("SELECT offset FROM vectors")]
+    assert len(set(offsets)) == 200
+    assert all(reader.get(f"k{n}").tolist() == [float(n), float(n)] for n in range(200))
+    for vector_file in [*writers, reader]:
+        vector_file.close()
+
+
+def test_only_misses_are_sent(embedding_server, tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path))
+    embedding = BaseEmbedding(embedding_server.url(), "m", "k", cache=cache)
+    first = embedding.embed_documents(["a", "bb", "ccc"])
+    second = embedding.embed_documents(["bb", "dddd", "a"])
+    assert second[0] == first[1] and second[2] == first[0]
+    assert second[1] == pytest.approx([4.0, 0.1])
+    assert [body["input"] for body in embedding_server.received] == [
+        ["a", "bb", "ccc"],
+        ["dddd"],
+    ]
+    assert asyncio.run(embedding.aembed_query("ccc")) == first[2]
+    assert len(embedding_server.received) == 2
+    assert cache.as_dict()["hits"] == 3
@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+from kink import di
+
+from src.dhti_elixir_base import BaseChatLLM, BaseLLM
+from src.dhti_elixir_base.cache import LRUCache, ResponseCache, SQLiteCache, payload_key
+
+PAYLOAD = {"model": "m", "options": {"temperature": 0.1}, "messages": [{"role": "user", "content": "hi"}]}
+
+
+def test_payload_key_is_order_independent():
+    reordered = {"messages": PAYLOAD["messages"], "options": {"temperature": 0.1}, "model": "m"}
+    assert payload_key(PAYLOAD) == payload_key(reordered)
+    assert payload_key(PAYLOAD) != payload_key({**PAYLOAD, "model": "other"})
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats.hits == 3 and cache.stats.misses == 1
+
+
+def test_lru_ttl_expires():
+    cache = LRUCache(ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+
+def test_sqlite_persists_and_evicts(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = SQLiteCache(path, max_entries=2)
+    cache.set("a", {"x": 1})
+    cache.set("b", {"x": 2})
+    cache.set("c", {"x": 3})
+    assert len(cache) == 2
+    cache.close()
+    reopened = SQLiteCache(path)
+    assert reopened.get("c") == {"x": 3}
+    assert reopened.get("a") is None
+    reopened.set("d", {"x": 4}, ttl=-1)
+    assert reopened.get("d") is None
+
+
+def test_response_cache_promotes_disk_hits(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ResponseCache(path=path).set(PAYLOAD, {"choices": [{"text": "cached"}]})
+    cache = ResponseCache(path=path)
+    assert cache.get(PAYLOAD) == {"choices": [{"text": "cached"}]}
+    assert cache.get(PAYLOAD) == {"choices": [{"text": "cached"}]}
+    stats = cache.as_dict()
+    assert stats["hits"] == 2
+    assert stats["disk"]["hits"] == 1
+    assert stats["memory"]["hits"] == 1
+
+
+def test_promoted_entry_keeps_its_disk_expiry(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ResponseCache(path=path).set(PAYLOAD, {"choices": [{"text": "cached"}]}, ttl=0.2)
+    cache = ResponseCache(ttl=3600, path=path)
+    assert cache.get(PAYLOAD) is not None
+    time.sleep(0.25)
+    assert cache.memory.get(payload_key(PAYLOAD)) is None
+    assert cache.get(PAYLOAD) is None
+
+
+def test_llm_uses_cache(fake_model_server):
+    cache = ResponseCache()
+    llm = BaseLLM(base_url=fake_model_server.url(), model="m", response_cache=cache)
+    assert llm.invoke("same prompt") == "ok"
+    assert llm.invoke("same prompt") == "ok"
+    llm.invoke("different prompt")
+    assert len(fake_model_server.received) == 2
+    assert cache.stats.hits == 1 and cache.stats.misses == 2
+
+
+def test_chatllm_uses_cache_from_di(fake_model_server):
+    cache = ResponseCache()
+    di["llm_response_cache"] = cache
+    try:
+        chatllm = BaseChatLLM(base_url=fake_model_server.url(), model="m")
+        chatllm.invoke("hi")
+        asyncio.run(chatllm.ainvoke("hi"))
+    finally:
+        del di["llm_response_cache"]
+    assert len(fake_model_server.received) == 1
+    assert cache.stats.hits == 1
+
+
+def test_errors_are_not_cached(fake_model_server):
+    fake_model_server.responder = lambda path, body: (500, {"error": "down"})
+    cache = ResponseCache()
+    llm = BaseLLM(base_url=fake_model_server.url(), model="m", response_cache=cache)
+    with pytest.raises(RuntimeError):
+        llm.invoke("x")
+    assert len(cache.memory) == 0
@@ -0,0 +1,144 @@
+import asyncio
+import re
+import time
+
+from langchain_core.embeddings import Embeddings
+
+from src.dhti_elixir_base import BaseChatLLM
+from src.dhti_elixir_base.cache import SemanticCache, prompt_text
+
+SYNONYMS = {"summarise": "summarize", "latest": "recent"}
+
+
+class BagOfWordsEmbedding(Embeddings):
+    """Deterministic embedding: word counts over a small vocabulary."""
+
+    vocabulary = ("summarize", "recent", "labs", "medications", "allergies", "user")
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        words = [SYNONYMS.get(w, w) for w in re.findall(r"[a-z]+", text.lower())]
+        return [float(words.count(v)) for v in self.vocabulary]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+
+def _payload(text, model="m", temperature=0.1):
+    return {"model": model, "options": {"temperature": temperature}, "messages": [{"role": "user", "content": text}]}
+
+
+def test_prompt_text_flattens_messages():
+    payload = {
+        "messages": [
+            {"role": "system", "content": "Be brief."},
+            {"role": "user", "content": [{"type": "text", "text": "labs"}, {"type": "image_url"}]},
+        ]
+    }
+    assert prompt_text(payload) == "system: Be brief.\nuser: labs"
+
+
+def test_similar_prompt_hits_within_patient_scope():
+    cache = SemanticCache(BagOfWordsEmbedding(), threshold=0.95)
+    cache.store(_payload("summarize recent labs"), {"answer": 1}, patient_id="p1")
+    assert cache.lookup(_payload("summarise latest labs"), patient_id="p1") == {"answer": 1}
+    assert cache.lookup(_payload("list medications"), patient_id="p1") is None
+    assert cache.stats.hits == 1 and cache.stats.misses == 1
+
+
+def test_never_leaks_across_patients_models_or_options():
+    cache = SemanticCache(BagOfWordsEmbedding())
+    cache.store(_payload("summarize recent labs"), {"answer": 1}, patient_id="p1")
+    assert cache.lookup(_payload("summarize recent labs"), patient_id="p2") is None
+    assert cache.lookup(_payload("summarize recent labs", model="other"), patient_id="p1") is None
+    assert cache.lookup(_payload("summarize recent labs", temperature=0.9), patient_id="p1") is None
+
+
+def test_images_and_tools_are_part_of_the_scope():
+    def with_image(url):
+        payload = _payload("summarize recent labs")
+        payload["messages"][0]["content"] = [
+            {"type": "text", "text": "summarize recent labs"},
+            {"type": "image_url", "image_url": {"url": url}},
+        ]
+        return payload
+
+    cache = SemanticCache(BagOfWordsEmbedding())
+    cache.store(with_image("attachment://aaa"), {"answer": 1}, patient_id="p1")
+    assert cache.lookup(with_image("attachment://aaa"), patient_id="p1") == {"answer": 1}
+    assert cache.lookup(with_image("attachment://bbb"), patient_id="p1") is None
+    assert cache.lookup(_payload("summarize recent labs"), patient_id="p1") is None
+
+    tools = {**_payload("summarize recent labs"), "tools": [{"type": "function", "function": {"name": "labs"}}]}
+    cache.store(tools, {"answer": 2}, patient_id="p1")
+    assert cache.lookup(tools, patient_id="p1") == {"answer": 2}
+    assert cache.lookup({**tools, "tool_choice": "required"}, patient_id="p1") is None
+
+
+def test_entries_are_bounded_and_expire():
+    cache = SemanticCache(BagOfWordsEmbedding(), max_total_entries=3)
+    for n in range(5):
+        cache.store(_payload("labs"), {"answer": n}, patient_id=f"p{n}")
+    assert len(cache) == 3
+    assert cache.lookup(_payload("labs"), patient_id="p0") is None
+    assert cache.lookup(_payload("labs"), patient_id="p4") == {"answer": 4}
+    assert len(cache._index) == 3
+
+    expiring = SemanticCache(BagOfWordsEmbedding(), ttl=0.01)
+    expiring.store(_payload("labs"), {"answer": 1}, patient_id="p1")
+    time.sleep(0.02)
+    expiring.store(_payload("labs"), {"answer": 2}, patient_id="p2")
+    assert len(expiring) == 1
+    assert list(expiring._index) == [expiring._scope(_payload("labs"), "p2")]
+
+
+def test_evicting_within_a_scope_keeps_vectors_matched_to_answers():
+    cache = SemanticCache(BagOfWordsEmbedding(), threshold=0.99, max_entries=2)
+    cache.store(_payload("labs"), {"answer": "labs"}, patient_id="p1")
+    cache.store(_payload("medications"), {"answer": "medications"}, patient_id="p1")
+    cache.store(_payload("allergies"), {"answer": "allergies"}, patient_id="p1")
+    cache.store(_payload("recent allergies"), {"answer": "recent allergies"}, patient_id="p1")
+    assert cache.lookup(_payload("labs"), patient_id="p1") is None
+    assert cache.lookup(_payload("medications"), patient_id="p1") is None
+    assert cache.lookup(_payload("allergies"), patient_id="p1") == {"answer": "allergies"}
+    assert cache.lookup(_payload("recent allergies"), patient_id="p1") == {"answer": "recent allergies"}
+
+    grown = SemanticCache(BagOfWordsEmbedding(), threshold=0.9999)
+    prompts = [" ".join(["labs"] * n + ["allergies"]) for n in range(20)]  # past the initial capacity
+    for prompt in prompts:
+        grown.store(_payload(prompt), {"answer": prompt}, patient_id="p1")
+    assert all(grown.lookup(_payload(prompt), patient_id="p1") == {"answer": prompt} for prompt in prompts)
+
+
+def test_requires_patient_id_by_default():
+    embedding = BagOfWordsEmbedding()
+    cache = SemanticCache(embedding)
+    cache.store(_payload("summarize recent labs"), {"answer": 1})
+    assert cache.lookup(_payload("summarize recent labs")) is None
+    assert embedding.calls == 0
+    open_cache = SemanticCache(embedding, require_patient_id=False)
+    open_cache.store(_payload("summarize recent labs"), {"answer": 1})
+    assert open_cache.lookup(_payload("summarize recent labs")) == {"answer": 1}
+
+
+def test_clear_one_patient():
+    cache = SemanticCache(BagOfWordsEmbedding())
+    cache.store(_payload("labs"), {"answer": 1}, patient_id="p1")
+    cache.store(_payload("labs"), {"answer": 2}, patient_id="p2")
+    cache.clear(patient_id="p1")
+    assert cache.lookup(_payload("labs"), patient_id="p1") is None
+    assert cache.lookup(_payload("labs"), patient_id="p2") == {"answer": 2}
+
+
+def test_chatllm_semantic_cache(fake_model_server):
+    cache = SemanticCache(BagOfWordsEmbedding(), threshold=0.95)
+    chatllm = BaseChatLLM(base_url=fake_model_server.url(), model="m", semantic_cache=cache)
+    assert chatllm.invoke("summarize recent labs", patient_id="p1").content == "ok"
+    assert chatllm.invoke("summarise latest labs", patient_id="p1").content == "ok"
+    asyncio.run(chatllm.ainvoke("summarise latest labs", config={"metadata": {"patient_id": "p1"}}))
+    assert len(fake_model_server.received) == 1
+    chatllm.invoke("summarise latest labs", patient_id="p2")
+    assert len(fake_model_server.received) == 2
@@ -1,7 +1,38 @@
+import pytest
+from kink import di
+
+from src.dhti_elixir_base.transport import (
+    RetryPolicy,
+    reset_circuit_breakers,
+    reset_endpoint_stats,
+    reset_rate_limiters,
+    reset_usage_stats,
+)
+
 from .bootstrap import bootstrap
+from .fake_server import model_server
 
 
 def pytest_configure(config):
     print("Bootstrapping...")
     bootstrap()
 
+
+@pytest.fixture
+def fake_model_server():
+    """A local ``StubModelServer`` with scripted replies, on a random port."""
+    server = model_server()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(autouse=True)
+def fast_retries():
+    """Retry without sleeping and start every test with healthy circuit breakers."""
+    di["llm_retry_policy"] = RetryPolicy(backoff_base=0.0, jitter=False)
+    reset_circuit_breakers()
+    reset_endpoint_stats()
+    reset_rate_limiters()
+    reset_usage_stats()
+    yield
+    del di["llm_retry_policy"]
@@ -0,0 +1,40 @@
+import json
+
+from src.dhti_elixir_base.stub_server import StubModelServer
+
+
+def openai_sse(tokens: list[str]) -> list[str]:
+    """OpenAI/vLLM chat completion stream lines for the given tokens."""
+    lines = ["data: " + json.dumps({"choices": [{"delta": {"content": t}, "finish_reason": None}]}) for t in tokens]
+    lines.append("data: " + json.dumps({"choices": [{"delta": {}, "finish_reason": "stop"}]}))
+    lines.append("data: [DONE]")
+    return lines
+
+
+def llamacpp_sse(tokens: list[str]) -> list[str]:
+    """llama.cpp ``/completion`` stream lines for the given tokens."""
+    lines = ["data: " + json.dumps({"content": t, "stop": False}) for t in tokens]
+    lines.append("data: " + json.dumps({"content": "", "stop": True, "stop_type": "eos"}))
+    return lines
+
+
+def ollama_ndjson(tokens: list[str]) -> list[str]:
+    """Ollama ``/api/chat`` newline-delimited JSON lines for the given tokens."""
+    lines = [json.dumps({"message": {"role": "assistant", "content": t}, "done": False}) for t in tokens]
+    lines.append(json.dumps({"message": {"role": "assistant", "content": ""}, "done": True, "done_reason": "stop"}))
+    return lines
+
+
+def model_server() -> StubModelServer:
+    """A started ``StubModelServer`` whose scripted replies are a plain "ok".
+
+    Tests replace ``responder`` / ``stream_responder`` to script other replies
+    and read the request bodies from ``received``.
+    """
+    return StubModelServer(
+        responder=lambda path, body: (
+            200,
+            {"choices": [{"message": {"role": "assistant", "content": "ok"}}]},
+        ),
+        stream_responder=lambda path, body: openai_sse(["o", "k"]),
+    ).start()
@@ -0,0 +1,125 @@
+import json
+import os
+from unittest.mock import MagicMock
+
+import pytest
+from kink import di
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from src.dhti_elixir_base.rag.bulk import (
+    BulkItem,
+    Checkpoint,
+    bulk_ingest,
+    load_items,
+    main,
+    read_manifest,
+)
+from src.dhti_elixir_base.rag.pdf import synthetic_pdf
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    root = tmp_path / "corpus"
+    (root / "cardiology").mkdir(parents=True)
+    (root / "a.pdf").write_bytes(synthetic_pdf(3, lines_per_page=5))
+    (root / "cardiology" / "b.pdf").write_bytes(synthetic_pdf(2, lines_per_page=5))
+    (root / "notes.txt").write_text("not a pdf")
+    return root
+
+
+def splitter():
+    return RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=0)
+
+
+def added(vectorstore):
+    return [doc for call in vectorstore.add_documents.call_args_list for doc in call.args[0]]
+
+
+def test_load_items(corpus, tmp_path):
+    assert [item.filename for item in load_items(corpus, year=2024)] == ["a.pdf", "b.pdf"]
+    plain = tmp_path / "files.txt"
+    plain.write_text("# guidelines\ncorpus/a.pdf\n\n")
+    assert [item.path for item in read_manifest(plain)] == [corpus / "a.pdf"]
+    manifest = tmp_path / "files.jsonl"
+    manifest.write_text(json.dumps({"path": "corpus/cardiology/b.pdf", "filename": "HF", "year": 2023}) + "\n")
+    (item,) = load_items(manifest, year=2024)
+    assert (item.path, item.filename, item.year) == (corpus / "cardiology" / "b.pdf", "HF", 2023)
+
+
+def test_bulk_ingest_resumes_from_checkpoint(corpus, tmp_path):
+    checkpoint = str(tmp_path / "checkpoint.db")
+    items = load_items(corpus, year=2024)
+    vectorstore = MagicMock()
+    seen = []
+
+    stats = bulk_ingest(
+        items,
+        checkpoint=checkpoint,
+        workers=1,
+        splitter=splitter(),
+        vectorstore=vectorstore,
+        progress=lambda s: seen.append(s.as_dict()["files"]),
+    ).as_dict()
+
+    assert (stats["files"], stats["pages"], stats["failed"]) == (2, 5, 0)
+    assert stats["chunks"] == len(added(vectorstore)) > 0
+    assert stats["pages_per_second"] > 0
+    assert sorted(seen) == [1, 2]
+    docs = added(vectorstore)
+    assert {doc.metadata["filename"] for doc in docs} == {"a.pdf", "b.pdf"}
+    assert len({doc.id for doc in docs}) == len(docs)
+    assert len(Checkpoint(checkpoint)) == 2
+
+    # A second run skips finished files; a changed file is ingested again
+    vectorstore.reset_mock()
+    stats = bulk_ingest(items, checkpoint=checkpoint, workers=1, splitter=splitter(), vectorstore=vectorstore)
+    assert (stats.files, stats.skipped) == (0, 2)
+    vectorstore.add_documents.assert_not_called()
+    path = corpus / "a.pdf"
+    os.utime(path, ns=(0, path.stat().st_mtime_ns + 1_000_000))
+    stats = bulk_ingest(items, checkpoint=checkpoint, workers=1, splitter=splitter(), vectorstore=vectorstore)
+    assert (stats.files, stats.skipped) == (1, 1)
+    # Same content, same chunk ids, so the store replaces the chunks
+    assert {doc.id for doc in added(vectorstore)} <= {doc.id for doc in docs}
+
+
+def test_failed_files_are_retried(corpus, tmp_path):
+    checkpoint = str(tmp_path / "checkpoint.db")
+    items = [BulkItem(corpus / "notes.txt"), BulkItem(corpus / "a.pdf")]
+
+    stats = bulk_ingest(items, checkpoint=checkpoint, workers=1, splitter=splitter(), vectorstore=MagicMock())
+
+    assert (stats.files, stats.failed) == (1, 1)
+    assert list(stats.errors) == [str(corpus / "notes.txt")]
+    stats = bulk_ingest(items, checkpoint=checkpoint, workers=1, splitter=splitter(), vectorstore=MagicMock())
+    assert (stats.skipped, stats.failed) == (1, 1)
+
+
+def test_missing_manifest_entry_fails_alone(corpus, tmp_path):
+    manifest = tmp_path / "files.txt"
+    manifest.write_text("corpus/missing.pdf\ncorpus/a.pdf\n")
+    checkpoint = str(tmp_path / "checkpoint.db")
+
+    stats = bulk_ingest(
+        read_manifest(manifest), checkpoint=checkpoint, workers=1, splitter=splitter(), vectorstore=MagicMock()
+    )
+
+    assert (stats.files, stats.failed) == (1, 1)
+    assert list(stats.errors) == [str(corpus / "missing.pdf")]
+    assert len(Checkpoint(checkpoint)) == 1
+
+
+def test_cli(corpus, tmp_path, capsys):
+    vectorstore = MagicMock()
+    di["text_splitter"] = splitter()
+    di["vectorstore"] = vectorstore
+    try:
+        code = main([str(corpus), "--workers", "1", "--checkpoint", str(tmp_path / "checkpoint.db")])
+    finally:
+        del di["text_splitter"]
+        del di["vectorstore"]
+
+    assert code == 0
+    report = json.loads(capsys.readouterr().out)
+    assert (report["files"], report["pages"]) == (2, 5)
+    assert report["chunks"] == len(added(vectorstore))
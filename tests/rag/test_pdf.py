@@ -0,0 +1,75 @@
+import base64
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from langchain_community.document_loaders.parsers.pdf import PDFMinerParser
+from langchain_core.document_loaders import Blob
+from langchain_core.documents import Document
+
+from src.dhti_elixir_base.rag.pdf import count_pages, parse_pages, synthetic_pdf
+from src.dhti_elixir_base.rag.process import FileProcessingRequest, process_file
+
+PDF = synthetic_pdf(6, lines_per_page=5)
+
+
+def test_count_pages():
+    assert count_pages(PDF) == 6
+
+
+def test_parse_pages_matches_pdfminer_parser():
+    expected = [doc.page_content for doc in PDFMinerParser(mode="page").lazy_parse(Blob(data=PDF))]
+    pages = list(parse_pages(PDF, workers=1))
+    assert [page.page_content for page in pages] == expected
+    assert [page.metadata["page"] for page in pages] == list(range(6))
+    assert pages[2].page_content.startswith("Page 3 line 1:")
+
+
+def test_parse_pages_keeps_order_across_tasks():
+    with ThreadPoolExecutor(3) as executor:
+        pages = list(parse_pages(PDF, workers=3, pages_per_task=1, executor=executor))
+    assert [page.metadata["page"] for page in pages] == list(range(6))
+    assert [page.page_content.split()[1] for page in pages] == list("123456")
+
+
+def test_parse_pages_does_not_ship_the_pdf_per_task():
+    submitted = []
+
+    class RecordingExecutor(ThreadPoolExecutor):
+        def submit(self, fn, /, *args, **kwargs):
+            submitted.append(args)
+            return super().submit(fn, *args, **kwargs)
+
+    with RecordingExecutor(2) as executor:
+        pages = list(parse_pages(PDF, workers=2, pages_per_task=2, executor=executor))
+    assert len(pages) == 6
+    assert len(submitted) == 3
+    assert not any(isinstance(arg, bytes) for args in submitted for arg in args)
+    assert not Path(submitted[0][2]).exists()
+
+
+def test_parse_pages_in_process_pool():
+    pages = list(parse_pages(PDF, workers=2, pages_per_task=2))
+    assert [page.page_content for page in pages] == [page.page_content for page in parse_pages(PDF, workers=1)]
+
+
+def test_process_file_parses_in_parallel(monkeypatch):
+    calls = []
+
+    def fake_parse_pages(content, workers):
+        calls.append((content, workers))
+        return iter([Document(page_content="page1 content", metadata={"page": 0})])
+
+    monkeypatch.setattr("src.dhti_elixir_base.rag.process.parse_pages", fake_parse_pages)
+    splitter = MagicMock()
+    splitter.create_documents.return_value = [Document(page_content="chunk")]
+    vectorstore = MagicMock()
+    monkeypatch.setattr(
+        "src.dhti_elixir_base.rag.process.get_di",
+        lambda name, *args, **kwargs: splitter if name == "text_splitter" else vectorstore,
+    )
+    request = FileProcessingRequest(file=base64.b64encode(PDF).decode("utf-8"), filename="a.pdf", year=2025)
+
+    assert process_file(request, workers=4) == "page1 content"
+    assert calls == [(PDF, 4)]
+    vectorstore.add_documents.assert_called_once()
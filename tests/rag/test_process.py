@@ -1,9 +1,14 @@
 import base64
 from unittest.mock import MagicMock
 
+import pytest
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
 from src.dhti_elixir_base.rag.process import (
     FileProcessingRequest,
+    IndexingError,
     combine_documents,
+    ingest_pages,
     process_file,
     search_vectorstore,
 )
@@ -22,6 +27,9 @@ def test_process_file_extracts_text_and_adds_to_vectorstore(monkeypatch):
     request = FileProcessingRequest(file=fake_b64, filename="test.pdf", year=2025)
 
     class DummyParser:
+        def __init__(self, **kwargs):
+            pass
+
         def lazy_parse(self, blob):
             return [DummyDoc("page1 content")]
 
@@ -32,9 +40,7 @@ def test_process_file_extracts_text_and_adds_to_vectorstore(monkeypatch):
     dummy_vectorstore = MagicMock()
     monkeypatch.setattr(
         "src.dhti_elixir_base.rag.process.get_di",
-        lambda name, *args, **kwargs: (
-            dummy_splitter if name == "text_splitter" else dummy_vectorstore
-        ),
+        lambda name, *args, **kwargs: dummy_splitter if name == "text_splitter" else dummy_vectorstore,
     )
 
     result = process_file(request)
@@ -48,6 +54,9 @@ def test_process_file_handles_vectorstore_exception(monkeypatch, caplog):
     request = FileProcessingRequest(file=fake_b64, filename="test.pdf", year=2025)
 
     class DummyParser:
+        def __init__(self, **kwargs):
+            pass
+
         def lazy_parse(self, blob):
             return [DummyDoc("page1 content")]
 
@@ -59,9 +68,7 @@ def test_process_file_handles_vectorstore_exception(monkeypatch, caplog):
     dummy_vectorstore.add_documents.side_effect = Exception("vectorstore error")
     monkeypatch.setattr(
         "src.dhti_elixir_base.rag.process.get_di",
-        lambda name, *args, **kwargs: (
-            dummy_splitter if name == "text_splitter" else dummy_vectorstore
-        ),
+        lambda name, *args, **kwargs: dummy_splitter if name == "text_splitter" else dummy_vectorstore,
     )
 
     with caplog.at_level("ERROR"):
@@ -69,7 +76,6 @@ def test_process_file_handles_vectorstore_exception(monkeypatch, caplog):
         assert "Error adding documents" in result
 
 
-
 def test_combine_documents_returns_combined_text():
     docs = [DummyDoc("foo"), DummyDoc("bar")]
     combined = combine_documents(docs, document_separator="\n")
@@ -91,3 +97,43 @@ def test_search_vectorstore(monkeypatch):
     )
     result = search_vectorstore("query")
     assert result == ["doc1", "doc2"]
+
+
+def test_ingest_pages_indexes_each_window():
+    pages = [DummyDoc(f"page {i} " + "word " * 30) for i in range(10)]
+    splitter = RecursiveCharacterTextSplitter(chunk_size=100, chunk_overlap=0)
+    vectorstore = MagicMock()
+    seen = []
+
+    stats = ingest_pages(
+        iter(pages),
+        {"filename": "a.pdf", "year": 2025},
+        window=3,
+        splitter=splitter,
+        vectorstore=vectorstore,
+        progress=lambda s: seen.append(s.pages),
+    )
+
+    assert stats.pages == 10
+    assert seen[0] == 4  # a window is indexed as soon as the next page arrives
+    assert vectorstore.add_documents.call_count == stats.windows > 1
+    chunks = [doc for call in vectorstore.add_documents.call_args_list for doc in call.args[0]]
+    assert len(chunks) == stats.chunks
+    assert all(doc.metadata == {"filename": "a.pdf", "year": 2025} for doc in chunks)
+    # Same text as splitting the whole document at once
+    text = "\n\x0c".join(page.page_content for page in pages)
+    whole = [doc.page_content for doc in splitter.create_documents([text])]
+    assert " ".join(doc.page_content for doc in chunks).split() == " ".join(whole).split()
+    assert stats.as_dict()["pages_per_second"] > 0
+
+
+def test_ingest_pages_wraps_vectorstore_errors():
+    vectorstore = MagicMock()
+    vectorstore.add_documents.side_effect = Exception("down")
+    with pytest.raises(IndexingError, match="down"):
+        ingest_pages(
+            [DummyDoc("text")],
+            {},
+            splitter=RecursiveCharacterTextSplitter(chunk_size=100, chunk_overlap=0),
+            vectorstore=vectorstore,
+        )
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from src.dhti_elixir_base.rag.vectors import (
+    QuantizedMatrix,
+    as_float32,
+    cosine_scores,
+    dot_scores,
+    normalize,
+    row_norms,
+    top_k,
+)
+
+
+@pytest.fixture
+def matrix():
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(200, 16)).astype(np.float32)
+
+
+def test_as_float32_shapes():
+    assert as_float32([[1, 2], [3, 4]]).dtype == np.float32
+    assert as_float32([1.0, 2.0]).shape == (1, 2)
+    assert as_float32([]).shape == (0, 0)
+    array = np.zeros((3, 2), dtype=np.float32)
+    assert as_float32(array) is array
+
+
+def test_quantize_round_trip(matrix):
+    quantized = QuantizedMatrix.quantize(matrix)
+    assert quantized.codes.dtype == np.int8 and quantized.shape == matrix.shape
+    assert quantized.nbytes == matrix.nbytes // 4 + 4 * len(matrix)
+    error = np.abs(quantized.dequantize() - matrix).max(axis=1)
+    assert np.all(error <= np.abs(matrix).max(axis=1) / 254 + 1e-6)
+    assert np.allclose(quantized[3], quantized.dequantize()[3])
+    zeros = QuantizedMatrix.quantize([[0.0, 0.0]])
+    assert zeros.dequantize().tolist() == [[0.0, 0.0]]
+
+
+def test_cosine_and_dot_scores(matrix, monkeypatch):
+    query = matrix[7]
+    expected = normalize(matrix) @ (query / np.linalg.norm(query))
+    assert np.allclose(cosine_scores(query, matrix), expected, atol=1e-5)
+    assert np.allclose(dot_scores(query, matrix), matrix @ query, atol=1e-4)
+    # int8 scores are scored in chunks and stay close to float32
+    monkeypatch.setattr("src.dhti_elixir_base.rag.vectors.CHUNK_ROWS", 64)
+    quantized = QuantizedMatrix.quantize(matrix)
+    scores = cosine_scores(query, quantized, row_norms(quantized))
+    assert np.allclose(scores, expected, atol=0.02)
+    assert top_k(scores, 1)[0][0] == 7
+
+
+def test_top_k():
+    indices, scores = top_k(np.array([0.1, 0.9, 0.5, 0.7], dtype=np.float32), 2)
+    assert indices.tolist() == [1, 3]
+    assert scores.tolist() == pytest.approx([0.9, 0.7])
+    assert top_k(np.array([0.3]), 5)[0].tolist() == [0]
+    assert len(top_k(np.array([]), 3)[0]) == 0
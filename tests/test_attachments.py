@@ -0,0 +1,102 @@
+import base64
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from src.dhti_elixir_base import BaseChatLLM
+from src.dhti_elixir_base.attachments import AttachmentStore, format_content
+
+IMAGE = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+B64 = base64.b64encode(IMAGE).decode("ascii")
+DATA_URL = f"data:image/png;base64,{B64}"
+
+
+def test_put_is_content_addressed():
+    store = AttachmentStore()
+    ref = store.put(IMAGE, "image/png")
+    assert ref.startswith("attachment://")
+    assert store.put(DATA_URL) == ref
+    assert store.put(B64, "image/png") == ref
+    assert store.get(ref) == (IMAGE, "image/png")
+    assert len(store) == 1
+    with pytest.raises(KeyError):
+        store.get("attachment://" + "0" * 64)
+
+
+def test_intern_remembers_references_not_strings():
+    store = AttachmentStore()
+    ref = store.intern(DATA_URL)
+    assert ref == store.put(IMAGE, "image/png")
+    assert store.intern("".join(DATA_URL)) == ref  # an equal string from another turn
+    assert store.intern("https://example.org/x.png") == "https://example.org/x.png"
+    assert all(len(value) < 100 for _, value in store._inline._data.values())
+
+
+def test_data_url_is_encoded_once():
+    store = AttachmentStore()
+    ref = store.put(IMAGE, "image/png")
+    assert store.url(ref) == DATA_URL
+    assert store.url(ref) == DATA_URL
+    assert store.as_dict()["encodes"] == 1
+
+
+def test_uploader_called_once_per_attachment():
+    uploaded = []
+
+    def upload(data, mime_type):
+        uploaded.append((data, mime_type))
+        return f"https://files.example.com/{len(uploaded)}"
+
+    store = AttachmentStore(uploader=upload)
+    ref = store.put(IMAGE, "image/png")
+    assert store.url(ref) == store.url(ref) == "https://files.example.com/1"
+    assert uploaded == [(IMAGE, "image/png")]
+
+
+def test_persistent_copy(tmp_path):
+    ref = AttachmentStore(path=str(tmp_path)).put(IMAGE, "image/png")
+    assert AttachmentStore(path=str(tmp_path)).get(ref) == (IMAGE, "image/png")
+
+
+def test_format_content_blocks():
+    store = AttachmentStore(uploader=lambda data, mime_type: "https://files.example.com/1")
+    ref = store.put(IMAGE, "image/png")
+    content = [
+        {"type": "text", "text": "Describe"},
+        {"type": "image_url", "image_url": {"url": ref, "detail": "low"}},
+        {"type": "image_url", "image_url": DATA_URL},
+        {"type": "image", "source_type": "base64", "data": B64, "mime_type": "image/png"},
+        {"type": "image", "url": "https://example.com/x.png"},
+    ]
+    formatted = format_content(content, store)
+    assert formatted[0] == content[0]
+    assert formatted[1] == {
+        "type": "image_url",
+        "image_url": {"url": "https://files.example.com/1", "detail": "low"},
+    }
+    assert [block["image_url"]["url"] for block in formatted[2:]] == [
+        "https://files.example.com/1",
+        "https://files.example.com/1",
+        "https://example.com/x.png",
+    ]
+    assert store.uploads == 1
+    # Without a store inline images pass through, references cannot be resolved
+    assert format_content(content[2:3]) == [{"type": "image_url", "image_url": {"url": DATA_URL}}]
+    with pytest.raises(ValueError):
+        format_content(content[1:2])
+
+
+def test_chatllm_resolves_references():
+    store = AttachmentStore()
+    llm = BaseChatLLM(base_url="https://api.example.com/chat", model="m", attachment_store=store)
+    ref = store.put(IMAGE, "image/png")
+    message = HumanMessage(
+        content=[
+            {"type": "text", "text": "Has it healed?"},
+            {"type": "image_url", "image_url": {"url": ref}},
+        ]
+    )
+    payload = llm._prepare_payload([message])
+    assert payload["messages"][0]["content"][1]["image_url"]["url"] == DATA_URL
+    llm._prepare_payload([message])
+    assert store.as_dict()["encodes"] == 1
@@ -5,18 +5,21 @@ import pytest
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
 @pytest.fixture(scope="session")
 def chain():
     from src.dhti_elixir_base import BaseChain
 
     return BaseChain()
 
+
 def test_get_chain_as_mcp_tool(chain, capsys):
     tool = chain.get_chain_as_mcp_tool()
     print(tool)
     captured = capsys.readouterr()
     assert "base_chain" in str(tool)
 
+
 def test_get_chain_as_langchain_tool(chain, capsys):
     tool = chain.get_chain_as_langchain_tool()
     print(tool)
@@ -28,6 +31,7 @@ def test_get_chain_as_langchain_tool(chain, capsys):
     captured = capsys.readouterr()
     assert "Paris" in captured.out
 
+
 def test_chain_invoke(chain, capsys):
     input_data = {"input": "Answer in one word: What is the capital of France?"}
     result = chain.chain.invoke(input=input_data)  # type: ignore
@@ -35,6 +39,7 @@ def test_chain_invoke(chain, capsys):
     captured = capsys.readouterr()
     assert "Paris" in captured.out
 
+
 def test_chain_invoke_with_hook(chain, capsys):
     input_data = {
         "hookInstance": "test_hook",
@@ -49,6 +54,7 @@ def test_chain_invoke_with_hook(chain, capsys):
     captured = capsys.readouterr()
     assert "Paris" in captured.out
 
+
 def test_chain_invoke_with_order_select(chain, capsys):
     input_data = {
         "hookInstance": "9a9f10a0-0f99-4471-8d98-b44b854ca079",
@@ -108,6 +114,7 @@ def test_chain_invoke_with_order_select(chain, capsys):
     captured = capsys.readouterr()
     assert "Paris" in captured.out
 
+
 def test_base_chain(chain, capsys):
     o = chain.name
     print("Chain name: ", o)
@@ -131,3 +138,90 @@ def test_generate_llm_config(chain):
             "required": ["input"],
         },
     }
+
+
+def test_streaming_chain(chain):
+    input_data = {"input": "Answer in one word: What is the capital of France?"}
+    chunks = list(chain.streaming_chain.stream(input_data))
+    assert "".join(chunks) == "Paris"
+
+
+def test_cascade_keeps_confident_answer():
+    from langchain_core.language_models.fake import FakeListLLM
+
+    from src.dhti_elixir_base import BaseChain
+
+    clinical = FakeListLLM(responses=["Clinical"])
+    chain = BaseChain(main_llm=FakeListLLM(responses=["Paris"]), clinical_llm=clinical, cascade=True)
+    result = chain.chain.invoke({"input": "Capital of France?"})
+    assert "Paris" in str(result)
+    assert chain.model_cascade.as_dict()["escalations"] == 0
+    assert clinical.i == 0
+
+
+def test_cascade_escalates_uncertain_answer():
+    import asyncio
+
+    from langchain_core.language_models.fake import FakeListLLM
+
+    from src.dhti_elixir_base import BaseChain
+
+    chain = BaseChain(
+        main_llm=FakeListLLM(responses=["I'm not sure."]),
+        clinical_llm=FakeListLLM(responses=["Clinical"]),
+        cascade=True,
+    )
+    result = asyncio.run(chain.chain.ainvoke({"input": "Dose?"}))
+    assert "Clinical" in str(result)
+    assert chain.model_cascade.as_dict() == {
+        "requests": 1,
+        "escalations": 1,
+        "escalation_rate": 1.0,
+    }
+
+
+def test_cascade_custom_check():
+    from langchain_core.language_models.fake import FakeListLLM
+
+    from src.dhti_elixir_base import ModelCascade
+
+    cascade = ModelCascade(
+        FakeListLLM(responses=["short"]),
+        FakeListLLM(responses=["a much longer answer"]),
+        lambda answer, prompt: len(answer) < 10,
+    )
+    assert cascade.invoke("q") == "a much longer answer"
+
+
+def test_cascade_requires_a_strong_model():
+    from langchain_core.language_models.fake import FakeListLLM
+
+    from src.dhti_elixir_base import ModelCascade
+
+    with pytest.raises(ValueError, match="strong_llm"):
+        ModelCascade(FakeListLLM(responses=["fast"]), None)
+
+
+def test_default_escalation_check():
+    from src.dhti_elixir_base.cascade import default_escalation_check
+
+    for answer in (
+        "",
+        "  ",
+        "I'm not sure.",
+        "I don’t know the dose for this patient.",  # noqa: RUF001 - typographic apostrophe
+        "Sorry, I cannot determine that from the record.",
+        "Insufficient information to answer.",
+        '{"answer": "5 mg", "confidence": 0.2}',
+    ):
+        assert default_escalation_check(answer), answer
+    # Clinical wording that merely contains an uncertain phrase is an answer
+    for answer in (
+        "The patient is unable to ambulate without assistance.",
+        "Escalate to cardiology if troponin rises.",
+        "Unable to tolerate oral intake; start IV fluids.",
+        "Pain not sure to resolve without physiotherapy; reassess in 2 weeks.",
+        "The family does not know about the diagnosis yet.",
+        '{"answer": "5 mg", "confidence": 0.9}',
+    ):
+        assert not default_escalation_check(answer), answer
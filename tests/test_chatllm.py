@@ -1,4 +1,6 @@
+import asyncio
 import json
+import time
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -6,6 +8,8 @@ from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
 from src.dhti_elixir_base import BaseChatLLM
 
+from .fake_server import llamacpp_sse, ollama_ndjson, openai_sse
+
 
 @pytest.fixture(scope="session")
 def chatllm():
@@ -20,28 +24,13 @@ def chatllm():
 @pytest.fixture
 def mock_successful_response():
     """Fixture for a successful API response."""
-    return {
-        "choices": [
-            {
-                "message": {
-                    "role": "assistant",
-                    "content": "This is a test response from the chat model."
-                }
-            }
-        ]
-    }
+    return {"choices": [{"message": {"role": "assistant", "content": "This is a test response from the chat model."}}]}
 
 
 @pytest.fixture
 def mock_text_response():
     """Fixture for an API response with text field instead of message."""
-    return {
-        "choices": [
-            {
-                "text": "This is a test response using text field."
-            }
-        ]
-    }
+    return {"choices": [{"text": "This is a test response using text field."}]}
 
 
 def test_chatllm_initialization(chatllm):
@@ -84,7 +73,7 @@ def test_prepare_payload_single_human_message(chatllm):
     """Test payload preparation with a single human message."""
     messages = [HumanMessage(content="Hello, how are you?")]
     payload = chatllm._prepare_payload(messages)
-    
+
     assert payload["model"] == "example-chat-model"
     assert "options" in payload
     assert "messages" in payload
@@ -102,7 +91,7 @@ def test_prepare_payload_conversation(chatllm):
         HumanMessage(content="Okay, thanks anyway."),
     ]
     payload = chatllm._prepare_payload(messages)
-    
+
     assert len(payload["messages"]) == 4
     assert payload["messages"][0]["role"] == "system"
     assert payload["messages"][0]["content"] == "You are a helpful assistant."
@@ -114,7 +103,7 @@ def test_prepare_payload_conversation(chatllm):
     assert payload["messages"][3]["content"] == "Okay, thanks anyway."
 
 
-@patch('requests.post')
+@patch("src.dhti_elixir_base.transport.pool.HttpTransport.post")
 def test_generate_successful_response(mock_post, chatllm, mock_successful_response):
     """Test _generate method with a successful API response."""
     # Mock the API response
@@ -122,17 +111,17 @@ def test_generate_successful_response(mock_post, chatllm, mock_successful_respon
     mock_response.json.return_value = mock_successful_response
     mock_response.raise_for_status.return_value = None
     mock_post.return_value = mock_response
-    
+
     # Test generation
     messages = [HumanMessage(content="Hello!")]
     result = chatllm._generate(messages)
-    
+
     # Verify the result
     assert len(result.generations) == 1
     generation = result.generations[0]
     assert isinstance(generation.message, AIMessage)
     assert generation.message.content == "This is a test response from the chat model."
-    
+
     # Verify the API was called correctly
     mock_post.assert_called_once()
     call_args = mock_post.call_args
@@ -141,32 +130,32 @@ def test_generate_successful_response(mock_post, chatllm, mock_successful_respon
     assert call_args[1]["headers"]["Authorization"] == "Bearer test-api-key"
 
 
-@patch('requests.post')
+@patch("src.dhti_elixir_base.transport.pool.HttpTransport.post")
 def test_generate_text_field_response(mock_post, chatllm, mock_text_response):
     """Test _generate method with a response using text field."""
     mock_response = MagicMock()
     mock_response.json.return_value = mock_text_response
     mock_response.raise_for_status.return_value = None
     mock_post.return_value = mock_response
-    
+
     messages = [HumanMessage(content="Test")]
     result = chatllm._generate(messages)
-    
+
     assert len(result.generations) == 1
     assert result.generations[0].message.content == "This is a test response using text field."
 
 
-@patch('requests.post')
+@patch("src.dhti_elixir_base.transport.pool.HttpTransport.post")
 def test_generate_fallback_to_json(mock_post, chatllm):
     """Test _generate method falls back to JSON when content cannot be extracted."""
     mock_response = MagicMock()
     mock_response.json.return_value = {"unexpected": "format"}
     mock_response.raise_for_status.return_value = None
     mock_post.return_value = mock_response
-    
+
     messages = [HumanMessage(content="Test")]
     result = chatllm._generate(messages)
-    
+
     # Should return the JSON as a string
     assert len(result.generations) == 1
     content = result.generations[0].message.content
@@ -174,7 +163,7 @@ def test_generate_fallback_to_json(mock_post, chatllm):
     assert "format" in content
 
 
-@patch('requests.post')
+@patch("src.dhti_elixir_base.transport.pool.HttpTransport.post")
 def test_generate_api_error(mock_post, chatllm):
     """Test _generate method handles API errors correctly."""
     mock_response = MagicMock()
@@ -182,45 +171,47 @@ def test_generate_api_error(mock_post, chatllm):
     mock_response.text = "Internal Server Error"
     mock_response.raise_for_status.side_effect = Exception("API Error")
     mock_post.return_value = mock_response
-    
+
     messages = [HumanMessage(content="Test")]
-    
+
     with pytest.raises(RuntimeError) as exc_info:
         chatllm._generate(messages)
-    
+
     assert "API request failed" in str(exc_info.value)
     assert "status=500" in str(exc_info.value)
+    # 5xx is retried before giving up (default policy: 2 retries)
+    assert mock_post.call_count == 3
 
 
-@patch('requests.post')
+@patch("src.dhti_elixir_base.transport.pool.HttpTransport.post")
 def test_invoke_method(mock_post, chatllm, mock_successful_response):
     """Test that invoke method works correctly (inherited from BaseChatModel)."""
     mock_response = MagicMock()
     mock_response.json.return_value = mock_successful_response
     mock_response.raise_for_status.return_value = None
     mock_post.return_value = mock_response
-    
+
     # Test with string input (should be converted to HumanMessage)
     result = chatllm.invoke("Hello!")
-    
+
     assert isinstance(result, AIMessage)
     assert result.content == "This is a test response from the chat model."
 
 
-@patch('requests.post')
+@patch("src.dhti_elixir_base.transport.pool.HttpTransport.post")
 def test_invoke_with_message_list(mock_post, chatllm, mock_successful_response):
     """Test invoke method with a list of messages."""
     mock_response = MagicMock()
     mock_response.json.return_value = mock_successful_response
     mock_response.raise_for_status.return_value = None
     mock_post.return_value = mock_response
-    
+
     messages = [
         SystemMessage(content="You are helpful."),
         HumanMessage(content="Hi there!"),
     ]
     result = chatllm.invoke(messages)
-    
+
     assert isinstance(result, AIMessage)
     assert result.content == "This is a test response from the chat model."
 
@@ -235,12 +226,246 @@ def test_custom_parameters():
         max_output_tokens=1024,
         top_p=0.9,
     )
-    
+
     assert custom_chatllm.temperature == 0.5
     assert custom_chatllm.max_output_tokens == 1024
     assert custom_chatllm.top_p == 0.9
-    
+
     params = custom_chatllm._get_model_default_parameters
     assert params["temperature"] == 0.5
     assert params["max_output_tokens"] == 1024
     assert params["top_p"] == 0.9
+
+
+def test_agenerate_uses_async_transport(fake_model_server):
+    """ainvoke parses choices[0].message.content from the async client."""
+    fake_model_server.responder = lambda path, body: (
+        200,
+        {"choices": [{"message": {"role": "assistant", "content": body["messages"][-1]["content"].upper()}}]},
+    )
+    chatllm = BaseChatLLM(base_url=fake_model_server.url(), model="m", api_key="k")
+    with patch.object(BaseChatLLM, "_post", side_effect=AssertionError("sync path used")):
+        result = asyncio.run(chatllm.ainvoke([HumanMessage(content="hello")]))
+    assert isinstance(result, AIMessage)
+    assert result.content == "HELLO"
+    assert fake_model_server.received[0]["model"] == "m"
+
+
+def test_agenerate_api_error(fake_model_server):
+    """Non-2xx responses raise RuntimeError on the async path too."""
+    fake_model_server.responder = lambda path, body: (503, {"error": "busy"})
+    chatllm = BaseChatLLM(base_url=fake_model_server.url(), model="m")
+    with pytest.raises(RuntimeError) as exc_info:
+        asyncio.run(chatllm.ainvoke("hi"))
+    assert "status=503" in str(exc_info.value)
+
+
+@pytest.mark.parametrize("fmt", [openai_sse, llamacpp_sse, ollama_ndjson])
+def test_stream_yields_chunks(fake_model_server, fmt):
+    """stream() yields one chunk per token for each supported wire format."""
+    fake_model_server.stream_responder = lambda path, body: fmt(["Hyper", "kalemia"])
+    chatllm = BaseChatLLM(base_url=fake_model_server.url(), model="m")
+    chunks = list(chatllm.stream([HumanMessage(content="K+ 6.1?")]))
+    assert [c.content for c in chunks if c.content] == ["Hyper", "kalemia"]
+    assert fake_model_server.received[0]["stream"] is True
+    assert any(c.response_metadata.get("finish_reason") for c in chunks)
+
+
+def test_astream_yields_chunks(fake_model_server):
+    fake_model_server.stream_responder = lambda path, body: openai_sse(["a", "b", "c"])
+    chatllm = BaseChatLLM(base_url=fake_model_server.url(), model="m")
+
+    async def _collect():
+        return [c.content async for c in chatllm.astream("hi")]
+
+    assert "".join(asyncio.run(_collect())) == "abc"
+
+
+def test_stream_first_token_before_completion(fake_model_server):
+    """The first chunk is available before the server finishes generating."""
+    fake_model_server.stream_responder = lambda path, body: openai_sse(["first", "second", "third"])
+    fake_model_server.tokens_per_second = 1 / 0.3  # one line every 0.3s
+    chatllm = BaseChatLLM(base_url=fake_model_server.url(), model="m")
+    start = time.perf_counter()
+    stream = chatllm.stream("hi")
+    first = next(stream)
+    first_token_time = time.perf_counter() - start
+    rest = list(stream)
+    assert first.content == "first"
+    assert first_token_time < 0.3
+    assert "".join(c.content for c in rest) == "secondthird"
+
+
+def test_stream_api_error(fake_model_server):
+    fake_model_server.stream_responder = lambda path, body: (500, {"error": "boom"})
+    chatllm = BaseChatLLM(base_url=fake_model_server.url(), model="m")
+    with pytest.raises(RuntimeError) as exc_info:
+        list(chatllm.stream("hi"))
+    assert "status=500" in str(exc_info.value)
+    assert "boom" in str(exc_info.value)
+
+
+def get_weather(city: str) -> str:
+    """Get the current weather for a city."""
+    return "sunny"
+
+
+def get_time(city: str) -> str:
+    """Get the local time for a city."""
+    return "noon"
+
+
+def _tool_call(call_id, name, arguments):
+    return {"id": call_id, "type": "function", "function": {"name": name, "arguments": arguments}}
+
+
+def test_bind_tools_sends_schemas_and_parses_parallel_calls(fake_model_server):
+    fake_model_server.responder = lambda path, body: (
+        200,
+        {
+            "choices": [
+                {
+                    "message": {
+                        "role": "assistant",
+                        "content": None,
+                        "tool_calls": [
+                            _tool_call("call_1", "get_weather", '{"city": "Paris"}'),
+                            _tool_call("call_2", "get_time", '{"city": "Rome"}'),
+                        ],
+                    }
+                }
+            ]
+        },
+    )
+    llm = BaseChatLLM(base_url=fake_model_server.url(), model="m")
+    bound = llm.bind_tools([get_weather, get_time], tool_choice="any")
+    result = bound.invoke("Weather in Paris and time in Rome?")
+    body = fake_model_server.received[0]
+    assert [t["function"]["name"] for t in body["tools"]] == ["get_weather", "get_time"]
+    assert body["tool_choice"] == "required"
+    assert result.content == ""
+    assert [(c["name"], c["args"], c["id"]) for c in result.tool_calls] == [
+        ("get_weather", {"city": "Paris"}, "call_1"),
+        ("get_time", {"city": "Rome"}, "call_2"),
+    ]
+
+
+def test_tool_turns_are_serialized(chatllm):
+    from langchain_core.messages import ToolMessage
+
+    messages = [
+        HumanMessage(content="Weather?"),
+        AIMessage(
+            content="",
+            tool_calls=[{"name": "get_weather", "args": {"city": "Paris"}, "id": "call_1"}],
+        ),
+        ToolMessage(content="sunny", tool_call_id="call_1"),
+    ]
+    payload = chatllm._prepare_payload(messages)
+    assert payload["messages"][1]["tool_calls"][0]["function"] == {
+        "name": "get_weather",
+        "arguments": '{"city": "Paris"}',
+    }
+    assert payload["messages"][2] == {
+        "role": "tool",
+        "content": "sunny",
+        "tool_call_id": "call_1",
+    }
+    assert "tools" not in payload
+
+
+def test_ollama_and_invalid_tool_calls(chatllm):
+    result = chatllm._create_chat_result({
+        "message": {
+            "role": "assistant",
+            "content": "",
+            "tool_calls": [
+                {"function": {"name": "get_weather", "arguments": {"city": "Oslo"}}},
+                {"function": {"name": "get_time", "arguments": "{not json"}},
+                {"function": {"arguments": {"city": "Oslo"}}},
+            ],
+        }
+    })
+    message = result.generations[0].message
+    assert message.tool_calls[0]["args"] == {"city": "Oslo"}
+    assert message.tool_calls[0]["id"]
+    assert len(message.tool_calls) == 1
+    assert message.invalid_tool_calls[0]["name"] == "get_time"
+    assert message.invalid_tool_calls[1]["error"] == "Tool call has no function name"
+
+
+def test_tool_schemas_are_cached():
+    from src.dhti_elixir_base.tool_calling import format_tools
+
+    first = format_tools([get_weather])
+    assert format_tools([get_weather])[0] is first[0]
+
+
+def test_stream_tool_call_chunks(fake_model_server):
+    def chunk(index, call_id, name, arguments):
+        call = {"index": index, "function": {"arguments": arguments}}
+        if call_id:
+            call.update(id=call_id, type="function")
+            call["function"]["name"] = name
+        return "data: " + json.dumps({"choices": [{"delta": {"tool_calls": [call]}}]})
+
+    fake_model_server.stream_responder = lambda path, body: [
+        chunk(0, "call_1", "get_weather", '{"city": '),
+        chunk(0, None, None, '"Paris"}'),
+        chunk(1, "call_2", "get_time", '{"city": "Rome"}'),
+        "data: " + json.dumps({"choices": [{"delta": {}, "finish_reason": "tool_calls"}]}),
+        "data: [DONE]",
+    ]
+    llm = BaseChatLLM(base_url=fake_model_server.url(), model="m")
+    message = None
+    for part in llm.bind_tools([get_weather, get_time]).stream("hi"):
+        message = part if message is None else message + part
+    assert [(c["name"], c["args"]) for c in message.tool_calls] == [
+        ("get_weather", {"city": "Paris"}),
+        ("get_time", {"city": "Rome"}),
+    ]
+
+
+def test_prefix_cache_hints():
+    llm = BaseChatLLM(
+        base_url="https://api.example.com/chat",
+        model="m",
+        prefix_cache=True,
+        prefix_cache_slots=4,
+    )
+    system = SystemMessage(content="You are a clinical assistant.")
+    first = llm._prepare_payload([system, HumanMessage(content="Summarize")])
+    later = llm._prepare_payload([
+        system,
+        HumanMessage(content="Summarize"),
+        AIMessage(content="Stable."),
+        HumanMessage(content="Any allergies?"),
+    ])
+    assert first["cache_prompt"] is True
+    assert first["prompt_cache_key"] == later["prompt_cache_key"]
+    assert first["id_slot"] == later["id_slot"] < 4
+    # the history is serialized byte for byte the same as in the previous turn
+    assert json.dumps(later["messages"][:2]) == json.dumps(first["messages"])
+    other = llm._prepare_payload([system, HumanMessage(content="Other")])
+    assert other["prompt_cache_key"] != first["prompt_cache_key"]
+    named = llm._prepare_payload([system], session_id="visit-1")
+    assert named["prompt_cache_key"] == "visit-1"
+    assert "cache_prompt" not in BaseChatLLM(base_url="http://a", model="m")._prepare_payload([system])
+
+
+def test_cached_tokens_in_usage_metadata(chatllm):
+    message = (
+        chatllm
+        ._create_chat_result({
+            "choices": [{"message": {"content": "ok"}}],
+            "usage": {
+                "prompt_tokens": 50,
+                "completion_tokens": 2,
+                "total_tokens": 52,
+                "prompt_tokens_details": {"cached_tokens": 40},
+            },
+        })
+        .generations[0]
+        .message
+    )
+    assert message.usage_metadata["input_token_details"] == {"cache_read": 40}
@@ -1,5 +1,3 @@
-from unittest.mock import MagicMock, patch
-
 import pytest
 
 
@@ -14,6 +12,16 @@ def embedding():
     )
 
 
+@pytest.fixture
+def embedding_server(fake_model_server):
+    """Fake server answering with one ``[len(text)]`` vector per input text."""
+    fake_model_server.responder = lambda path, body: (
+        200,
+        {"embeddings": [[float(len(text))] for text in body["input"]]},
+    )
+    return fake_model_server
+
+
 def test_base_embedding_initialization(embedding):
     """Test that BaseEmbedding initializes correctly."""
     assert embedding.base_url == "https://api.example.com/embeddings"
@@ -21,15 +29,175 @@ def test_base_embedding_initialization(embedding):
     assert embedding.api_key == "test-api-key"
 
 
-@patch("requests.post")
-def test_base_embedding_embed_query(mock_post, embedding):
-    """Test that BaseEmbedding can embed queries with mocked API calls."""
-    mock_response = MagicMock()
-    mock_response.json.return_value = {"embeddings": [[0.1, 0.2, 0.3]]}
-    mock_response.raise_for_status.return_value = None
-    mock_post.return_value = mock_response
+def test_base_embedding_embed_query(embedding_server):
+    """Test that BaseEmbedding can embed queries against a local server."""
+    from src.dhti_elixir_base import BaseEmbedding
 
+    embedding = BaseEmbedding(embedding_server.url(), "example-model", "test-api-key")
     result = embedding.embed_query("test query")
 
-    assert result == [0.1, 0.2, 0.3]
-    mock_post.assert_called_once()
+    assert result == [10.0]
+    assert list(embedding_server.received) == [{"model": "example-model", "input": ["test query"]}]
+
+
+def test_split_batches():
+    from src.dhti_elixir_base.embedding import split_batches
+
+    texts = ["a" * 4, "b" * 4, "c" * 4, "d" * 20, "e"]
+    assert split_batches(texts, max_batch_size=2, max_batch_chars=10) == [
+        ["aaaa", "bbbb"],
+        ["cccc"],
+        ["d" * 20],
+        ["e"],
+    ]
+    assert split_batches([], 2, 10) == []
+
+
+def test_sub_batches_reassembled_in_order(embedding_server):
+    from src.dhti_elixir_base import BaseEmbedding
+
+    embedding = BaseEmbedding(embedding_server.url(), "m", "k", max_batch_size=3, max_concurrency=4)
+    texts = ["x" * n for n in range(1, 11)]
+    assert embedding.embed_documents(texts) == [[float(n)] for n in range(1, 11)]
+    assert sorted(len(body["input"]) for body in embedding_server.received) == [1, 3, 3, 3]
+
+
+def test_failed_sub_batch_retried_alone(embedding_server):
+    from src.dhti_elixir_base import BaseEmbedding
+
+    respond = embedding_server.responder
+    failed = []
+
+    def flaky(path, body):
+        if "fail" in body["input"] and not failed:
+            failed.append(body)
+            return 503, {"error": "busy"}
+        return respond(path, body)
+
+    embedding_server.responder = flaky
+    embedding = BaseEmbedding(embedding_server.url(), "m", "k", max_batch_size=2)
+    vectors = embedding.embed_documents(["aa", "bbb", "fail", "c"])
+    assert vectors == [[2.0], [3.0], [4.0], [1.0]]
+    # only the failing sub-batch was sent twice
+    assert len(embedding_server.received) == 3
+
+
+def test_too_large_sub_batch_is_split(embedding_server):
+    from src.dhti_elixir_base import BaseEmbedding
+
+    respond = embedding_server.responder
+    embedding_server.responder = lambda path, body: (
+        (413, {"error": "too large"}) if len(body["input"]) > 1 else respond(path, body)
+    )
+    embedding = BaseEmbedding(embedding_server.url(), "m", "k")
+    assert embedding.embed_documents(["a", "bb", "ccc"]) == [[1.0], [2.0], [3.0]]
+
+
+def test_openai_response_format(fake_model_server):
+    from src.dhti_elixir_base import BaseEmbedding
+
+    fake_model_server.responder = lambda path, body: (
+        200,
+        {"data": [{"index": 1, "embedding": [2.0]}, {"index": 0, "embedding": [1.0]}]},
+    )
+    embedding = BaseEmbedding(fake_model_server.url(), "m", "k")
+    assert embedding.embed_documents(["a", "b"]) == [[1.0], [2.0]]
+    fake_model_server.responder = lambda path, body: (200, {"unexpected": True})
+    with pytest.raises(ValueError):
+        embedding.embed_query("a")
+
+
+def test_async_embeddings(embedding_server):
+    import asyncio
+
+    from src.dhti_elixir_base import BaseEmbedding
+
+    embedding = BaseEmbedding(embedding_server.url(), "m", "k", max_batch_size=2)
+    texts = ["x" * n for n in range(1, 8)]
+
+    async def run():
+        return await asyncio.gather(embedding.aembed_documents(texts), embedding.aembed_query("abc"))
+
+    documents, query = asyncio.run(run())
+    assert documents == [[float(n)] for n in range(1, 8)]
+    assert query == [3.0]
+    assert len(embedding_server.received) == 5
+
+
+def test_async_cancellation_stops_sub_batches(embedding_server):
+    import asyncio
+    import time
+
+    from src.dhti_elixir_base import BaseEmbedding
+
+    respond = embedding_server.responder
+
+    def slow(path, body):
+        time.sleep(0.5)
+        return respond(path, body)
+
+    embedding_server.responder = slow
+    embedding = BaseEmbedding(embedding_server.url(), "m", "k", max_batch_size=1)
+
+    async def run():
+        task = asyncio.ensure_future(embedding.aembed_documents([str(n) for n in range(8)]))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # nothing queued behind the semaphore was sent
+        await asyncio.sleep(0.6)
+
+    asyncio.run(run())
+    assert len(embedding_server.received) == 4
+
+
+def test_array_return_types(embedding_server):
+    import numpy as np
+
+    from src.dhti_elixir_base import BaseEmbedding
+    from src.dhti_elixir_base.rag.vectors import QuantizedMatrix
+
+    texts = ["a", "bb", "ccc"]
+    matrix = BaseEmbedding(embedding_server.url(), "m", "k", return_type="float32").embed_documents(texts)
+    assert matrix.dtype == np.float32 and matrix.flags["C_CONTIGUOUS"]
+    assert matrix.tolist() == [[1.0], [2.0], [3.0]]
+    quantized = BaseEmbedding(embedding_server.url(), "m", "k", return_type="int8").embed_documents(texts)
+    assert isinstance(quantized, QuantizedMatrix)
+    assert np.allclose(quantized.dequantize(), matrix)
+    query = BaseEmbedding(embedding_server.url(), "m", "k", return_type="float32").embed_query("abcd")
+    assert query.shape == (1,)
+    with pytest.raises(ValueError):
+        BaseEmbedding(embedding_server.url(), "m", "k", return_type="float16")
+
+
+def test_duplicates_sent_once(embedding_server):
+    from src.dhti_elixir_base import BaseEmbedding
+    from src.dhti_elixir_base.cache import EmbeddingCache
+
+    embedding = BaseEmbedding(embedding_server.url(), "m", "k", cache=EmbeddingCache())
+    texts = ["Disclaimer", "dose 5 mg", "Disclaimer", "Header", "Disclaimer"]
+    vectors = embedding.embed_documents(texts)
+    assert vectors == [[10.0], [9.0], [10.0], [6.0], [10.0]]
+    assert vectors[0] is not vectors[2]
+    assert embedding_server.received[0]["input"] == ["Header", "dose 5 mg", "Disclaimer"]
+    assert embedding.stats.last_call == {
+        "texts": 5,
+        "duplicates": 2,
+        "cached": 0,
+        "sent": 3,
+        "saved": 2,
+    }
+    embedding.embed_documents(["Header", "new", "new"])
+    assert embedding.stats.last_call["saved"] == 2
+    assert embedding.stats.as_dict()["saved"] == 4
+
+
+def test_length_sorted_packing(embedding_server):
+    from src.dhti_elixir_base import BaseEmbedding
+
+    embedding = BaseEmbedding(embedding_server.url(), "m", "k", max_batch_size=2)
+    texts = ["x" * 50, "y", "z" * 49, "w" * 2]
+    assert embedding.embed_documents(texts) == [[50.0], [1.0], [49.0], [2.0]]
+    batches = sorted(body["input"] for body in embedding_server.received)
+    assert batches == [["y", "ww"], ["z" * 49, "x" * 50]]
@@ -1,3 +1,6 @@
+import asyncio
+import threading
+import time
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -21,7 +24,7 @@ def test_base_llm_initialization(llm):
     assert llm.api_key == "test-api-key"
 
 
-@patch("requests.post")
+@patch("src.dhti_elixir_base.transport.pool.HttpTransport.post")
 def test_base_llm_invoke(mock_post, llm):
     """Test that BaseLLM can invoke with mocked API calls."""
     mock_response = MagicMock()
@@ -33,3 +36,101 @@ def test_base_llm_invoke(mock_post, llm):
 
     assert result is not None
     mock_post.assert_called_once()
+
+
+def test_base_llm_ainvoke_uses_async_transport(fake_model_server):
+    """ainvoke goes through the async client rather than the sync path."""
+    from src.dhti_elixir_base import BaseLLM
+
+    llm = BaseLLM(base_url=fake_model_server.url(), model="m")
+    with patch.object(BaseLLM, "_post", side_effect=AssertionError("sync path used")):
+        results = asyncio.run(llm.abatch([f"prompt {i}" for i in range(10)]))
+    assert results == ["ok"] * 10
+    assert len(fake_model_server.received) == 10
+
+
+def _echo_with_delay(server, delay=0.05, fail_on=None):
+    """Responder that echoes the prompt and records the peak number of requests in flight."""
+    state = {"active": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def responder(path, body):
+        prompt = body["messages"][-1]["content"]
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(delay)
+        with lock:
+            state["active"] -= 1
+        if prompt == fail_on:
+            return 500, {"error": "bad prompt"}
+        return 200, {"choices": [{"message": {"content": prompt.upper()}}]}
+
+    server.responder = responder
+    return state
+
+
+def test_batch_is_concurrent_and_ordered(fake_model_server):
+    from src.dhti_elixir_base import BaseLLM
+
+    state = _echo_with_delay(fake_model_server)
+    llm = BaseLLM(base_url=fake_model_server.url(), model="m", max_concurrency=4)
+    prompts = [f"patient {i}" for i in range(12)]
+    assert llm.batch(prompts) == [p.upper() for p in prompts]
+    assert 1 < state["peak"] <= 4
+
+
+def test_generate_reports_latency(fake_model_server):
+    from src.dhti_elixir_base import BaseLLM
+
+    _echo_with_delay(fake_model_server)
+    llm = BaseLLM(base_url=fake_model_server.url(), model="m")
+    result = llm.generate(["a", "b"])
+    assert [g[0].text for g in result.generations] == ["A", "B"]
+    assert all(g[0].generation_info["latency"] >= 0.05 for g in result.generations)
+
+
+def test_generate_batch_isolates_failures(fake_model_server):
+    from src.dhti_elixir_base import BaseLLM
+
+    state = _echo_with_delay(fake_model_server, fail_on="b")
+    llm = BaseLLM(base_url=fake_model_server.url(), model="m")
+    items = llm.generate_batch(["a", "b", "c"], max_concurrency=2)
+    assert [item.index for item in items] == [0, 1, 2]
+    assert [item.text for item in items] == ["A", None, "C"]
+    assert not items[1].ok and "status=500" in str(items[1].error)
+    assert state["peak"] <= 2
+
+
+def test_agenerate_batch_bounded(fake_model_server):
+    from src.dhti_elixir_base import BaseLLM
+
+    state = _echo_with_delay(fake_model_server)
+    llm = BaseLLM(base_url=fake_model_server.url(), model="m")
+    items = asyncio.run(llm.agenerate_batch([str(i) for i in range(9)], max_concurrency=3))
+    assert [item.text for item in items] == [str(i) for i in range(9)]
+    assert all(item.latency > 0 for item in items)
+    assert 1 < state["peak"] <= 3
+
+
+def test_subclass_call_override_is_used(fake_model_server):
+    from src.dhti_elixir_base import BaseLLM
+
+    class Shouting(BaseLLM):
+        def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+            return super()._call(prompt, stop, run_manager, **kwargs) + "!"
+
+    _echo_with_delay(fake_model_server)
+    llm = Shouting(base_url=fake_model_server.url(), model="m")
+    assert llm.invoke("a") == "A!"
+    assert llm.batch(["a", "b"]) == ["A!", "B!"]
+    # Without an _acall override, async calls go through the sync _call too
+    assert asyncio.run(llm.ainvoke("c")) == "C!"
+
+    class AsyncShouting(BaseLLM):
+        async def _acall(self, prompt, stop=None, run_manager=None, **kwargs):
+            return (await super()._acall(prompt, stop, run_manager, **kwargs)) + "?"
+
+    llm = AsyncShouting(base_url=fake_model_server.url(), model="m")
+    assert asyncio.run(llm.abatch(["a", "b"])) == ["A?", "B?"]
+    assert llm.invoke("a") == "A"
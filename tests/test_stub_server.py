@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src.dhti_elixir_base import BaseChatLLM, BaseEmbedding, BaseLLM
+from src.dhti_elixir_base.stub_server import StubModelServer
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**kwargs):
+        server = StubModelServer(**kwargs).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def test_latency_samples_are_reproducible():
+    server = StubModelServer(latency="lognormal", latency_mean=0.1, seed=3)
+    first = [server.sample_latency(server._next_rng()) for _ in range(50)]
+    server.requests = 0
+    assert [server.sample_latency(server._next_rng()) for _ in range(50)] == first
+    assert 0.05 < sum(first) / len(first) < 0.2
+    server.stop()
+
+
+def test_unknown_distribution_rejected():
+    with pytest.raises(ValueError):
+        StubModelServer(latency="pareto")
+
+
+def test_openai_chat_with_usage(stub):
+    server = stub(completion_tokens=4)
+    llm = BaseChatLLM(base_url=server.url(), model="stub")
+    message = llm.invoke("Hello")
+    assert len(message.content.split()) == 4
+    assert message.usage_metadata["output_tokens"] == 4
+    # same prompt, same completion
+    assert llm.invoke("Hello").content == message.content
+
+
+def test_ollama_routes(stub):
+    server = stub(completion_tokens=3)
+    chat = httpx.post(server.url("/api/chat"), json={"messages": [{"role": "user", "content": "hi"}]}).json()
+    assert len(chat["message"]["content"].split()) == 3
+    reply = httpx.post(server.url("/api/generate"), json={"prompt": "hi"}).json()
+    assert reply["done"] is True and reply["eval_count"] == 3
+    assert reply["response"] == chat["message"]["content"]
+
+
+def test_completions_route(stub):
+    server = stub(completion_tokens=3)
+    llm = BaseLLM(base_url=server.url("/v1/completions"), model="stub")
+    assert len(llm.invoke("hi").split()) == 3
+
+
+def test_streaming_with_token_rate(stub):
+    server = stub(completion_tokens=5, tokens_per_second=100)
+    llm = BaseChatLLM(base_url=server.url(), model="stub")
+    chunks = [c.content for c in llm.stream("hi") if c.content]
+    assert len(chunks) == 5
+    with httpx.stream("POST", server.url("/api/chat"), json={"stream": True}) as resp:
+        events = [json.loads(line) for line in resp.iter_lines() if line]
+    assert events[-1]["done"] is True and len(events) == 6
+
+
+def test_injected_errors(stub):
+    server = stub(error_rate=1.0, error_status=429)
+    llm = BaseChatLLM(base_url=server.url(), model="stub")
+    with pytest.raises(RuntimeError, match="429"):
+        asyncio.run(llm.ainvoke("hi"))
+    assert server.errors == 3  # first attempt plus two retries
+
+
+def test_received_bodies_are_bounded(stub):
+    server = stub(max_received=2)
+    for n in range(3):
+        httpx.post(server.url("/api/generate"), json={"prompt": f"hi {n}"})
+    assert [body["prompt"] for body in server.received] == ["hi 1", "hi 2"]
+    assert server.requests == 3
+    quiet = stub(max_received=0)
+    httpx.post(quiet.url("/api/generate"), json={"prompt": "hi"})
+    assert len(quiet.received) == 0
+
+
+def test_embeddings(stub):
+    server = stub(embedding_dim=4)
+    embedding = BaseEmbedding(server.url("/v1/embeddings"), "stub", "key")
+    vectors = embedding.embed_documents(["a", "b", "a"])
+    assert len(vectors[0]) == 4
+    assert vectors[0] == vectors[2] != vectors[1]
@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from src.dhti_elixir_base import BaseChatLLM, BaseLLM
+from src.dhti_elixir_base.transport import (
+    LoadBalancer,
+    endpoint_stats,
+    get_circuit_breaker,
+)
+from src.dhti_elixir_base.transport.balancer import get_endpoint_stats
+
+from ..fake_server import model_server
+
+
+@pytest.fixture
+def replicas():
+    servers = [model_server() for _ in range(2)]
+    for n, server in enumerate(servers):
+        server.responder = lambda path, body, n=n: (
+            200,
+            {"choices": [{"message": {"content": f"replica{n}"}}]},
+        )
+    yield servers
+    for server in servers:
+        server.stop()
+
+
+def test_list_base_url_sets_endpoints():
+    llm = BaseLLM(base_url=["http://a/v1", "http://b/v1"], model="m")
+    assert llm.base_url == "http://a/v1"
+    assert llm.endpoints == ["http://a/v1", "http://b/v1"]
+    single = BaseChatLLM(base_url="http://a/v1", model="m")
+    assert single.endpoints == []
+
+
+def test_unknown_strategy_rejected():
+    with pytest.raises(ValueError):
+        LoadBalancer(["http://a"], "round_robin")
+
+
+def test_least_outstanding_prefers_idle_replica():
+    balancer = LoadBalancer(["http://a", "http://b"])
+    with balancer.track("http://a"):
+        assert balancer.pick() == "http://b"
+    assert endpoint_stats()["http://a"]["outstanding"] == 0
+
+
+def test_ewma_prefers_faster_replica():
+    balancer = LoadBalancer(["http://a", "http://b"], "ewma")
+    get_endpoint_stats("http://a").ewma_latency = 0.5
+    get_endpoint_stats("http://b").ewma_latency = 0.05
+    assert {balancer.pick() for _ in range(10)} == {"http://b"}
+
+
+def test_open_breaker_ejects_replica():
+    balancer = LoadBalancer(["http://a", "http://b"])
+    breaker = get_circuit_breaker("http://a")
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    assert {balancer.pick() for _ in range(10)} == {"http://b"}
+
+
+def test_requests_spread_across_replicas(replicas):
+    llm = BaseChatLLM(base_url=[s.url() for s in replicas], model="m")
+
+    async def burst():
+        return await asyncio.gather(*(llm.ainvoke(f"hi {n}") for n in range(8)))
+
+    asyncio.run(burst())
+    assert all(len(s.received) > 0 for s in replicas)
+    assert sum(len(s.received) for s in replicas) == 8
+
+
+def test_retry_goes_to_other_replica(replicas):
+    replicas[0].responder = lambda path, body: (503, {"error": "down"})
+    llm = BaseLLM(base_url=[s.url() for s in replicas], model="m")
+    for _ in range(4):
+        assert llm.invoke("hi") == "replica1"
+    # the failing replica is tried at most once per request
+    assert len(replicas[0].received) <= 4
+
+
+def test_ewma_routes_away_from_slow_replica(replicas):
+    slow = replicas[0]
+    fast_responder = slow.responder
+
+    def slow_responder(path, body):
+        time.sleep(0.05)
+        return fast_responder(path, body)
+
+    slow.responder = slow_responder
+    llm = BaseLLM(base_url=[s.url() for s in replicas], model="m", lb_strategy="ewma")
+    for _ in range(12):
+        llm.invoke("hi")
+    assert len(replicas[1].received) > len(slow.received)
+
+
+def test_affinity_is_sticky_and_fails_over():
+    endpoints = ["http://a", "http://b", "http://c"]
+    picks = {key: LoadBalancer(endpoints, affinity=key).pick() for key in "pqrstuvw"}
+    assert len(set(picks.values())) > 1
+    for key, url in picks.items():
+        balancer = LoadBalancer(endpoints, affinity=key)
+        with balancer.track(url):
+            assert balancer.pick() == url
+        others = [e for e in endpoints if e != url]
+        assert balancer.pick(exclude=[url]) in others
+        # only the keys of the excluded replica move
+        assert LoadBalancer(others, affinity=key).pick() == balancer.pick(exclude=[url])
+
+
+def test_conversation_sticks_to_one_replica(replicas):
+    llm = BaseChatLLM(base_url=[s.url() for s in replicas], model="m", prefix_cache=True)
+    for n in range(6):
+        llm.invoke([HumanMessage(content="Summarize the chart"), HumanMessage(content=str(n))])
+    assert sorted(len(s.received) for s in replicas) == [0, 6]
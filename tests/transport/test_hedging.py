@@ -0,0 +1,144 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.dhti_elixir_base import BaseChatLLM
+from src.dhti_elixir_base.transport import HedgePolicy
+from src.dhti_elixir_base.transport.hedging import hedged_call
+
+from ..fake_server import model_server
+
+
+def _slow_first(server, delay=0.5):
+    """Answer the first request after ``delay`` seconds and the rest immediately."""
+    lock = threading.Lock()
+    calls = {"n": 0}
+
+    def responder(path, body):
+        with lock:
+            calls["n"] += 1
+            n = calls["n"]
+        if n == 1:
+            time.sleep(delay)
+            return 200, {"choices": [{"message": {"content": "slow"}}]}
+        return 200, {"choices": [{"message": {"content": "fast"}}]}
+
+    server.responder = responder
+    return responder
+
+
+@pytest.fixture
+def replica():
+    """A second model server, so hedges have another replica to go to."""
+    server = model_server()
+    yield server
+    server.stop()
+
+
+def test_delay_uses_percentile_after_warmup():
+    policy = HedgePolicy(percentile=90, initial_delay=2.0, min_samples=10)
+    assert policy.delay() == 2.0
+    for n in range(1, 11):
+        policy.record(n / 10)
+    assert policy.delay() == 1.0
+    policy = HedgePolicy(percentile=50, min_samples=1, min_delay=0.2)
+    policy.record(0.01)
+    assert policy.delay() == 0.2
+
+
+def test_budget_limits_hedges():
+    policy = HedgePolicy(budget=0.1)
+    assert policy.allow_hedge()
+    policy.record(0.1, hedged=True)
+    assert not policy.allow_hedge()
+    for _ in range(10):
+        policy.record(0.1)
+    assert policy.allow_hedge()
+
+
+def test_hedge_wins_over_slow_request(fake_model_server, replica):
+    replica.responder = _slow_first(fake_model_server)
+    policy = HedgePolicy(initial_delay=0.05, budget=1.0)
+    llm = BaseChatLLM(base_url=[fake_model_server.url(), replica.url()], model="m", hedge_policy=policy)
+    start = time.perf_counter()
+    assert llm.invoke("hi").content == "fast"
+    assert time.perf_counter() - start < 0.4
+    # The hedge went to the replica the first request did not use
+    assert len(fake_model_server.received) == len(replica.received) == 1
+    assert policy.as_dict()["hedges"] == 1
+
+
+@pytest.mark.parametrize("prefix_cache", [False, True])
+def test_hedge_avoids_the_primary_replica(fake_model_server, replica, prefix_cache):
+    replica.responder = _slow_first(fake_model_server)
+    policy = HedgePolicy(initial_delay=0.05, budget=1.0)
+    llm = BaseChatLLM(
+        base_url=[fake_model_server.url(), replica.url()],
+        model="m",
+        hedge_policy=policy,
+        prefix_cache=prefix_cache,
+        lb_strategy="ewma",
+    )
+    # Rendezvous affinity and ewma both keep choosing the same replica
+    assert llm.invoke("hi").content == "fast"
+    assert len(fake_model_server.received) == len(replica.received) == 1
+
+
+def test_single_endpoint_is_not_hedged(fake_model_server):
+    _slow_first(fake_model_server, delay=0.2)
+    policy = HedgePolicy(initial_delay=0.05, budget=1.0)
+    llm = BaseChatLLM(base_url=fake_model_server.url(), model="m", hedge_policy=policy)
+    assert llm.invoke("hi").content == "slow"
+    assert asyncio.run(llm.ainvoke("hi")).content == "fast"
+    assert len(fake_model_server.received) == 2
+    assert policy.hedges == 0
+
+
+def test_hedge_counters():
+    policy = HedgePolicy(initial_delay=0.05, budget=1.0)
+    calls = iter([0.5, 0.0])
+
+    def call():
+        delay = next(calls)
+        time.sleep(delay)
+        return delay
+
+    assert hedged_call(call, policy) == 0.0
+    assert policy.as_dict() == {
+        "requests": 1,
+        "hedges": 1,
+        "hedge_wins": 1,
+        "hedge_rate": 1.0,
+    }
+
+
+def test_blocking_calls_share_one_pool():
+    policy = HedgePolicy(initial_delay=0.05, budget=1.0, max_workers=4)
+    threads = set()
+
+    def call():
+        threads.add(threading.current_thread().name)
+        return 1
+
+    assert sum(hedged_call(call, policy) for _ in range(20)) == 20
+    assert policy.executor() is policy.executor()
+    assert len(threads) <= 4 and all(name.startswith("hedge") for name in threads)
+
+
+def test_async_hedge_cancels_loser(fake_model_server, replica):
+    replica.responder = _slow_first(fake_model_server)
+    policy = HedgePolicy(initial_delay=0.05, budget=1.0)
+    llm = BaseChatLLM(base_url=[fake_model_server.url(), replica.url()], model="m", hedge_policy=policy)
+    result = asyncio.run(llm.ainvoke("hi"))
+    assert result.content == "fast"
+    assert policy.hedges == 1
+
+
+def test_fast_response_is_not_hedged(fake_model_server):
+    policy = HedgePolicy(initial_delay=1.0, budget=1.0)
+    llm = BaseChatLLM(base_url=fake_model_server.url(), model="m", hedge_policy=policy)
+    llm.invoke("hi")
+    assert len(fake_model_server.received) == 1
+    assert policy.hedges == 0 and policy.requests == 1
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from kink import di
+
+from src.dhti_elixir_base import BaseChatLLM, BaseLLM
+from src.dhti_elixir_base.transport import HttpTransport, close_transport, get_transport
+
+
+@pytest.fixture
+def transport():
+    with HttpTransport(max_connections_per_host=4) as transport:
+        yield transport
+
+
+def test_connections_are_reused_across_calls(fake_model_server, transport):
+    """Sequential generations share one keep-alive connection."""
+    llm = BaseLLM(base_url=fake_model_server.url(), model="m", transport=transport)
+    for _ in range(5):
+        assert llm.invoke("hello") == "ok"
+    assert len(fake_model_server.received) == 5
+    assert fake_model_server.connections == 1
+
+
+def test_llm_and_chatllm_share_pool(fake_model_server, transport):
+    """Both clients pointing at the same origin use the same pooled client."""
+    llm = BaseLLM(base_url=fake_model_server.url(), model="m", transport=transport)
+    chatllm = BaseChatLLM(base_url=fake_model_server.url(), model="m", transport=transport)
+    llm.invoke("a")
+    chatllm.invoke("b")
+    assert fake_model_server.connections == 1
+    assert len(transport._clients) == 1
+
+
+def test_pool_limits(transport):
+    limits = transport.limits
+    assert limits.max_connections == 4
+    assert limits.max_keepalive_connections == 10
+
+
+def test_closed_transport_rejects_requests(fake_model_server):
+    transport = HttpTransport()
+    transport.client(fake_model_server.url())
+    transport.close()
+    assert transport.closed
+    with pytest.raises(RuntimeError):
+        transport.client(fake_model_server.url())
+
+
+def test_get_transport_prefers_di():
+    custom = HttpTransport()
+    di["http_transport"] = custom
+    try:
+        assert get_transport() is custom
+    finally:
+        del di["http_transport"]
+    shared = get_transport()
+    assert shared is get_transport()
+    close_transport()
+    assert get_transport() is not shared
+
+
+def test_async_client_is_per_loop(fake_model_server, transport):
+    async def _clients():
+        client = transport.async_client(fake_model_server.url())
+        assert transport.async_client(fake_model_server.url()) is client
+        return client
+
+    first = asyncio.run(_clients())
+    second = asyncio.run(_clients())
+    assert first is not second
+    asyncio.run(transport.aclose())
+    assert transport.closed
@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import pytest
+from kink import di
+
+from src.dhti_elixir_base import BaseEmbedding, BaseLLM
+from src.dhti_elixir_base.transport import RateLimiter, rate_limiters
+from src.dhti_elixir_base.transport.ratelimit import (
+    TokenBucket,
+    estimate_tokens,
+    get_rate_limiter,
+)
+
+
+@pytest.fixture
+def rate_limits():
+    def configure(limits):
+        di["llm_rate_limits"] = limits
+
+    yield configure
+    if "llm_rate_limits" in di:
+        del di["llm_rate_limits"]
+
+
+def test_bucket_allows_burst_then_waits():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.reserve(1) == 0
+    assert bucket.reserve(1) == 0
+    assert bucket.reserve(1) == pytest.approx(0.1, abs=0.02)
+    # debt queues later callers behind earlier ones
+    assert bucket.reserve(1) == pytest.approx(0.2, abs=0.02)
+
+
+def test_token_bucket_limits_large_requests():
+    limiter = RateLimiter(tokens_per_minute=600)  # 10 tokens/s
+    assert limiter.reserve(600) == 0
+    assert limiter.reserve(5) == pytest.approx(0.5, abs=0.05)
+    assert limiter.as_dict()["delayed"] == 1
+
+
+def test_estimate_tokens():
+    chat = {"messages": [{"role": "user", "content": "x" * 400}], "options": {"max_output_tokens": 50}}
+    assert estimate_tokens(chat) == 151
+    assert estimate_tokens({"input": ["abcd", "efgh"]}) == 3
+
+
+def test_limits_resolved_by_url_origin_and_wildcard(rate_limits):
+    rate_limits({"http://a:1": {"requests_per_minute": 60}, "*": {"requests_per_minute": 5}})
+    first = get_rate_limiter("http://a:1/v1/chat")
+    assert first is get_rate_limiter("http://a:1/v1/embeddings")
+    assert first.requests.rate == 1
+    assert get_rate_limiter("http://b/v1").requests.capacity == 5
+
+
+def test_unconfigured_endpoint_is_not_limited():
+    assert get_rate_limiter("http://a/v1") is None
+
+
+def test_limits_registered_after_first_request_apply(rate_limits):
+    assert get_rate_limiter("http://a/v1") is None
+    rate_limits({"*": {"requests_per_minute": 60}})
+    limiter = get_rate_limiter("http://a/v1")
+    assert limiter is not None
+    assert get_rate_limiter("http://a/v1") is limiter
+
+
+def test_llm_requests_are_paced(fake_model_server, rate_limits):
+    rate_limits({"*": {"requests_per_minute": 600, "burst": 0.005}})  # 10/s, burst of 3
+    llm = BaseLLM(base_url=fake_model_server.url(), model="m")
+
+    async def burst():
+        await asyncio.gather(*(llm.ainvoke(f"q{n}") for n in range(6)))
+
+    start = time.perf_counter()
+    asyncio.run(burst())
+    assert time.perf_counter() - start >= 0.25
+    stats = next(iter(rate_limiters().values()))
+    assert stats["admitted"] == 6 and stats["delayed"] >= 2
+
+
+def test_embedding_shares_endpoint_limiter(fake_model_server, rate_limits):
+    rate_limits({"*": {"requests_per_minute": 60}})
+    fake_model_server.responder = lambda path, body: (200, {"embeddings": [[0.1]]})
+    BaseEmbedding(fake_model_server.url(), "m", "k").embed_query("hi")
+    BaseLLM(base_url=fake_model_server.url(), model="m").invoke("hi")
+    assert next(iter(rate_limiters().values()))["admitted"] == 2
@@ -0,0 +1,160 @@
+import asyncio
+import time
+from email.utils import formatdate
+
+import pytest
+
+from src.dhti_elixir_base import BaseChatLLM, BaseLLM
+from src.dhti_elixir_base.transport import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    circuit_breakers,
+    get_circuit_breaker,
+)
+
+
+def _flaky(server, failures, status=503, headers=None):
+    """Fail the first ``failures`` requests with ``status``, then succeed."""
+    calls = {"n": 0}
+
+    def responder(path, body):
+        calls["n"] += 1
+        if calls["n"] <= failures:
+            return status, {"error": "busy"}, headers or {}
+        return 200, {"choices": [{"message": {"content": "recovered"}}]}
+
+    server.responder = responder
+
+
+def test_backoff_is_exponential_and_capped():
+    policy = RetryPolicy(backoff_base=0.5, backoff_max=3.0, jitter=False)
+    assert [policy.delay(n) for n in range(4)] == [0.5, 1.0, 2.0, 3.0]
+    jittered = RetryPolicy(backoff_base=0.5, backoff_max=3.0)
+    assert all(0 <= jittered.delay(2) <= 2.0 for _ in range(20))
+
+
+def test_retry_after_seconds_and_http_date():
+    policy = RetryPolicy(backoff_max=30.0, jitter=False)
+    assert policy.delay(0, "7") == 7.0
+    assert 8.0 < policy.delay(0, formatdate(time.time() + 10, usegmt=True)) <= 10.0
+    assert policy.delay(0, "120") == 30.0
+    assert policy.delay(1, "garbage") == 1.0
+
+
+def test_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # only one trial call while half-open
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.as_dict()["rejections"] == 2
+    assert breaker.times_opened == 1
+
+
+def test_breaker_reopens_on_failed_trial():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.times_opened == 2
+
+
+def test_released_trial_frees_the_half_open_slot():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.before_call() is True
+    breaker.release()
+    assert breaker.before_call() is True
+    assert breaker.state == "half_open"
+
+
+def test_cancelled_half_open_call_does_not_wedge_the_breaker(fake_model_server):
+    def slow(path, body):
+        time.sleep(0.5)
+        return 200, {"choices": [{"message": {"content": "late"}}]}
+
+    fake_model_server.responder = slow
+    url = fake_model_server.url()
+    breaker = get_circuit_breaker(url)
+    breaker.recovery_timeout = 0.01
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    time.sleep(0.02)
+    chatllm = BaseChatLLM(base_url=url, model="m")
+
+    async def cancelled_trial():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(chatllm.ainvoke("hi"), timeout=0.1)
+
+    asyncio.run(cancelled_trial())
+    assert breaker.state == "half_open"
+    _flaky(fake_model_server, failures=0)
+    assert chatllm.invoke("hi").content == "recovered"
+    assert breaker.state == "closed"
+
+
+def test_llm_retries_5xx_then_succeeds(fake_model_server):
+    _flaky(fake_model_server, failures=2)
+    llm = BaseLLM(base_url=fake_model_server.url(), model="m")
+    assert llm.invoke("hi") == "recovered"
+    assert len(fake_model_server.received) == 3
+    stats = circuit_breakers()[fake_model_server.url()]
+    assert stats["retries"] == 2 and stats["state"] == "closed"
+
+
+def test_retry_after_is_honoured(fake_model_server):
+    _flaky(fake_model_server, failures=1, status=429, headers={"Retry-After": "0.2"})
+    llm = BaseLLM(base_url=fake_model_server.url(), model="m", retry_policy=RetryPolicy(backoff_base=0.0))
+    start = time.perf_counter()
+    assert llm.invoke("hi") == "recovered"
+    assert time.perf_counter() - start >= 0.2
+
+
+def test_gives_up_after_max_retries(fake_model_server):
+    _flaky(fake_model_server, failures=10, status=500)
+    llm = BaseLLM(base_url=fake_model_server.url(), model="m", retry_policy=RetryPolicy(max_retries=1, backoff_base=0))
+    with pytest.raises(RuntimeError, match="status=500"):
+        llm.invoke("hi")
+    assert len(fake_model_server.received) == 2
+
+
+def test_open_circuit_fails_fast(fake_model_server):
+    _flaky(fake_model_server, failures=100, status=500)
+    no_retry = RetryPolicy(max_retries=0)
+    llm = BaseLLM(base_url=fake_model_server.url(), model="m", retry_policy=no_retry)
+    for _ in range(5):
+        with pytest.raises(RuntimeError):
+            llm.invoke("hi")
+    with pytest.raises(CircuitOpenError):
+        llm.invoke("hi")
+    assert len(fake_model_server.received) == 5
+    assert get_circuit_breaker(fake_model_server.url()).state == "open"
+
+
+def test_connection_errors_are_retried_and_counted():
+    url = "http://127.0.0.1:9/v1/chat/completions"
+    llm = BaseLLM(base_url=url, model="m", connect_timeout=0.5)
+    with pytest.raises(RuntimeError, match="API request failed"):
+        llm.invoke("hi")
+    stats = circuit_breakers()[url]
+    assert stats["failures"] == 3 and stats["retries"] == 2
+
+
+def test_async_chat_retries(fake_model_server):
+    _flaky(fake_model_server, failures=1, status=502)
+    chatllm = BaseChatLLM(base_url=fake_model_server.url(), model="m")
+    assert asyncio.run(chatllm.ainvoke("hi")).content == "recovered"
+    assert len(fake_model_server.received) == 2
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.dhti_elixir_base import BaseChatLLM, BaseLLM
+from src.dhti_elixir_base.transport import SingleFlight
+
+
+def _slow(server, delay=0.2):
+    def responder(path, body):
+        time.sleep(delay)
+        return 200, {"choices": [{"message": {"content": "shared"}}]}
+
+    server.responder = responder
+
+
+def test_concurrent_callers_share_one_call():
+    group = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def fn():
+        calls.append(1)
+        release.wait(1)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(group.do, "k", fn) for _ in range(4)]
+        time.sleep(0.1)
+        release.set()
+        results = [f.result() for f in futures]
+    assert results == ["result"] * 4
+    assert len(calls) == 1
+    assert group.as_dict() == {"leaders": 1, "coalesced": 3}
+    # nothing is kept once the call completes
+    assert group.do("k", lambda: "again") == "again"
+
+
+def test_error_is_shared_with_waiters():
+    group = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("boom")
+
+    async def burst():
+        return await asyncio.gather(*(group.ado("k", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert group.leaders == 1
+
+
+def test_identical_async_prompts_hit_server_once(fake_model_server):
+    _slow(fake_model_server)
+    llm = BaseChatLLM(base_url=fake_model_server.url(), model="m", coalesce_requests=True)
+
+    async def burst():
+        return await asyncio.gather(*(llm.ainvoke("same") for _ in range(5)))
+
+    results = asyncio.run(burst())
+    assert [r.content for r in results] == ["shared"] * 5
+    assert len(fake_model_server.received) == 1
+
+
+def test_identical_threaded_prompts_hit_server_once(fake_model_server):
+    _slow(fake_model_server)
+    llm = BaseLLM(base_url=fake_model_server.url(), model="m", coalesce_requests=True)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: llm.invoke("same"), range(4)))
+    assert results == ["shared"] * 4
+    assert len(fake_model_server.received) == 1
+
+
+def test_coalescing_is_opt_in(fake_model_server):
+    _slow(fake_model_server, delay=0.05)
+    llm = BaseLLM(base_url=fake_model_server.url(), model="m")
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        list(pool.map(lambda _: llm.invoke("same"), range(3)))
+    assert len(fake_model_server.received) == 3
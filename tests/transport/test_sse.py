@@ -0,0 +1,32 @@
+from src.dhti_elixir_base.transport.sse import extract_delta, is_final, iter_events
+
+from ..fake_server import llamacpp_sse, ollama_ndjson, openai_sse
+
+
+def test_iter_events_openai_stops_at_done():
+    lines = [": keep-alive", "event: message", *openai_sse(["a", "b"]), 'data: {"late": true}']
+    events = list(iter_events(lines))
+    assert [extract_delta(e) for e in events] == ["a", "b", None]
+    assert is_final(events[-1])
+
+
+def test_iter_events_llamacpp():
+    events = list(iter_events(llamacpp_sse(["x", "y"])))
+    assert [extract_delta(e) for e in events] == ["x", "y", ""]
+    assert is_final(events[-1]) and not is_final(events[0])
+
+
+def test_iter_events_ollama_ndjson():
+    events = list(iter_events(ollama_ndjson(["p", "q"])))
+    assert "".join(extract_delta(e) or "" for e in events) == "pq"
+    assert is_final(events[-1])
+
+
+def test_extract_delta_generate_and_text_shapes():
+    assert extract_delta({"response": "hi", "done": False}) == "hi"
+    assert extract_delta({"choices": [{"text": "t"}]}) == "t"
+    assert extract_delta({"unrelated": 1}) is None
+
+
+def test_iter_events_skips_malformed_lines():
+    assert list(iter_events(["data: not json", "", "data: [1, 2]"])) == []
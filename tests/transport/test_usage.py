@@ -0,0 +1,139 @@
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from src.dhti_elixir_base import BaseChatLLM, BaseLLM
+from src.dhti_elixir_base.cache import ResponseCache
+from src.dhti_elixir_base.transport import usage_stats
+from src.dhti_elixir_base.transport.usage import extract_usage, usage_info
+from tests.fake_server import openai_sse
+
+
+def _with_usage(server):
+    server.responder = lambda path, body: (
+        200,
+        {
+            "choices": [{"message": {"content": "ok"}}],
+            "usage": {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15},
+        },
+    )
+
+
+def test_openai_usage():
+    data = {"usage": {"prompt_tokens": 5, "completion_tokens": 7, "total_tokens": 12}}
+    assert extract_usage(data) == {
+        "prompt_tokens": 5,
+        "completion_tokens": 7,
+        "total_tokens": 12,
+    }
+
+
+def test_ollama_usage_and_timings():
+    data = {
+        "prompt_eval_count": 10,
+        "eval_count": 20,
+        "total_duration": 2_000_000_000,
+        "prompt_eval_duration": 500_000_000,
+        "eval_duration": 1_000_000_000,
+    }
+    usage = extract_usage(data)
+    assert usage["total_tokens"] == 30
+    assert usage["server_time"] == 2.0
+    assert usage["generation_time"] == 1.0
+    info = usage_info(usage, latency=2.5)
+    assert info["queue_time"] == pytest.approx(0.5)
+
+
+def test_llamacpp_timings():
+    data = {"timings": {"prompt_n": 4, "predicted_n": 8, "prompt_ms": 40.0, "predicted_ms": 160.0}}
+    usage = extract_usage(data)
+    assert usage["prompt_tokens"] == 4 and usage["completion_tokens"] == 8
+    assert usage["server_time"] == pytest.approx(0.2)
+
+
+def test_prefix_cache_hits():
+    data = {
+        "usage": {
+            "prompt_tokens": 100,
+            "completion_tokens": 5,
+            "prompt_tokens_details": {"cached_tokens": 80},
+        }
+    }
+    assert extract_usage(data)["cached_tokens"] == 80
+    # llama.cpp prompt_n excludes the cached prefix
+    usage = extract_usage({"timings": {"prompt_n": 20, "cache_n": 80, "predicted_n": 5}})
+    assert usage["prompt_tokens"] == 100 and usage["cached_tokens"] == 80
+
+
+def test_no_usage_reported():
+    assert extract_usage({"choices": []}) == {}
+    assert "queue_time" not in usage_info({}, 1.0)
+
+
+def test_chat_result_carries_usage(fake_model_server):
+    _with_usage(fake_model_server)
+    llm = BaseChatLLM(base_url=fake_model_server.url(), model="small")
+    result = llm.generate([[HumanMessage(content="hi")]])
+    generation = result.generations[0][0]
+    assert generation.generation_info["completion_tokens"] == 3
+    assert generation.generation_info["latency"] > 0
+    assert result.llm_output["token_usage"]["total_tokens"] == 15
+    assert llm.invoke("hi").usage_metadata["input_tokens"] == 12
+
+
+def test_llm_result_sums_usage(fake_model_server):
+    _with_usage(fake_model_server)
+    llm = BaseLLM(base_url=fake_model_server.url(), model="small")
+    result = asyncio.run(llm.agenerate(["a", "b"]))
+    assert result.llm_output == {
+        "token_usage": {"prompt_tokens": 24, "completion_tokens": 6, "total_tokens": 30},
+        "model_name": "small",
+    }
+    assert result.generations[1][0].generation_info["prompt_tokens"] == 12
+
+
+def test_usage_stats_per_model(fake_model_server):
+    _with_usage(fake_model_server)
+    BaseLLM(base_url=fake_model_server.url(), model="small").generate(["a", "b"])
+    stats = usage_stats()["small"]
+    assert stats["requests"] == 2
+    assert stats["completion_tokens"] == 6
+    assert stats["tokens_per_second"] > 0
+    assert stats["prefix_hit_ratio"] == 0.0
+
+
+def test_cache_hits_report_zero_tokens(fake_model_server):
+    _with_usage(fake_model_server)
+    llm = BaseChatLLM(base_url=fake_model_server.url(), model="small", response_cache=ResponseCache())
+    assert llm.invoke("hi").usage_metadata["input_tokens"] == 12
+    result = llm.generate([[HumanMessage(content="hi")]])
+    assert len(fake_model_server.received) == 1
+    assert result.generations[0][0].generation_info["cached"] is True
+    assert result.llm_output["token_usage"]["total_tokens"] == 0
+    stats = usage_stats()["small"]
+    assert (stats["requests"], stats["cache_hits"], stats["prompt_tokens"]) == (1, 1, 12)
+
+
+def test_stream_usage_is_recorded(fake_model_server):
+    usage = {"prompt_tokens": 9, "completion_tokens": 2, "total_tokens": 11}
+    fake_model_server.stream_responder = lambda path, body: [
+        *openai_sse(["a", "b"])[:-1],
+        "data: " + json.dumps({"choices": [], "usage": usage}),
+        "data: [DONE]",
+    ]
+    llm = BaseChatLLM(base_url=fake_model_server.url(), model="small")
+    message = None
+    for chunk in llm.stream("hi"):
+        message = chunk if message is None else message + chunk
+    assert fake_model_server.received[0]["stream_options"] == {"include_usage": True}
+    assert message.content == "ab"
+    assert message.usage_metadata["total_tokens"] == 11
+
+    async def astream():
+        return [chunk.usage_metadata async for chunk in llm.astream("hi") if chunk.usage_metadata]
+
+    assert [usage["output_tokens"] for usage in asyncio.run(astream())] == [2]
+    stats = usage_stats()["small"]
+    assert (stats["requests"], stats["completion_tokens"]) == (2, 4)